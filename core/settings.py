@@ -88,6 +88,27 @@ DATABASES = {
     'default': env.db(),
 }
 
+# Cache
+# Product metrics are cached here, see inventory/cache.py. Point REDIS_URL at
+# the ElastiCache endpoint in production; without it a local memory cache is
+# used.
+
+REDIS_URL = env('REDIS_URL', default=None)
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -132,9 +153,21 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom settings
 AVERAGE_INTERVAL_DAYS = 7
 REORDER_INTERVAL_DAYS = 7
+METRICS_CACHE_TIMEOUT = env.int('METRICS_CACHE_TIMEOUT', default=60 * 60)
+# Limits past which fitted forecast models are evicted
+FORECAST_MODEL_MAX_AGE_DAYS = env.int('FORECAST_MODEL_MAX_AGE_DAYS', default=30)
+FORECAST_MODEL_MAX_COUNT = env.int('FORECAST_MODEL_MAX_COUNT', default=500)
+FORECAST_MODEL_MAX_SIZE = env.int('FORECAST_MODEL_MAX_SIZE', default=100 * 1024 * 1024)
+# POS clients last synced longer ago than this pull every product again
+SYNC_CHANGE_MAX_AGE_DAYS = env.int('SYNC_CHANGE_MAX_AGE_DAYS', default=30)
+# Bearer tokens the POS clients upload their sales with
+POS_SYNC_TOKENS = env.list('POS_SYNC_TOKENS', default=[])
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'static/')
 
+# Rendered PDF exports are stored here and served through the admin
+MEDIA_ROOT = env('MEDIA_ROOT', default=os.path.join(BASE_DIR, 'media/'))
+
 Q_CLUSTER = {
     "name": "InventoryCluster",
     "workers": 4,          # Number of worker processes
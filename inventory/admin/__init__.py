@@ -2,6 +2,7 @@ from .expense import ExpenseAdmin
 from .product import ProductAdmin
 from .purchase import PurchaseAdmin
 from .report import ReportAdmin
+from .report_artifact import ReportArtifactAdmin
 from .sale import SaleAdmin
 from .stock_adjustment import StockAdjustmentAdmin
 from .stock_conversion import StockConversionAdmin
@@ -16,6 +17,7 @@ __all__ = [
     'ProductAdmin',
     'PurchaseAdmin',
     'ReportAdmin',
+    'ReportArtifactAdmin',
     'SaleAdmin',
     'StockAdjustmentAdmin',
     'StockConversionAdmin',
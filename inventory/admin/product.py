@@ -1,14 +1,12 @@
 from django.contrib import admin
-from django.db.models import Sum
 from django.urls import path
 from django.shortcuts import get_object_or_404, render
-from django.http import HttpResponse, HttpRequest
-from django.utils import timezone
-from django.conf import settings
+from django.http import Http404, HttpRequest
 from django.utils.safestring import mark_safe
-from weasyprint import HTML
 
-from inventory.models import StockMovement, Product
+from inventory import tabular
+from inventory.admin.report_artifact import ReportArtifactExportMixin
+from inventory.models import DemandForecast, ReportArtifact, StockLedgerEntry, StockMovement, Product
 
 
 class StockMovementInline(admin.TabularInline):
@@ -19,18 +17,17 @@ class StockMovementInline(admin.TabularInline):
     can_delete = False
     ordering = ('-date',)  # Ensures movements are in chronological order
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product', 'ledger_entry')
+
     @admin.display(description='Balance After')
     def balance_after(self, obj: StockMovement):
-        stock_in = obj.product.stock_movements.filter(
-            movement_type='IN',
-            date__lte=obj.date
-        ).aggregate(total=Sum('quantity'))['total'] or 0
-        stock_out = obj.product.stock_movements.filter(
-            movement_type='OUT',
-            date__lte=obj.date
-        ).aggregate(total=Sum('quantity'))['total'] or 0
+        try:
+            balance = obj.ledger_entry.balance
+        except StockLedgerEntry.DoesNotExist:
+            balance = StockLedgerEntry.objects.balance_at(obj.product_id, obj.date, inclusive=True)
 
-        return f"{(stock_in - stock_out):.2f} {obj.product.unit}"
+        return f"{balance:.2f} {obj.product.unit}"
 
     @admin.display(description='Type')
     def type(self, obj):
@@ -55,7 +52,7 @@ class StockMovementInline(admin.TabularInline):
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(ReportArtifactExportMixin, admin.ModelAdmin):
     change_form_template = "admin/product_change_form.html"
     change_list_template = "admin/product_change_list.html"
 
@@ -84,7 +81,7 @@ class ProductAdmin(admin.ModelAdmin):
     inlines = [StockMovementInline]
     fieldsets = (
         (None, {
-            'fields': ('name', 'unit', 'batch_size', 'predict_demand', 'is_active')
+            'fields': ('name', 'unit', 'batch_size', 'predict_demand', 'forecast_engine', 'is_active')
         }),
         ('Pricing', {
             'fields': ('unit_cost', 'unit_price')
@@ -98,114 +95,65 @@ class ProductAdmin(admin.ModelAdmin):
         }),
     )
 
-    @admin.display(description="Stock Level")
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate_metrics()
+
+    @admin.display(description="Stock Level", ordering='current_stock_level')
     def stock_level(self, obj: Product):
-        return f"{obj.stock_level:.3f} {obj.unit}"
+        return f"{obj.current_stock_level:.3f} {obj.unit}"
 
-    @admin.display(description="Batch Level")
+    @admin.display(description="Batch Level", ordering='batch_stock_level')
     def batch_level(self, obj: Product):
-        return f"{obj.batch_based_stock_level:.3f} {obj.unit}"
+        return f"{obj.batch_stock_level:.3f} {obj.unit}"
 
-    @admin.display(description="Stock Value")
+    @admin.display(description="Stock Value", ordering='current_stock_value')
     def stock_value(self, obj: Product):
-        return f"${obj.stock_value:.2f}"
+        return f"${obj.current_stock_value:.2f}"
 
     @admin.display(description="Below Minimum Stock", boolean=True)
     def is_below_minimum_stock(self, obj: Product):
-        return obj.is_below_minimum_stock()
+        return obj.current_stock_level < obj.minimum_stock_level
 
-    @admin.display(description="Av Consumption/Day")
+    @admin.display(description="Av Consumption/Day", ordering='consumption_per_day')
     def average_consumption(self, obj: Product):
-        return f"{obj.average_consumption:.3f} {obj.unit}"
+        return f"{obj.consumption_per_day:.3f} {obj.unit}"
 
-    @admin.display(description="Av Unit Cost")
+    @admin.display(description="Av Unit Cost", ordering='remaining_unit_cost')
     def average_unit_cost(self, obj: Product):
-        return f"${obj.average_unit_cost:.2f}"
+        return f"${obj.remaining_unit_cost:.2f}"
 
-    @admin.display(description="Av Profit/Day")
+    @admin.display(description="Av Profit/Day", ordering='gross_profit_per_day')
     def average_gross_profit(self, obj: Product):
-        return f"${obj.average_gross_profit:.2f}"
+        return f"${obj.gross_profit_per_day:.2f}"
 
-    @admin.display(description="Days to Sell Out")
+    @admin.display(description="Days to Sell Out", ordering='days_to_sell_out')
     def days_to_sell_out(self, obj: Product):
-        return f"{obj.days_until_stockout:.1f} days"
+        return f"{obj.days_to_sell_out:.1f} days"
 
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
             path('<str:object_id>/sales-report/', self.admin_site.admin_view(self.sales_report), name='product-sales-report'),
             path('<str:object_id>/download-pdf/', self.admin_site.admin_view(self.download_pdf), name='product-download-pdf'),
+            path('<str:object_id>/movements.<slug:fmt>', self.admin_site.admin_view(self.movements_export), name='product-movements-export'),
             path('suggest-budget/', self.admin_site.admin_view(self.suggest_budget_view), name='product-suggest-budget'),
             path('sales-graph/', self.admin_site.admin_view(self.sales_graph), name='product-sales-graph'),
             path('sales-predictions/', self.admin_site.admin_view(self.sales_predictions), name='product-sales-predictions'),
         ]
         return custom_urls + urls
 
-    def download_pdf(self, request, object_id, *args, **kwargs):
+    def movements_export(self, request, object_id, fmt, *args, **kwargs):
+        if fmt not in tabular.WRITERS:
+            raise Http404
         product = get_object_or_404(Product, pk=object_id)
-        movements = product.stock_movements.all().order_by('date', 'movement_type')
-
-        # Compute running balance
-        running_balance = 0
-        movements_with_balance = []
-        for m in movements:
-            if m.movement_type == 'IN':
-                running_balance += m.quantity
-            else:  # OUT movement
-                running_balance -= m.quantity
-
-            movements_with_balance.append({
-                'date': m.date,
-                'movement_type': f"{m.get_movement_type_display()} ({m.linked_object.name})" if m.linked_object else m.get_movement_type_display(),
-                'quantity': int(m.quantity) if product.unit == 'unit' else f"{m.quantity:.2f}",
-                'reference': getattr(m, 'reference', ''),
-                'running_balance': running_balance,
-            })
+        return tabular.streaming_response(fmt, tabular.product_movement_rows(product))
 
-        # Render the HTML template for the PDF
-        html = render(request, 'admin/product_pdf.html', {
-            'product': product,
-            'movements': movements_with_balance
-        }).content.decode('utf-8')
-
-        # Generate PDF
-        pdf = HTML(string=html).write_pdf()
-
-        # Return PDF as a download
-        response = HttpResponse(pdf, content_type='application/pdf')
-        filename = f"{product.name} Report.pdf"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
+    def download_pdf(self, request, object_id, *args, **kwargs):
+        product = get_object_or_404(Product, pk=object_id)
+        return self.export_response(request, ReportArtifact.Kind.PRODUCT_REPORT, product.pk)
 
     def suggest_budget_view(self, request: HttpRequest, *args, **kwargs):
-        products = Product.objects.filter(is_active=True)
-        suggested_purchases = []
-        total_reorder_cost = 0
-        realizable_profit = 0
-        for p in products:
-            req = p.reorder_quantity
-            if req > 0:
-                suggested_purchases.append(p)
-                total_reorder_cost += p.batch_sized_reorder_value
-                # realizable_profit += p.batch_sized_reorder_quantity * p.latest_unit_profit
-
-        # Render HTML template for PDF
-        html_content = render(request, 'admin/product_suggested_budget.html', {
-            'products': suggested_purchases,
-            'total_reorder_cost': total_reorder_cost,
-            'generated_at': timezone.now(),
-            'reorder_interval': settings.REORDER_INTERVAL_DAYS,
-            'realizable_profit': realizable_profit,
-        }).content.decode('utf-8')
-
-        # Generate PDF using WeasyPrint
-        pdf = HTML(string=html_content).write_pdf()
-
-        # Return as PDF download
-        response = HttpResponse(pdf, content_type='application/pdf')
-        filename = "suggested_budget.pdf"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
+        return self.export_response(request, ReportArtifact.Kind.SUGGESTED_BUDGET)
 
     def sales_report(self, request, object_id, *args, **kwargs):
         product = get_object_or_404(Product, pk=object_id)
@@ -247,26 +195,21 @@ class ProductAdmin(admin.ModelAdmin):
         return render(request, 'admin/product_sales_graph.html', context)
 
     def sales_predictions(self, request):
-        from utils.predictor import Predictor
-        predictor = Predictor()
-        products = Product.objects.filter(predict_demand=True, is_active=True, unit='kg')
-        line = []
-        for p in products:
-            forecasts = predictor.predict_sales(p)
-            sales = []
-            for forecast in forecasts:
-                sales.append({
-                    'date': forecast['ds'].strftime('%Y-%m-%d'),
-                    'quantity': round(forecast['yhat'], 3),
-                })
-
-            line.append({
-                'name': p.name,
-                'sales': sales
+        forecasts = DemandForecast.objects.select_related('product').filter(
+            product__predict_demand=True, product__is_active=True, product__unit='kg',
+        )
+        line = {}
+        for forecast in forecasts:
+            line.setdefault(forecast.product_id, {
+                'name': forecast.product.name,
+                'sales': [],
+            })['sales'].append({
+                'date': forecast.date.strftime('%Y-%m-%d'),
+                'quantity': round(float(forecast.quantity), 3),
             })
 
         context = {
-            'products': line,
+            'products': list(line.values()),
         }
 
         return render(request, 'admin/product_sales_predictions.html', context)
@@ -1,15 +1,16 @@
 from django.contrib import admin
 from django.urls import path
 from django.shortcuts import get_object_or_404, render
-from django.utils import timezone
-from django.http import HttpResponse
-from weasyprint import HTML
+from django.http import Http404, HttpResponse
 
-from inventory.models import Report
+from inventory.admin.report_artifact import ReportArtifactExportMixin
+from inventory import tabular
+from inventory.exports import write_pdf
+from inventory.models import Report, ReportArtifact
 
 
 @admin.register(Report)
-class ReportAdmin(admin.ModelAdmin):
+class ReportAdmin(ReportArtifactExportMixin, admin.ModelAdmin):
     change_form_template = "admin/report_change_form.html"
 
     list_display = ('open_date', 'close_date', 'total_sales', 'total_expenses', 'net_profit')
@@ -116,27 +117,17 @@ class ReportAdmin(admin.ModelAdmin):
                 '<str:object_id>/profitability-report/',
                 self.admin_site.admin_view(self.profitability_report),
                 name='profitability-report',
-            )
+            ),
+            path(
+                '<str:object_id>/export/<slug:table>.<slug:fmt>',
+                self.admin_site.admin_view(self.table_export),
+                name='report-table-export',
+            ),
         ]
         return custom_urls + urls
 
     def download_income_statement(self, request, object_id, *args, **kwargs):
-        report = get_object_or_404(Report, pk=object_id)
-        # Render HTML template
-        html_content = render(
-            request,
-            "admin/income_statement.html",
-            {"report": report, "generated_at": timezone.now()},
-        ).content.decode("utf-8")
-
-        # Convert to PDF
-        pdf = HTML(string=html_content).write_pdf()
-
-        # Return PDF as response
-        response = HttpResponse(pdf, content_type="application/pdf")
-        filename = f"""{report.open_date.strftime('%Y-%m-%d')} - {report.close_date.strftime('%Y-%m-%d')} Income Statement: Generated ({timezone.now().strftime('%Y-%m-%d %H:%M:%S')}).pdf"""
-        response["Content-Disposition"] = f"attachment; filename={filename}"
-        return response
+        return self.report_export(request, ReportArtifact.Kind.INCOME_STATEMENT, object_id)
 
     def open_balance_sheet(self, request, object_id, *args, **kwargs):
         report = get_object_or_404(Report, pk=object_id)
@@ -148,7 +139,7 @@ class ReportAdmin(admin.ModelAdmin):
         ).content.decode("utf-8")
 
         # Convert to PDF
-        pdf = HTML(string=html_content).write_pdf()
+        pdf = write_pdf(html_content)
 
         # Return PDF as response
         response = HttpResponse(pdf, content_type="application/pdf")
@@ -157,44 +148,23 @@ class ReportAdmin(admin.ModelAdmin):
         return response
 
     def movement_report(self, request, object_id, *args, **kwargs):
-        report = get_object_or_404(Report, pk=object_id)
-        # Render HTML template
-        html_content = render(
-            request,
-            "admin/movements_report.html",
-            {
-                "report": report,
-                "generated_at": timezone.now(),
-            }
-        ).content.decode("utf-8")
+        return self.report_export(request, ReportArtifact.Kind.MOVEMENT_REPORT, object_id)
 
-        # Convert to PDF
-        pdf = HTML(string=html_content).write_pdf()
+    def profitability_report(self, request, object_id, *args, **kwargs):
+        return self.report_export(request, ReportArtifact.Kind.PROFITABILITY_REPORT, object_id)
 
-        # Return PDF as response
-        response = HttpResponse(pdf, content_type="application/pdf")
-        filename = f"inventory_movements_{report.id}.pdf"
-        response["Content-Disposition"] = f"attachment; filename={filename}"
-        return response
+    tables = {
+        'movements': tabular.movement_rows,
+        'profitability': tabular.profitability_rows,
+        'transactions': tabular.transaction_rows,
+    }
 
-    def profitability_report(self, request, object_id, *args, **kwargs):
+    def table_export(self, request, object_id, table, fmt, *args, **kwargs):
+        if table not in self.tables or fmt not in tabular.WRITERS:
+            raise Http404
         report = get_object_or_404(Report, pk=object_id)
-        # Render HTML template
-        html_content = render(
-            request,
-            "admin/profitability_report.html",
-            {
-                "report": report,
-                "generated_at": timezone.now(),
-                "total": sum(i['gross_profit'] for i in report.product_performances)
-            }
-        ).content.decode("utf-8")
+        return tabular.streaming_response(fmt, self.tables[table](report))
 
-        # Convert to PDF
-        pdf = HTML(string=html_content).write_pdf()
-
-        # Return PDF as response
-        response = HttpResponse(pdf, content_type="application/pdf")
-        filename = f"Inventory and Profitability Report {report.id}.pdf"
-        response["Content-Disposition"] = f"attachment; filename={filename}"
-        return response
+    def report_export(self, request, kind, object_id):
+        report = get_object_or_404(Report, pk=object_id)
+        return self.export_response(request, kind, report.pk, report.open_date, report.close_date)
@@ -0,0 +1,67 @@
+from django.contrib import admin
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+
+from inventory.models import ReportArtifact
+
+
+def artifact_download(artifact):
+    return FileResponse(artifact.file.open('rb'), as_attachment=True, filename=artifact.filename, content_type='application/pdf')
+
+
+class ReportArtifactExportMixin:
+    """
+    Serves PDF exports from their background rendered artifacts.
+    """
+
+    def export_response(self, request, kind, object_id=None, open_date=None, close_date=None):
+        """
+        Serve the artifact of the export if it is rendered at the current
+        data version, or queue it and show a page polling for its status.
+        """
+        artifact = ReportArtifact.objects.request(kind, object_id, open_date, close_date)
+        if artifact.status == ReportArtifact.Status.DONE:
+            return artifact_download(artifact)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f"Generating {artifact.get_kind_display()}",
+            'artifact': artifact,
+            'status_url': reverse('admin:report-artifact-status', args=[artifact.pk]),
+            'download_url': reverse('admin:report-artifact-download', args=[artifact.pk]),
+        }
+        return TemplateResponse(request, 'admin/report_artifact_status.html', context)
+
+
+@admin.register(ReportArtifact)
+class ReportArtifactAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'object_id', 'open_date', 'close_date', 'data_version', 'status', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = [field.name for field in ReportArtifact._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path('<str:object_id>/status/', self.admin_site.admin_view(self.status_view), name='report-artifact-status'),
+            path('<str:object_id>/download/', self.admin_site.admin_view(self.download_view), name='report-artifact-download'),
+        ]
+        return custom_urls + urls
+
+    def status_view(self, request, object_id, *args, **kwargs):
+        artifact = get_object_or_404(ReportArtifact, pk=object_id)
+        return JsonResponse({
+            'status': artifact.status,
+            'error': artifact.error,
+        })
+
+    def download_view(self, request, object_id, *args, **kwargs):
+        artifact = get_object_or_404(ReportArtifact, pk=object_id)
+        if artifact.status != ReportArtifact.Status.DONE:
+            raise Http404("The report has not been generated yet.")
+        return artifact_download(artifact)
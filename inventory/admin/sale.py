@@ -47,18 +47,21 @@ class SaleAdmin(admin.ModelAdmin):
         }),
     )
 
-    @admin.display(description='Total Amount')
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate_totals()
+
+    @admin.display(description='Total Amount', ordering='revenue')
     def total_amount(self, obj: Sale):
-        return f"${obj.total_amount:.2f}"
+        return f"${obj.revenue:.2f}"
 
-    @admin.display(description='Cost of Goods Sold')
-    def cost_of_goods_sold(self, obj):
-        return f"${obj.cost_of_goods_sold:.2f}"
+    @admin.display(description='Cost of Goods Sold', ordering='cost')
+    def cost_of_goods_sold(self, obj: Sale):
+        return f"${obj.cost:.2f}"
 
-    @admin.display(description="Gross Profit")
-    def gross_profit(self, obj):
-        return f"${obj.gross_profit:.2f}"
+    @admin.display(description="Gross Profit", ordering='profit')
+    def gross_profit(self, obj: Sale):
+        return f"${obj.profit:.2f}"
 
     @admin.display(description="Gross Margin")
-    def gross_margin(self, obj):
-        return f"{obj.gross_margin:.2%}"
+    def gross_margin(self, obj: Sale):
+        return f"{obj.profit / obj.revenue if obj.revenue else 0:.2%}"
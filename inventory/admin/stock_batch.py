@@ -53,7 +53,7 @@ class BatchAdmin(admin.ModelAdmin):
 
     @admin.display(description='Product')
     def product__name(self, obj: StockBatch):
-        return obj.linked_object.product.name
+        return obj.product.name
 
     @admin.display(description='Date Received')
     def date(self, obj: StockBatch):
@@ -61,11 +61,11 @@ class BatchAdmin(admin.ModelAdmin):
 
     @admin.display(description='Quantity Received')
     def quantity(self, obj: StockBatch):
-        return f"{obj.linked_object.quantity:.2f} {obj.linked_object.product.unit}"
+        return f"{obj.quantity:.2f} {obj.product.unit}"
 
     @admin.display(description='Quantity Remaining')
     def quantity_remaining(self, obj: StockBatch):
-        return f"{obj.quantity_remaining:.2f} {obj.linked_object.product.unit}"
+        return f"{obj.quantity_remaining:.2f} {obj.product.unit}"
 
     @admin.display(description='In Stock', boolean=True)
     def in_stock(self, obj: StockBatch):
@@ -79,7 +79,7 @@ class BatchAdmin(admin.ModelAdmin):
 
     @admin.display(description='Unit Cost')
     def unit_cost(self, obj: StockBatch):
-        return f"${obj.linked_object.unit_cost:.2f}"
+        return f"${obj.unit_cost:.2f}"
 
     def get_urls(self):
         urls = super().get_urls()
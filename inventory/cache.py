@@ -0,0 +1,66 @@
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+GLOBAL_VERSION_KEY = 'product-metrics:version'
+MISSING = object()
+
+
+def _version_key(product_id):
+    return f'product-metrics:{product_id}:version'
+
+
+def _versions(*keys):
+    """
+    Return the current value of each version counter in `keys`. A counter
+    that is missing (never set or evicted) starts at the current time, so
+    entries cached under an evicted counter are never read again.
+    """
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def metric_key(product_id, name):
+    global_version, product_version = _versions(GLOBAL_VERSION_KEY, _version_key(product_id))
+    return f'product-metrics:{product_id}:{name}:{global_version}.{product_version}'
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def invalidate(product_id=None):
+    """
+    Drop the cached metrics of `product_id`, or of every product.
+
+    The version is bumped right away, for readers in the current
+    transaction, and again on commit, so values computed by other readers
+    from the data as it was before the commit are not kept either.
+    """
+    key = GLOBAL_VERSION_KEY if product_id is None else _version_key(product_id)
+    _bump(key)
+    transaction.on_commit(lambda: _bump(key))
+
+
+def cached_metric(method):
+    """
+    Cache a `Product` property under the product's metrics version.
+    """
+    @wraps(method)
+    def wrapper(product):
+        key = metric_key(product.pk, method.__name__)
+        value = cache.get(key, MISSING)
+        if value is MISSING:
+            value = method(product)
+            cache.set(key, value, settings.METRICS_CACHE_TIMEOUT)
+        return value
+    return wrapper
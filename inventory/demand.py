@@ -0,0 +1,98 @@
+from decimal import Decimal
+import pandas as pd
+
+from inventory.models import SaleItem, StockMovement
+
+# Quantities have three decimal places, so they are summed exactly as
+# integer thousandths
+SCALE = 1000
+
+COLUMNS = ['product_id', 'ds', 'quantity', 'stock_before', 'y']
+
+
+def _thousandths(quantity):
+    return int(quantity * SCALE)
+
+
+def demand_frames(products):
+    """
+    The censored demand series of every product in `products`, from one
+    query for their stock movements and one for their sales.
+
+    Each sale is matched to the running stock balance right before it (the
+    cumulative sum of every movement dated strictly earlier). A sale that
+    took at least the stock on hand was limited by it and says nothing about
+    demand, so its `y` is NaN; otherwise `y` is the quantity sold.
+
+    :return: `{product_id: DataFrame}` with the columns `ds` (aware sale
+        date), `quantity`, `stock_before` and `y`, sorted by date. Products
+        without sales get an empty frame.
+    """
+    product_ids = [product.pk for product in products]
+    movements = pd.DataFrame.from_records(
+        [
+            (product_id, date, _thousandths(quantity) if movement_type == 'IN' else -_thousandths(quantity))
+            for product_id, date, movement_type, quantity in (
+                StockMovement.objects
+                .filter(product__in=product_ids)
+                .order_by('date')
+                .values_list('product_id', 'date', 'movement_type', 'quantity')
+            )
+        ],
+        columns=['product_id', 'ds', 'change'],
+    )
+    sales = pd.DataFrame.from_records(
+        [
+            (product_id, date, _thousandths(quantity))
+            for product_id, date, quantity in (
+                SaleItem.objects
+                .filter(product__in=product_ids)
+                .order_by('sale__date', 'id')
+                .values_list('product_id', 'sale__date', 'quantity')
+            )
+        ],
+        columns=['product_id', 'ds', 'sold'],
+    )
+
+    if sales.empty:
+        return {product_id: pd.DataFrame(columns=COLUMNS[1:]) for product_id in product_ids}
+
+    movements['balance'] = movements.groupby('product_id')['change'].cumsum()
+    sales['ds'] = pd.to_datetime(sales['ds'], utc=True)
+    movements['ds'] = pd.to_datetime(movements['ds'], utc=True)
+    # The last running balance dated strictly before each sale
+    sales = pd.merge_asof(
+        sales,
+        movements[['product_id', 'ds', 'balance']],
+        on='ds',
+        by='product_id',
+        allow_exact_matches=False,
+    )
+    sales['balance'] = sales['balance'].fillna(0)
+    sales['quantity'] = sales['sold'] / SCALE
+    sales['stock_before'] = sales['balance'] / SCALE
+    sales['y'] = sales['quantity'].where(sales['balance'] >= sales['sold'])
+
+    frames = {product_id: pd.DataFrame(columns=COLUMNS[1:]) for product_id in product_ids}
+    for product_id, frame in sales[COLUMNS].groupby('product_id'):
+        frames[product_id] = frame.drop(columns='product_id').reset_index(drop=True)
+    return frames
+
+
+def censored_demand(product):
+    """
+    The censored demand series of `product`, see `demand_frames`.
+    """
+    return demand_frames([product])[product.pk]
+
+
+def average_in_stock_demand(df, count):
+    """
+    The average quantity of the latest `count` sales that were not limited
+    by stock, as a `Decimal`.
+    """
+    in_stock = df[df['y'].notna()].tail(count)
+    if in_stock.empty:
+        return 0
+    total = Decimal(int((in_stock['quantity'] * SCALE).round().sum()))
+    return total / SCALE / len(in_stock)
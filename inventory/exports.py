@@ -0,0 +1,101 @@
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from inventory.models import Product, Report, ReportArtifact
+
+
+def income_statement(report):
+    generated_at = timezone.now()
+    filename = f"""{report.open_date.strftime('%Y-%m-%d')} - {report.close_date.strftime('%Y-%m-%d')} Income Statement: Generated ({generated_at.strftime('%Y-%m-%d %H:%M:%S')}).pdf"""
+    return "admin/income_statement.html", {"report": report, "generated_at": generated_at}, filename
+
+
+def movement_report(report):
+    context = {
+        "report": report,
+        "generated_at": timezone.now(),
+    }
+    return "admin/movements_report.html", context, f"inventory_movements_{report.id}.pdf"
+
+
+def profitability_report(report):
+    context = {
+        "report": report,
+        "generated_at": timezone.now(),
+        "total": sum(i['gross_profit'] for i in report.product_performances)
+    }
+    return "admin/profitability_report.html", context, f"Inventory and Profitability Report {report.id}.pdf"
+
+
+def product_report(product):
+    movements = product.stock_movements.all().order_by('date', 'movement_type')
+
+    # Compute running balance
+    running_balance = 0
+    movements_with_balance = []
+    for m in movements:
+        if m.movement_type == 'IN':
+            running_balance += m.quantity
+        else:  # OUT movement
+            running_balance -= m.quantity
+
+        movements_with_balance.append({
+            'date': m.date,
+            'movement_type': f"{m.get_movement_type_display()} ({m.linked_object.name})" if m.linked_object else m.get_movement_type_display(),
+            'quantity': int(m.quantity) if product.unit == 'unit' else f"{m.quantity:.2f}",
+            'reference': getattr(m, 'reference', ''),
+            'running_balance': running_balance,
+        })
+
+    context = {
+        'product': product,
+        'movements': movements_with_balance
+    }
+    return 'admin/product_pdf.html', context, f"{product.name} Report.pdf"
+
+
+def suggested_budget(_):
+    from inventory.planning import ReorderPlanner
+
+    planner = ReorderPlanner()
+    reorders = planner.reorders()
+    context = {
+        'reorders': reorders,
+        'total_reorder_cost': sum(line.reorder_value for line in reorders),
+        'generated_at': timezone.now(),
+        'reorder_interval': planner.horizon_days,
+    }
+    return 'admin/product_suggested_budget.html', context, "suggested_budget.pdf"
+
+
+# The model each kind reports on, if any, and the function returning its
+# template, context and file name
+EXPORTS = {
+    ReportArtifact.Kind.INCOME_STATEMENT: (Report, income_statement),
+    ReportArtifact.Kind.MOVEMENT_REPORT: (Report, movement_report),
+    ReportArtifact.Kind.PROFITABILITY_REPORT: (Report, profitability_report),
+    ReportArtifact.Kind.PRODUCT_REPORT: (Product, product_report),
+    ReportArtifact.Kind.SUGGESTED_BUDGET: (None, suggested_budget),
+}
+
+
+def write_pdf(html):
+    """
+    Convert rendered HTML to a PDF.
+    """
+    # Imported here, WeasyPrint is slow to load and only needed by exports
+    from weasyprint import HTML
+
+    return HTML(string=html).write_pdf()
+
+
+def render_pdf(kind, object_id=None):
+    """
+    Render the PDF export of `kind` for the object with `object_id`.
+
+    :return: The file name and the PDF content.
+    """
+    model, build = EXPORTS[kind]
+    obj = model.objects.get(pk=object_id) if model is not None else None
+    template, context, filename = build(obj)
+    return filename, write_pdf(render_to_string(template, context))
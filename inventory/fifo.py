@@ -0,0 +1,106 @@
+from collections import deque
+from decimal import Decimal
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+
+from inventory.models import BatchMovement, SaleItem, StockBatch
+
+EMPTY_BATCH_THRESHOLD = Decimal('0.0001')
+
+
+class FifoAllocator:
+    """
+    Allocates consumption to stock batches, oldest first.
+
+    Open batches and their remaining quantities are loaded once per product
+    and walked in memory; the resulting OUT movements are buffered and
+    written with a single `bulk_create` on `flush()`.
+    """
+
+    def __init__(self):
+        self._open_batches = {}
+        self.movements = []
+
+    def load(self, products):
+        """
+        Load the open batches of every product in `products` not loaded yet,
+        with a single query.
+        """
+        pending = [product.pk for product in products if product.pk not in self._open_batches]
+        if not pending:
+            return
+        for pk in pending:
+            self._open_batches[pk] = deque()
+
+        batches = (
+            StockBatch.objects
+            .filter(product__in=pending)
+            .annotate_remaining_quantities()
+            .filter(outstanding__gt=EMPTY_BATCH_THRESHOLD)
+            .order_by('date_received', 'id')
+        )
+        for batch in batches:
+            self._open_batches[batch.product_id].append([batch, batch.outstanding])
+
+    def open_batches(self, product):
+        """
+        Return the in-memory queue of `[batch, remaining]` pairs for `product`,
+        loading it from the database on first use.
+        """
+        self.load([product])
+        return self._open_batches[product.pk]
+
+    def reset(self, products):
+        """
+        Start `products` with no open batches instead of loading them.
+        """
+        for product in products:
+            self._open_batches[product.pk] = deque()
+
+    def add_batch(self, product, batch, quantity):
+        """
+        Make a batch created in memory available for allocation. Batches must
+        be added in the order they were received.
+        """
+        self.open_batches(product).append([batch, Decimal(str(quantity))])
+
+    def allocate(self, product, quantity, associated_item, date=None):
+        """
+        Consume `quantity` of `product` on behalf of `associated_item`.
+
+        :return: The quantity that could not be allocated for lack of stock.
+        """
+        batches = self.open_batches(product)
+        content_type = ContentType.objects.get_for_model(type(associated_item))
+        date = date or associated_item.date or timezone.now()
+        unit_price = associated_item.unit_price if isinstance(associated_item, SaleItem) else None
+        remaining = Decimal(str(quantity))
+
+        while remaining > 0 and batches:
+            entry = batches[0]
+            batch, available = entry
+            ear_marked = min(remaining, available)
+            self.movements.append(BatchMovement(
+                batch=batch,
+                content_type=content_type,
+                object_id=associated_item.id,
+                quantity=ear_marked,
+                date=date,
+                movement_type=BatchMovement.MovementType.OUT,
+                unit_cost=batch.unit_cost,
+                unit_price=unit_price,
+            ))
+            entry[1] -= ear_marked
+            remaining -= ear_marked
+            if entry[1] <= EMPTY_BATCH_THRESHOLD:
+                batches.popleft()
+
+        return remaining
+
+    def flush(self):
+        """
+        Write all buffered batch movements.
+        """
+        movements = BatchMovement.objects.bulk_create(self.movements, batch_size=1000)
+        self.movements = []
+        return movements
@@ -0,0 +1,163 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from logging import getLogger
+import time
+import numpy as np
+import pandas as pd
+
+from inventory.demand import demand_frames
+from inventory.models import DemandForecast, ForecastModel, Product
+from utils.forecasting import FORECASTERS, daily_sales, get_forecaster, run_forecaster
+from utils.predictor import Predictor
+
+logger = getLogger(__name__)
+
+# Prophet needs at least two observations to fit
+MIN_OBSERVATIONS = 2
+
+
+class ForecastRunner:
+    """
+    Forecasts the demand of many products at once and stores the results as
+    `DemandForecast` rows.
+
+    The sales frames of every product are extracted from the database at
+    once, in this process. Only the frames, with the models last fitted to
+    each product, are sent to a pool of worker processes, which forecast
+    each with the product's forecast engine without opening their own
+    database connections. Prophet models whose sales have not changed are
+    reused without refitting.
+    """
+
+    def __init__(self, workers=None, days=12):
+        self.workers = workers
+        self.days = days
+        self.predictor = Predictor()
+        self.failed = []
+        self.reused = 0
+
+    def frames(self, products):
+        """
+        Return `(product, frame)` for every product with enough sales.
+        """
+        products = list(products)
+        demand = demand_frames(products)
+        for product in products:
+            df = self.predictor.prophet_frame(demand[product.pk])
+            if df['y'].count() < MIN_OBSERVATIONS:
+                logger.info(f"Skipping forecast of {product}: not enough sales")
+                continue
+            yield product, df
+
+    def fit(self, frames):
+        """
+        Fit every frame, in a process pool unless `workers` is 1, and yield
+        `(product, (records, fitted))` as each finishes. Products whose model
+        fails to fit are logged and collected in `failed`.
+        """
+        # Only the engines storing their models are given the cached ones
+        cached = ForecastModel.objects.cached([
+            product for product, _ in frames
+            if get_forecaster(product.forecast_engine).caches_models
+        ])
+        tasks = [
+            (product, (product.forecast_engine, df, self.days, cached.get(product.pk)))
+            for product, df in frames
+        ]
+        if self.workers == 1:
+            yield from self.collect((product, lambda args=args: run_forecaster(*args)) for product, args in tasks)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(run_forecaster, *args): product for product, args in tasks}
+            yield from self.collect((futures[future], future.result) for future in as_completed(futures))
+
+    def collect(self, results):
+        for product, result in results:
+            try:
+                records = result()
+            except Exception:
+                logger.exception(f"Error forecasting {product}")
+                self.failed.append(product)
+                continue
+            yield product, records
+
+    def run(self, products=None):
+        """
+        Forecast `products`, by default every active product with demand
+        prediction enabled, and store the results.
+
+        :return: The number of products forecast.
+        """
+        if products is None:
+            products = Product.objects.filter(predict_demand=True, is_active=True)
+
+        frames = list(self.frames(products))
+        dfs = {product.pk: df for product, df in frames}
+        forecast = 0
+        for product, (records, fitted) in self.fit(frames):
+            if fitted is not None:
+                ForecastModel.objects.store(product, dfs[product.pk], fitted)
+            elif get_forecaster(product.forecast_engine).caches_models:
+                self.reused += 1
+            DemandForecast.objects.replace(product, records)
+            forecast += 1
+
+        self.predictor.evict_models()
+        return forecast
+
+
+def compare_forecasters(products=None, holdout=14, engines=None):
+    """
+    Backtest forecast engines on the sales history of `products`, by default
+    every active product with demand prediction enabled.
+
+    Each product's last `holdout` days of sales are held out, every engine
+    forecasts them from the earlier sales and the forecasts are compared to
+    the daily sales, skipping days limited by stock. Products with fewer
+    than `MIN_OBSERVATIONS` sales before the holdout are skipped.
+
+    :return: `{engine: {'products', 'failed', 'mae', 'seconds'}}`, with the
+        mean absolute daily error over all products and the total time spent
+        forecasting.
+    """
+    if products is None:
+        products = Product.objects.filter(predict_demand=True, is_active=True)
+    engines = engines or list(FORECASTERS)
+    products = list(products)
+    demand = demand_frames(products)
+    predictor = Predictor()
+
+    results = {engine: {'products': 0, 'failed': 0, 'errors': [], 'seconds': 0.0} for engine in engines}
+    for product in products:
+        df = predictor.prophet_frame(demand[product.pk])
+        if df.empty:
+            continue
+        last_day = df['ds'].max().normalize()
+        cutoff = last_day - pd.Timedelta(days=holdout - 1)
+        train = df[df['ds'] < cutoff].reset_index(drop=True)
+        if train['y'].count() < MIN_OBSERVATIONS:
+            logger.info(f"Skipping comparison of {product}: not enough sales before the holdout")
+            continue
+        actual = daily_sales(df[df['ds'] >= cutoff], cutoff, last_day)
+        days = (last_day - train['ds'].max().normalize()).days
+
+        for engine in engines:
+            start = time.perf_counter()
+            try:
+                records, _ = get_forecaster(engine).forecast(train, days)
+            except Exception:
+                logger.exception(f"Error forecasting {product} with {engine}")
+                results[engine]['failed'] += 1
+                continue
+            results[engine]['seconds'] += time.perf_counter() - start
+
+            forecast = pd.DataFrame.from_records(records)
+            predicted = forecast.groupby(forecast['ds'].dt.normalize())['yhat'].last().reindex(actual.index)
+            errors = (actual - predicted).abs().dropna()
+            results[engine]['errors'].extend(errors.tolist())
+            results[engine]['products'] += 1
+
+    for result in results.values():
+        errors = result.pop('errors')
+        result['mae'] = float(np.mean(errors)) if errors else None
+    return results
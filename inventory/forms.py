@@ -7,7 +7,20 @@ from django.utils import timezone
 from django import forms
 from django.core.exceptions import ValidationError
 
-from inventory.models import Product
+from inventory.ingestion import find_products
+
+
+def validate_products_exist(lines):
+    """
+    Raise a `ValidationError` naming every `product_name` in `lines` that has
+    no product, looking them all up with one query.
+    """
+    products = find_products(line['product_name'] for line in lines)
+    missing = dict.fromkeys(
+        line['product_name'] for line in lines if line['product_name'].lower() not in products
+    )
+    if missing:
+        raise ValidationError([f"Product '{name}' not found." for name in missing])
 
 
 class StockAdjustmentForm(forms.Form):
@@ -35,6 +48,50 @@ class StockAdjustmentForm(forms.Form):
         help_text='Create products that do not exist in the database.'
     )
 
+    def clean_stock_data(self):
+        """
+        Validate and parse the CSV data.
+        The parsed data will be stored in `self.cleaned_data['parsed_stock']`.
+        """
+        data = self.cleaned_data.get('stock_data')
+        f = StringIO(data)
+        reader = csv.reader(f, delimiter=",", skipinitialspace=True)
+        parsed_stock = []
+        errors = []
+        for line_number, line in enumerate(reader, start=1):
+            if not len(line):
+                continue
+
+            if len(line) < 5:
+                errors.append(f"Line {line_number}: Not enough columns.")
+                continue
+
+            try:
+                purchase_price, selling_price, quantity = (Decimal(value.strip()) for value in line[1:4])
+            except decimal.InvalidOperation:
+                errors.append(f"Line {line_number}: Invalid number in line: {line}")
+                continue
+
+            parsed_stock.append({
+                'product_name': line[0].strip(),
+                'purchase_price': purchase_price,
+                'selling_price': selling_price,
+                'quantity': quantity,
+                'unit': line[4].strip(),
+            })
+
+        if errors:
+            raise ValidationError(errors)
+
+        self.cleaned_data['parsed_stock'] = parsed_stock
+        return data
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('create_missing_products'):
+            validate_products_exist(cleaned_data.get('parsed_stock', []))
+        return cleaned_data
+
 
 class SalesForm(forms.Form):
     sales_data = forms.CharField(
@@ -101,18 +158,17 @@ class SalesForm(forms.Form):
                 errors.append(f"Line {line_number}: Invalid quantity '{quantity_str}' for line: {line}")
                 continue
 
-            try:
-                Product.objects.get(name__iexact=product_name)
-            except Product.DoesNotExist:
-                errors.append(f"Product '{product_name}' not found.")
-                continue
-
             parsed_sales.append({
                 'product_name': product_name,
                 'selling_price': selling_price,
                 'quantity': quantity,
             })
 
+        products = find_products(sale['product_name'] for sale in parsed_sales)
+        for sale in parsed_sales:
+            if sale['product_name'].lower() not in products:
+                errors.append(f"Product '{sale['product_name']}' not found.")
+
         if errors:
             raise ValidationError(errors)
 
@@ -171,7 +227,8 @@ class PurchasesForm(forms.Form):
             price_str = line[2].strip()
 
             match = re.match(r"(\d+(\.\d+)?)", quantity_str)
-            if not match:
+            # Prices are line totals, divided by the quantity for the unit cost
+            if not match or not Decimal(match.group(1)):
                 errors.append(f"Line {line_number}: Invalid quantity: {quantity_str}")
                 continue
 
@@ -214,14 +271,63 @@ class PurchasesForm(forms.Form):
         parsed_purchases = cleaned_data.get('parsed_purchases', [])
         create_missing_products = cleaned_data.get('create_missing_products')
 
-        # Example: Validate that products exist if creation is not allowed.
-        # from your_app.models import Product  <-- ensure you import your Product model
-        for purchase in parsed_purchases:
-            product_name = purchase['product_name']
-            try:
-                # Replace this with your actual product lookup logic.
-                Product.objects.get(name__iexact=product_name)
-            except Product.DoesNotExist:
-                if not create_missing_products:
-                    raise ValidationError(f"Product '{product_name}' not found.")
+        if not create_missing_products:
+            validate_products_exist(parsed_purchases)
         return cleaned_data
+
+
+class SaleUploadItemForm(forms.Form):
+    product = forms.UUIDField()
+    quantity = forms.DecimalField(max_digits=15, decimal_places=3, min_value=Decimal('0.001'))
+    unit_price = forms.DecimalField(max_digits=15, decimal_places=6, min_value=0)
+
+
+class SaleUploadForm(forms.Form):
+    id = forms.UUIDField()
+    date = forms.DateTimeField()
+    notes = forms.CharField(required=False)
+
+
+def clean_sale_upload(data):
+    """
+    Validate the JSON body of a POS sale upload, `{"sales": [{"id", "date",
+    "notes", "items": [{"product", "quantity", "unit_price"}]}]}`, looking up
+    every product with one query.
+
+    :return: The sales with their items' products resolved, for
+        `upload_sales`, and the errors of every invalid sale as
+        `{position in the upload: {field: [messages]}}`.
+    """
+    from inventory.models import Product
+
+    if not isinstance(data, dict) or not isinstance(data.get('sales'), list):
+        return [], {'sales': ["Expected an object with a list of sales."]}
+
+    sales, errors = {}, {}
+    for index, raw in enumerate(data['sales']):
+        raw = raw if isinstance(raw, dict) else {}
+        form = SaleUploadForm(raw)
+        raw_items = raw.get('items') if isinstance(raw.get('items'), list) else []
+        item_forms = [SaleUploadItemForm(item if isinstance(item, dict) else {}) for item in raw_items]
+
+        sale_errors = {field: list(messages) for field, messages in form.errors.items()}
+        if not item_forms:
+            sale_errors['items'] = ["A sale needs a list of items."]
+        for position, item in enumerate(item_forms):
+            sale_errors.update(
+                (f'items.{position}.{field}', list(messages)) for field, messages in item.errors.items()
+            )
+        if sale_errors:
+            errors[index] = sale_errors
+            continue
+        sales[index] = {**form.cleaned_data, 'items': [item.cleaned_data for item in item_forms]}
+
+    products = Product.objects.in_bulk({item['product'] for sale in sales.values() for item in sale['items']})
+    for index, sale in sales.items():
+        missing = [str(item['product']) for item in sale['items'] if item['product'] not in products]
+        if missing:
+            errors[index] = {'items': [f"Product '{pk}' not found." for pk in missing]}
+        for item in sale['items']:
+            item['product'] = products.get(item['product'])
+
+    return list(sales.values()), errors
@@ -0,0 +1,198 @@
+from logging import getLogger
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from inventory import cache
+from inventory.fifo import FifoAllocator
+from inventory.models import (
+    BatchMovement, CashCheckpoint, DataVersion, Product, ProductDailySnapshot, PurchaseItem, Sale, SaleItem, StockBatch,
+    StockLedgerEntry, StockMovement, StockValuation, SyncChange, Transaction,
+)
+
+logger = getLogger(__name__)
+
+
+def find_products(names):
+    """
+    Look up the products matching `names`, ignoring case, with one query.
+
+    :return: `{lowercased name: product}`
+    """
+    lowered = {name.lower() for name in names}
+    products = Product.objects.annotate(lower_name=Lower('name')).filter(lower_name__in=lowered)
+    return {product.lower_name: product for product in products}
+
+
+def resolve_products(lines, defaults=None):
+    """
+    Map the `product_name` of every line to its product, creating the
+    missing ones with `defaults(line)` in one `bulk_create`. Names without a
+    product are left out when `defaults` is not given.
+
+    :return: `{lowercased name: product}`
+    """
+    products = find_products(line['product_name'] for line in lines)
+    if defaults is not None:
+        missing = {}
+        for line in lines:
+            key = line['product_name'].lower()
+            if key not in products and key not in missing:
+                missing[key] = Product(name=line['product_name'], **defaults(line))
+        Product.objects.bulk_create(missing.values())
+        SyncChange.objects.record(product.pk for product in missing.values())
+        products.update(missing)
+    return products
+
+
+class LineIngestion:
+    """
+    Records the lines of a pasted purchase or sale in bulk.
+
+    Line items and the stock movements, batches, batch movements and
+    transactions their save signals would create are built in memory and
+    written with one `bulk_create` per table. The stock ledger, daily
+    snapshots and cached product metrics are then updated once for the whole
+    set instead of once per row.
+    """
+
+    def __init__(self):
+        self.stock_movements = []
+        self.transactions = []
+        self.snapshot_keys = set()
+
+    @transaction.atomic
+    def purchase(self, purchase, lines):
+        """
+        Record `lines` of `{'product', 'quantity', 'unit_cost'}` on `purchase`.
+        """
+        items = PurchaseItem.objects.bulk_create(
+            PurchaseItem(purchase=purchase, product=line['product'], quantity=line['quantity'], unit_cost=line['unit_cost'])
+            for line in lines
+        )
+        content_type = ContentType.objects.get_for_model(PurchaseItem)
+        batches, batch_movements = [], []
+        for item in items:
+            if item.quantity <= 0:
+                continue
+            self.stock_movements.append(StockMovement(
+                content_type=content_type, object_id=item.id, product=item.product,
+                movement_type='IN', quantity=item.quantity, date=purchase.date,
+            ))
+            batch = StockBatch(
+                content_type=content_type, object_id=item.id, date_received=purchase.date,
+                product=item.product, quantity=item.quantity, unit_cost=item.unit_cost,
+            )
+            batches.append(batch)
+            batch_movements.append(BatchMovement(
+                content_type=content_type, object_id=item.id, batch=batch,
+                movement_type=BatchMovement.MovementType.IN, quantity=item.quantity, date=purchase.date,
+                unit_cost=item.unit_cost,
+                description=f"Creation of {item.quantity} {item.product.unit} {item.product.name}",
+            ))
+            if not purchase.is_initial_stock:
+                self.transactions.append(Transaction(
+                    content_type=content_type, object_id=item.id, date=purchase.date,
+                    transaction_type='PURCHASE', amount=item.line_total,
+                ))
+            self.snapshot_keys.add((item.product_id, purchase.date))
+
+        StockBatch.objects.bulk_create(batches, batch_size=1000)
+        BatchMovement.objects.bulk_create(batch_movements, batch_size=1000)
+        self.finish()
+        return items
+
+    def sale(self, sale, lines):
+        """
+        Record `lines` of `{'product', 'quantity', 'unit_price'}` on `sale`,
+        allocating them to stock batches oldest first.
+        """
+        return self.sales([(sale, lines)])
+
+    @transaction.atomic
+    def sales(self, sales):
+        """
+        Record the lines of every `(sale, lines)` pair in `sales`, with one
+        FIFO allocation pass over all of them in date order.
+
+        :return: The created sale items.
+        """
+        sales = sorted(sales, key=lambda pair: pair[0].date)
+        items = SaleItem.objects.bulk_create(
+            (
+                SaleItem(sale=sale, product=line['product'], quantity=line['quantity'], unit_price=line['unit_price'])
+                for sale, lines in sales
+                for line in lines
+            ),
+            batch_size=1000,
+        )
+        content_type = ContentType.objects.get_for_model(SaleItem)
+        allocator = FifoAllocator()
+        allocator.load(item.product for item in items if item.quantity > 0)
+        for item in items:
+            if item.quantity <= 0:
+                continue
+            date = item.sale.date
+            self.stock_movements.append(StockMovement(
+                content_type=content_type, object_id=item.id, product=item.product,
+                movement_type='OUT', quantity=item.quantity, date=date,
+            ))
+            self.transactions.append(Transaction(
+                content_type=content_type, object_id=item.id, date=date,
+                transaction_type='SALE', amount=item.line_total,
+            ))
+            self.snapshot_keys.add((item.product_id, date))
+            if allocator.allocate(item.product, item.quantity, item, date) > 0:
+                logger.error(f"Error consuming product {item.product}: insufficient stock for {item}")
+
+        # Batch movements count towards the later of their own and their batch's date
+        self.snapshot_keys.update(
+            (movement.batch.product_id, max(movement.date, movement.batch.date_received))
+            for movement in allocator.movements
+        )
+        allocator.flush()
+        self.finish()
+        return items
+
+    def finish(self):
+        """
+        Write the buffered stock movements and transactions and bring the
+        ledger, snapshots and metrics cache up to date.
+        """
+        movements = StockMovement.objects.bulk_create(self.stock_movements, batch_size=1000)
+        Transaction.objects.bulk_create(self.transactions, batch_size=1000)
+        StockLedgerEntry.objects.record_many(movements)
+        ProductDailySnapshot.objects.touch(self.snapshot_keys)
+        CashCheckpoint.objects.touch(row.date for row in self.transactions)
+        for product_id in {product_id for product_id, _ in self.snapshot_keys}:
+            cache.invalidate(product_id)
+        DataVersion.objects.bump()
+        StockValuation.objects.invalidate()
+        self.stock_movements, self.transactions, self.snapshot_keys = [], [], set()
+
+
+@transaction.atomic
+def upload_sales(sales):
+    """
+    Record sales uploaded by a POS, skipping those already recorded, so an
+    upload can be replayed safely after a lost response.
+
+    :param sales: `{'id', 'date', 'notes', 'items'}` dicts, with the
+        client-generated sale id and `items` as accepted by
+        `LineIngestion.sales`.
+    :return: The ids of the sales created and of those skipped.
+    """
+    unique = {}
+    for sale in sales:
+        unique.setdefault(sale['id'], sale)
+    existing = set(Sale.objects.filter(pk__in=unique).values_list('pk', flat=True))
+    new = [sale for pk, sale in unique.items() if pk not in existing]
+    if not new:
+        return [], sorted(existing)
+
+    created = Sale.objects.bulk_create(
+        [Sale(id=sale['id'], date=sale['date'], notes=sale['notes']) for sale in new],
+        batch_size=1000,
+    )
+    LineIngestion().sales([(sale, data['items']) for sale, data in zip(created, new)])
+    return [sale.pk for sale in created], sorted(existing)
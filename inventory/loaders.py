@@ -0,0 +1,85 @@
+from dataclasses import dataclass, field
+from decimal import Decimal
+from asgiref.sync import sync_to_async
+from django.db.models import Sum
+from strawberry.dataloader import DataLoader
+from strawberry.django.context import StrawberryDjangoContext
+
+from inventory.models import BatchMovement, Product, PurchaseItem, SaleItem
+from inventory.models.product_daily_snapshot import line_total
+
+ZERO = Decimal('0.0')
+
+
+def _totals(queryset, key, expression):
+    """
+    `{key: total}` of `expression` summed over `queryset` grouped by `key`.
+    """
+    return dict(queryset.values(key).annotate(total=Sum(expression)).values_list(key, 'total'))
+
+
+def product_metrics(keys):
+    """
+    The derived stock metrics of the products with the ids in `keys`, from
+    one query annotating all of them.
+    """
+    rows = {
+        row['pk']: row
+        for row in Product.objects.filter(pk__in=keys).annotate_metrics().values(
+            'pk', 'current_stock_level', 'current_stock_value', 'consumption_per_day', 'days_to_sell_out',
+        )
+    }
+    return [rows.get(key) for key in keys]
+
+
+def sale_totals(keys):
+    """
+    The `(total_amount, cost_of_goods_sold)` of the sales with the ids in
+    `keys`, from one query for their items and one for their movements.
+    """
+    amounts = _totals(SaleItem.objects.filter(sale__in=keys), 'sale', line_total('quantity', 'unit_price'))
+    costs = _totals(
+        BatchMovement.objects.filter(sale_item__sale__in=keys),
+        'sale_item__sale',
+        line_total('quantity', 'unit_cost'),
+    )
+    return [(amounts.get(key) or ZERO, costs.get(key) or ZERO) for key in keys]
+
+
+def purchase_totals(keys):
+    """
+    The total amount of the purchases with the ids in `keys`, from one query
+    for their items.
+    """
+    amounts = _totals(PurchaseItem.objects.filter(purchase__in=keys), 'purchase', line_total('quantity', 'unit_cost'))
+    return [amounts.get(key) or ZERO for key in keys]
+
+
+def batched(load):
+    """
+    A `DataLoader` running the synchronous batch function `load` off the
+    event loop.
+    """
+    load = sync_to_async(load)
+
+    async def load_fn(keys):
+        return await load(list(keys))
+
+    return DataLoader(load_fn=load_fn)
+
+
+@dataclass
+class Loaders:
+    """
+    The data loaders of one GraphQL request. Values requested while
+    resolving the same level of a query are loaded together, and cached
+    until the end of the request.
+    """
+    product_metrics: DataLoader = field(default_factory=lambda: batched(product_metrics))
+    sale_totals: DataLoader = field(default_factory=lambda: batched(sale_totals))
+    purchase_totals: DataLoader = field(default_factory=lambda: batched(purchase_totals))
+
+
+@dataclass
+class Context(StrawberryDjangoContext):
+    loaders: Loaders = field(default_factory=Loaders)
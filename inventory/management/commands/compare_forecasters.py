@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from inventory.forecasting import compare_forecasters
+from utils.forecasting import FORECASTERS
+
+
+class Command(BaseCommand):
+    help = 'Compare the accuracy and runtime of the forecast engines on the sales history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--holdout',
+            type=int,
+            default=14,
+            help='Number of most recent days of sales each engine has to forecast',
+        )
+        parser.add_argument(
+            '--engine',
+            action='append',
+            choices=list(FORECASTERS),
+            help='Engine to compare, can be repeated (defaults to every engine)',
+        )
+
+    def handle(self, *args, **options):
+        results = compare_forecasters(holdout=options['holdout'], engines=options['engine'])
+        for engine, result in results.items():
+            mae = f"{result['mae']:.3f}" if result['mae'] is not None else '-'
+            self.stdout.write(self.style.SUCCESS(
+                f"{engine}: MAE {mae} per day over {result['products']} products in {result['seconds']:.2f}s"
+            ))
+            if result['failed']:
+                self.stdout.write(self.style.ERROR(f"{engine}: failed to forecast {result['failed']} products"))
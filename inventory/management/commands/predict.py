@@ -1,18 +1,40 @@
 from django.core.management.base import BaseCommand
 
-from inventory.models import Product
-from utils.predictor import Predictor
+from inventory.forecasting import ForecastRunner
+from inventory.models import DemandForecast
+from utils.decorators import timer
 
 
 class Command(BaseCommand):
-    help = 'Predict sales'
+    help = 'Forecast the sales of every product with demand prediction enabled and store the forecasts'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Number of processes fitting models in parallel (defaults to the number of CPUs, 1 fits in process)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=12,
+            help='Number of days to forecast ahead',
+        )
+
+    @timer
     def handle(self, *args, **options):
-        predictor = Predictor()
+        runner = ForecastRunner(workers=options['workers'], days=options['days'])
+        forecast = runner.run()
+
+        forecasts = DemandForecast.objects.select_related('product').filter(product__predict_demand=True, product__is_active=True)
+        product = None
+        for row in forecasts:
+            if row.product != product:
+                product = row.product
+                self.stdout.write(self.style.SUCCESS(f'Product: {product.name}'))
+            self.stdout.write(self.style.SUCCESS(f'{row.date.strftime("%Y-%m-%d")}: {row.quantity:.2f}'))
 
-        for product in Product.objects.filter(predict_demand=True, is_active=True):
-            forecasts = predictor.predict_sales(product)
-            self.stdout.write(self.style.SUCCESS(f'Product: {product.name}'))
-            for forecast in forecasts:
-                y = round(forecast['yhat'], 2)
-                self.stdout.write(self.style.SUCCESS(f'{forecast["ds"].strftime('%Y-%m-%d')}: {y}'))
+        self.stdout.write(self.style.SUCCESS(f'Forecast {forecast} products, {runner.reused} from unchanged models'))
+        for product in runner.failed:
+            self.stdout.write(self.style.ERROR(f'Failed to forecast {product.name}'))
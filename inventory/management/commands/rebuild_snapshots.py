@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from inventory.models import ProductDailySnapshot
+from utils.decorators import timer
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily product snapshots from stock movements, sales, purchases, adjustments and conversions'
+
+    @timer
+    @transaction.atomic
+    def handle(self, *args, **options):
+        created = ProductDailySnapshot.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} daily snapshots'))
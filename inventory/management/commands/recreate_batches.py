@@ -1,12 +1,27 @@
-from django.core.management.base import BaseCommand
+import uuid
+from django.core.management.base import BaseCommand, CommandError
 
-from inventory.models import StockAdjustment, StockBatch, SaleItem, PurchaseItem, StockConversion, BatchMovement, StockMovement
+from inventory.models import Product, StockAdjustment, StockBatch, SaleItem, PurchaseItem, StockConversion, BatchMovement, ProductDailySnapshot, StockLedgerEntry, StockMovement
+from inventory.replay import HistoryReplay
 from utils.decorators import timer
 
 
 class Command(BaseCommand):
     help = 'Recreate transactions based on stock movements'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--replay',
+            action='store_true',
+            help='Replay history in memory and bulk-insert the results instead of re-saving every row.',
+        )
+        parser.add_argument(
+            '--product',
+            type=str,
+            help='Name or id of a single product to rebuild (replay mode only).',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
     @timer
     def save_purchase_items(self):
         for item in PurchaseItem.objects.all():
@@ -27,18 +42,33 @@ class Command(BaseCommand):
         for item in SaleItem.objects.all():
             item.save()
 
+    def get_product(self, value):
+        try:
+            lookup = {'pk': uuid.UUID(value)}
+        except ValueError:
+            lookup = {'name__iexact': value}
+
+        try:
+            return Product.objects.get(**lookup)
+        except Product.DoesNotExist:
+            raise CommandError(f'Product {value} not found')
+
+    def progress(self, replayed, total):
+        self.stdout.write(f'Replayed {replayed}/{total} rows')
+
     @timer
-    def handle(self, *args, **options):
-        """
-        Deletes all existing stock batches and then recreates them by saving
-        all purchase items, stock adjustments, stock conversions, and sale items.
-        Finally, outputs a success message indicating the completion of the batch
-        recreation process.
-        """
+    def replay(self, products, chunk_size):
+        replay = HistoryReplay(products=products, chunk_size=chunk_size, progress=self.progress)
+        replayed = replay.run()
+        self.stdout.write(self.style.SUCCESS(f'Replayed {replayed} rows'))
+        if replay.shortfalls:
+            self.stdout.write(self.style.WARNING(f'{replay.shortfalls} rows could not be fully allocated to batches'))
 
+    def resave(self):
         batches_count = StockBatch.objects.count()
         self.stdout.write(self.style.SUCCESS(f'Found {batches_count} stock batches'))
         StockBatch.objects.all().delete()
+        StockLedgerEntry.objects.all().delete()
         StockMovement.objects.all().delete()
 
         purchase_item_count = PurchaseItem.objects.count()
@@ -55,6 +85,25 @@ class Command(BaseCommand):
         self.save_stock_adjustments()
         self.save_stock_conversions()
         self.save_sale_items()
+        ProductDailySnapshot.objects.rebuild()
+
+    @timer
+    def handle(self, *args, **options):
+        """
+        Deletes all existing stock batches and then recreates them, either by
+        saving all purchase items, stock adjustments, stock conversions, and
+        sale items, or with `--replay` by replaying them in date order without
+        going through the save signals. Finally, outputs a success message
+        indicating the completion of the batch recreation process.
+        """
+        if options['product'] and not options['replay']:
+            raise CommandError('--product requires --replay')
+
+        if options['replay']:
+            products = [self.get_product(options['product'])] if options['product'] else None
+            self.replay(products, options['chunk_size'])
+        else:
+            self.resave()
 
         batches_count = StockBatch.objects.count()
         self.stdout.write(self.style.SUCCESS(f'Recreated {batches_count} stock batches'))
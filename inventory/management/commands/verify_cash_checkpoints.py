@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from inventory.models import CashCheckpoint
+from utils.decorators import timer
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily cash checkpoints from every transaction and replace those that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report the checkpoints that differ, failing if any do',
+        )
+
+    @timer
+    @transaction.atomic
+    def handle(self, *args, **options):
+        expected = CashCheckpoint.objects.expected()
+        stored = {
+            day: (net_cash, closing_cash)
+            for day, net_cash, closing_cash in CashCheckpoint.objects.values_list('day', 'net_cash', 'closing_cash')
+        }
+        count = 0
+        for day in sorted(expected.keys() | stored.keys()):
+            if expected.get(day) != stored.get(day):
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"{day}: stored {stored.get(day)}, expected {expected.get(day)}")
+                count += 1
+        self.stdout.write(f'Found {count} discrepancies')
+
+        if options['check']:
+            if count:
+                raise CommandError(f'{count} cash checkpoints differ from the transactions')
+            return
+        if count:
+            created = CashCheckpoint.objects.rebuild(expected)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} cash checkpoints'))
@@ -0,0 +1,89 @@
+# Generated by Django 5.1.3 on 2026-10-17 04:41
+
+import django.db.models.deletion
+import uuid
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def backfill_ledger(apps, schema_editor):
+    StockMovement = apps.get_model("inventory", "StockMovement")
+    StockLedgerEntry = apps.get_model("inventory", "StockLedgerEntry")
+
+    entries = []
+    group = []
+    product_id, balance = None, Decimal("0.000")
+    for movement in StockMovement.objects.order_by("product_id", "date").iterator(chunk_size=2000):
+        if movement.product_id != product_id:
+            product_id, balance = movement.product_id, Decimal("0.000")
+            group = []
+        elif group and group[-1].date != movement.date:
+            group = []
+        quantity = movement.quantity if movement.movement_type == "IN" else -movement.quantity
+        balance += quantity
+        entry = StockLedgerEntry(
+            id=uuid.uuid4(),
+            product_id=movement.product_id,
+            movement_id=movement.id,
+            date=movement.date,
+            quantity=quantity,
+        )
+        group.append(entry)
+        entries.append(entry)
+        for entry in group:
+            entry.balance = balance
+    StockLedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0055_alter_batchmovement_object_id_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockLedgerEntry",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("date", models.DateTimeField()),
+                ("quantity", models.DecimalField(decimal_places=3, max_digits=15)),
+                ("balance", models.DecimalField(decimal_places=3, max_digits=15)),
+                (
+                    "movement",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ledger_entry",
+                        to="inventory.stockmovement",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ledger_entries",
+                        to="inventory.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Stock Ledger Entries",
+                "ordering": ["product", "date"],
+                "indexes": [
+                    models.Index(
+                        fields=["product", "date"],
+                        name="inventory_s_product_c12474_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
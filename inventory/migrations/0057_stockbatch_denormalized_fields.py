@@ -0,0 +1,71 @@
+# Generated by Django 5.1.3 on 2026-10-17 04:49
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_stock_batches(apps, schema_editor):
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    StockBatch = apps.get_model("inventory", "StockBatch")
+
+    linked = (
+        ("purchaseitem", "product"),
+        ("stockadjustment", "product"),
+        ("stockconversion", "to_product"),
+    )
+    for model_name, product_field in linked:
+        content_type = ContentType.objects.filter(app_label="inventory", model=model_name).first()
+        if content_type is None:
+            continue
+        source = apps.get_model("inventory", model_name).objects.filter(pk=OuterRef("object_id"))
+        StockBatch.objects.filter(content_type=content_type).update(
+            product=Subquery(source.values(product_field)[:1]),
+            quantity=Subquery(source.values("quantity")[:1]),
+            unit_cost=Subquery(source.values("unit_cost")[:1]),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("inventory", "0056_stockledgerentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="stockbatch",
+            name="product",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="stock_batches",
+                to="inventory.product",
+            ),
+        ),
+        migrations.AddField(
+            model_name="stockbatch",
+            name="quantity",
+            field=models.DecimalField(
+                decimal_places=3, default=Decimal("0.0"), max_digits=15
+            ),
+        ),
+        migrations.AddField(
+            model_name="stockbatch",
+            name="unit_cost",
+            field=models.DecimalField(
+                decimal_places=6, default=Decimal("0.0"), max_digits=15
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stockbatch",
+            index=models.Index(
+                fields=["product", "date_received"],
+                name="inventory_s_product_293fbd_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_stock_batches, migrations.RunPython.noop),
+    ]
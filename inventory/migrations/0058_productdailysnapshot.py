@@ -0,0 +1,247 @@
+# Generated by Django 5.1.3 on 2026-10-17 04:54
+
+import django.db.models.deletion
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+FLOWS = (
+    "quantity_in", "quantity_out", "quantity_sold", "quantity_purchased", "quantity_adjusted",
+    "quantity_converted_from", "quantity_converted_to", "value_in", "value_out", "sales_value",
+    "purchases_value", "value_converted_from", "value_converted_to", "unit_price_total", "sale_count",
+)
+
+
+def line_total(quantity, price):
+    return ExpressionWrapper(F(quantity) * F(price), output_field=DecimalField(max_digits=20, decimal_places=6))
+
+
+def backfill_snapshots(apps, schema_editor):
+    def objects(model_name):
+        return apps.get_model("inventory", model_name).objects
+
+    batch_value = line_total("quantity", "batch__unit_cost")
+    sources = (
+        (
+            objects("StockMovement").annotate(snapshot_date=F("date")), "product",
+            {
+                "quantity_in": Sum("quantity", filter=Q(movement_type="IN")),
+                "quantity_out": Sum("quantity", filter=Q(movement_type="OUT")),
+            },
+        ),
+        (
+            objects("BatchMovement").annotate(snapshot_date=Greatest("date", "batch__date_received")), "batch__product",
+            {
+                "value_in": Sum(batch_value, filter=Q(movement_type="IN")),
+                "value_out": Sum(batch_value, filter=Q(movement_type="OUT")),
+            },
+        ),
+        (
+            objects("SaleItem").annotate(snapshot_date=F("sale__date")), "product",
+            {
+                "quantity_sold": Sum("quantity"),
+                "sales_value": Sum(line_total("quantity", "unit_price")),
+                "sale_count": Count("id"),
+                "unit_price_total": Sum("unit_price"),
+            },
+        ),
+        (
+            objects("PurchaseItem").annotate(snapshot_date=F("purchase__date")), "product",
+            {
+                "quantity_purchased": Sum("quantity"),
+                "purchases_value": Sum(line_total("quantity", "unit_cost")),
+            },
+        ),
+        (
+            objects("StockAdjustment").annotate(snapshot_date=F("date")), "product",
+            {"quantity_adjusted": Sum("quantity")},
+        ),
+        (
+            objects("StockConversion").annotate(snapshot_date=F("date")), "from_product",
+            {
+                "quantity_converted_from": Sum("quantity"),
+                "value_converted_from": Sum(line_total("quantity", "unit_cost")),
+            },
+        ),
+        (
+            objects("StockConversion").annotate(snapshot_date=F("date")), "to_product",
+            {
+                "quantity_converted_to": Sum("quantity"),
+                "value_converted_to": Sum(line_total("quantity", "unit_cost")),
+            },
+        ),
+    )
+
+    totals = defaultdict(lambda: dict.fromkeys(FLOWS, Decimal("0.0")))
+    for queryset, product, aggregates in sources:
+        rows = (
+            queryset
+            .annotate(snapshot_day=TruncDate("snapshot_date", tzinfo=timezone.get_current_timezone()))
+            .order_by()
+            .values(product, "snapshot_day")
+            .annotate(**aggregates)
+            .values(product, "snapshot_day", *aggregates)
+        )
+        for row in rows:
+            key = (row.pop(product), row.pop("snapshot_day"))
+            for name, value in row.items():
+                totals[key][name] += Decimal(value or 0)
+
+    ProductDailySnapshot = apps.get_model("inventory", "ProductDailySnapshot")
+    snapshots = []
+    product_id, quantity, value = None, Decimal("0.0"), Decimal("0.0")
+    for (key, day), flows in sorted(totals.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+        if key != product_id:
+            product_id, quantity, value = key, Decimal("0.0"), Decimal("0.0")
+        if key is None or not any(flows.values()):
+            continue
+        quantity += flows["quantity_in"] - flows["quantity_out"]
+        value += flows["value_in"] - flows["value_out"]
+        snapshots.append(ProductDailySnapshot(
+            product_id=key, day=day, closing_quantity=quantity, closing_value=value, **flows,
+        ))
+    ProductDailySnapshot.objects.bulk_create(snapshots, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0057_stockbatch_denormalized_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductDailySnapshot",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "closing_quantity",
+                    models.DecimalField(
+                        decimal_places=6, default=Decimal("0.0"), max_digits=20
+                    ),
+                ),
+                (
+                    "closing_value",
+                    models.DecimalField(
+                        decimal_places=6, default=Decimal("0.0"), max_digits=20
+                    ),
+                ),
+                (
+                    "quantity_in",
+                    models.DecimalField(
+                        decimal_places=6, default=Decimal("0.0"), max_digits=20
+                    ),
+                ),
+                (
+                    "value_in",
+                    models.DecimalField(
+                        decimal_places=6, default=Decimal("0.0"), max_digits=20
+                    ),
+                ),
+                (
+                    "quantity_out",
+                    models.DecimalField(
+                        decimal_places=6, default=Decimal("0.0"), max_digits=20
+                    ),
+                ),
+                (
+                    "value_out",
+                    models.DecimalField(
+                        decimal_places=6, default=Decimal("0.0"), max_digits=20
+                    ),
+                ),
+                (
+                    "quantity_sold",
+                    models.DecimalField(
+                        decimal_places=6, default=Decimal("0.0"), max_digits=20
+                    ),
+                ),
+                (
+                    "sales_value",
+                    models.DecimalField(
+                        decimal_places=6, default=Decimal("0.0"), max_digits=20
+                    ),
+                ),
+                ("sale_count", models.PositiveIntegerField(default=0)),
+                (
+                    "unit_price_total",
+                    models.DecimalField(
+                        decimal_places=6, default=Decimal("0.0"), max_digits=20
+                    ),
+                ),
+                (
+                    "quantity_purchased",
+                    models.DecimalField(
+                        decimal_places=6, default=Decimal("0.0"), max_digits=20
+                    ),
+                ),
+                (
+                    "purchases_value",
+                    models.DecimalField(
+                        decimal_places=6, default=Decimal("0.0"), max_digits=20
+                    ),
+                ),
+                (
+                    "quantity_adjusted",
+                    models.DecimalField(
+                        decimal_places=6, default=Decimal("0.0"), max_digits=20
+                    ),
+                ),
+                (
+                    "quantity_converted_from",
+                    models.DecimalField(
+                        decimal_places=6, default=Decimal("0.0"), max_digits=20
+                    ),
+                ),
+                (
+                    "value_converted_from",
+                    models.DecimalField(
+                        decimal_places=6, default=Decimal("0.0"), max_digits=20
+                    ),
+                ),
+                (
+                    "quantity_converted_to",
+                    models.DecimalField(
+                        decimal_places=6, default=Decimal("0.0"), max_digits=20
+                    ),
+                ),
+                (
+                    "value_converted_to",
+                    models.DecimalField(
+                        decimal_places=6, default=Decimal("0.0"), max_digits=20
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_snapshots",
+                        to="inventory.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Product Daily Snapshots",
+                "ordering": ["product", "day"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product", "day"), name="unique_product_day_snapshot"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.1.3 on 2026-10-17 05:06
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0058_productdailysnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DataVersion",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("value", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ReportArtifact",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("INCOME_STATEMENT", "Income Statement"),
+                            ("MOVEMENT_REPORT", "Inventory Movement Report"),
+                            ("PROFITABILITY_REPORT", "Profitability Report"),
+                            ("PRODUCT_REPORT", "Product Report"),
+                            ("SUGGESTED_BUDGET", "Suggested Budget"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                ("object_id", models.UUIDField(blank=True, null=True)),
+                ("open_date", models.DateTimeField(blank=True, null=True)),
+                ("close_date", models.DateTimeField(blank=True, null=True)),
+                ("data_version", models.PositiveBigIntegerField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("RUNNING", "Running"),
+                            ("DONE", "Done"),
+                            ("FAILED", "Failed"),
+                        ],
+                        default="PENDING",
+                        max_length=10,
+                    ),
+                ),
+                ("file", models.FileField(blank=True, upload_to="reports/")),
+                ("filename", models.CharField(blank=True, max_length=255)),
+                ("error", models.TextField(blank=True)),
+                ("task_id", models.CharField(blank=True, max_length=64)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["kind", "object_id", "data_version"],
+                        name="inventory_r_kind_da7384_idx",
+                    )
+                ],
+            },
+        ),
+    ]
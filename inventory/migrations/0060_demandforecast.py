@@ -0,0 +1,56 @@
+# Generated by Django 5.1.3 on 2026-10-17 05:08
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0059_report_artifact"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DemandForecast",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("quantity", models.DecimalField(decimal_places=3, max_digits=15)),
+                (
+                    "quantity_lower",
+                    models.DecimalField(decimal_places=3, max_digits=15),
+                ),
+                (
+                    "quantity_upper",
+                    models.DecimalField(decimal_places=3, max_digits=15),
+                ),
+                ("generated_at", models.DateTimeField()),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="demand_forecasts",
+                        to="inventory.product",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["product", "date"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product", "date"), name="unique_product_forecast_date"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.3 on 2026-10-17 05:10
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0060_demandforecast"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ForecastModel",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("fingerprint", models.CharField(max_length=64)),
+                (
+                    "watermark",
+                    models.DateTimeField(
+                        help_text="Date of the latest sale the model was trained on"
+                    ),
+                ),
+                ("observations", models.PositiveIntegerField()),
+                ("model_json", models.TextField()),
+                ("size", models.PositiveIntegerField()),
+                ("trained_at", models.DateTimeField()),
+                ("last_used_at", models.DateTimeField()),
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="forecast_model",
+                        to="inventory.product",
+                    ),
+                ),
+            ],
+        ),
+    ]
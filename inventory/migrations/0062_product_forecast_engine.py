@@ -0,0 +1,26 @@
+# Generated by Django 5.1.3 on 2026-10-17 05:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0061_forecastmodel"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="forecast_engine",
+            field=models.CharField(
+                choices=[
+                    ("prophet", "Prophet"),
+                    ("smoothing", "Exponential smoothing"),
+                ],
+                default="prophet",
+                help_text="Prophet fits trends and seasonality, smoothing is much faster for slow-moving products",
+                max_length=20,
+            ),
+        ),
+    ]
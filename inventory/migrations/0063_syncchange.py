@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-17 05:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0062_product_forecast_engine"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SyncChange",
+            fields=[
+                ("sequence", models.BigAutoField(primary_key=True, serialize=False)),
+                ("product_id", models.UUIDField()),
+                ("deleted", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["created_at"], name="inventory_s_created_96258a_idx"
+                    )
+                ],
+            },
+        ),
+    ]
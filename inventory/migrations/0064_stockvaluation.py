@@ -0,0 +1,43 @@
+# Generated by Django 5.1.3 on 2026-10-17 05:28
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0063_syncchange"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockValuation",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("date", models.DateTimeField()),
+                ("data_version", models.PositiveBigIntegerField()),
+                (
+                    "balances",
+                    models.JSONField(help_text="{product_id: [quantity, value]}"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("date", "data_version"),
+                        name="unique_stock_valuation_version",
+                    )
+                ],
+            },
+        ),
+    ]
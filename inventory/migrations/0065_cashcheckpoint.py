@@ -0,0 +1,78 @@
+# Generated by Django 5.1.3 on 2026-10-17 05:36
+
+import uuid
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def backfill_checkpoints(apps, schema_editor):
+    Transaction = apps.get_model("inventory", "Transaction")
+    CashCheckpoint = apps.get_model("inventory", "CashCheckpoint")
+
+    signed_amount = Case(
+        When(transaction_type="SALE", then=F("amount")),
+        When(transaction_type="PURCHASE", then=-F("amount")),
+        When(transaction_type="EXPENSE", then=-F("amount")),
+        When(transaction_type="ADJUSTMENT", then=F("amount")),
+        default=Value(0),
+        output_field=DecimalField(max_digits=15, decimal_places=2),
+    )
+    days = (
+        Transaction.objects
+        .annotate(day=TruncDate("date", tzinfo=timezone.get_current_timezone()))
+        .order_by()
+        .values("day")
+        .annotate(net=Sum(signed_amount))
+        .order_by("day")
+        .values_list("day", "net")
+    )
+    checkpoints, closing_cash = [], Decimal("0.00")
+    for day, net in days:
+        net = net or Decimal("0.00")
+        closing_cash += net
+        checkpoints.append(CashCheckpoint(day=day, net_cash=net, closing_cash=closing_cash))
+    CashCheckpoint.objects.bulk_create(checkpoints, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0064_stockvaluation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CashCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("day", models.DateField(unique=True)),
+                (
+                    "net_cash",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=15
+                    ),
+                ),
+                (
+                    "closing_cash",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=15
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["day"],
+            },
+        ),
+        migrations.RunPython(backfill_checkpoints, migrations.RunPython.noop),
+    ]
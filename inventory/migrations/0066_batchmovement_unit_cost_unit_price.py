@@ -0,0 +1,47 @@
+# Generated by Django 5.1.3 on 2026-10-17 05:41
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_batch_movements(apps, schema_editor):
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    BatchMovement = apps.get_model("inventory", "BatchMovement")
+    StockBatch = apps.get_model("inventory", "StockBatch")
+    SaleItem = apps.get_model("inventory", "SaleItem")
+
+    BatchMovement.objects.update(
+        unit_cost=Subquery(StockBatch.objects.filter(pk=OuterRef("batch")).values("unit_cost")[:1]),
+    )
+    content_type = ContentType.objects.filter(app_label="inventory", model="saleitem").first()
+    if content_type is not None:
+        BatchMovement.objects.filter(content_type=content_type, movement_type="OUT").update(
+            unit_price=Subquery(SaleItem.objects.filter(pk=OuterRef("object_id")).values("unit_price")[:1]),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("inventory", "0065_cashcheckpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="batchmovement",
+            name="unit_cost",
+            field=models.DecimalField(
+                decimal_places=6, default=Decimal("0.0"), max_digits=15
+            ),
+        ),
+        migrations.AddField(
+            model_name="batchmovement",
+            name="unit_price",
+            field=models.DecimalField(
+                blank=True, decimal_places=6, max_digits=15, null=True
+            ),
+        ),
+        migrations.RunPython(backfill_batch_movements, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_existing_changes(apps, schema_editor):
+    SyncChange = apps.get_model("inventory", "SyncChange")
+    DataVersion = apps.get_model("inventory", "DataVersion")
+
+    SyncChange.objects.update(sequence=F("id"))
+    latest = SyncChange.objects.aggregate(latest=Max("sequence"))["latest"] or 0
+    DataVersion.objects.update_or_create(name="sync", defaults={"value": latest})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0066_batchmovement_unit_cost_unit_price"),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name="syncchange",
+            old_name="sequence",
+            new_name="id",
+        ),
+        migrations.AddField(
+            model_name="syncchange",
+            name="sequence",
+            field=models.PositiveBigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.RunPython(number_existing_changes, migrations.RunPython.noop),
+    ]
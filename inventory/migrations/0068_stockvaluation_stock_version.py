@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def drop_data_version_valuations(apps, schema_editor):
+    # Stored under the shared data counter, which the stock counter they are
+    # keyed on from now could reach again
+    StockValuation = apps.get_model("inventory", "StockValuation")
+    StockValuation.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0067_syncchange_commit_sequence"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_data_version_valuations, migrations.RunPython.noop),
+    ]
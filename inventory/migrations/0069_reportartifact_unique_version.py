@@ -0,0 +1,65 @@
+# Generated by Django 5.1.3 on 2026-10-17 06:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def drop_duplicate_artifacts(apps, schema_editor):
+    # Keep the latest artifact of each export and data version
+    ReportArtifact = apps.get_model("inventory", "ReportArtifact")
+    seen = set()
+    for artifact in ReportArtifact.objects.order_by("-created_at"):
+        key = (artifact.kind, artifact.object_id, artifact.open_date, artifact.close_date, artifact.data_version)
+        if key in seen:
+            artifact.file.delete(save=False)
+            artifact.delete()
+        seen.add(key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0068_stockvaluation_stock_version"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="reportartifact",
+            name="inventory_r_kind_da7384_idx",
+        ),
+        migrations.AddField(
+            model_name="reportartifact",
+            name="queued_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(drop_duplicate_artifacts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="reportartifact",
+            constraint=models.UniqueConstraint(
+                fields=("kind", "object_id", "open_date", "close_date", "data_version"),
+                name="unique_report_artifact_version",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="reportartifact",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("close_date__isnull", True), ("open_date__isnull", True)
+                ),
+                fields=("kind", "object_id", "data_version"),
+                name="unique_report_artifact_version_without_period",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="reportartifact",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("close_date__isnull", True),
+                    ("object_id__isnull", True),
+                    ("open_date__isnull", True),
+                ),
+                fields=("kind", "data_version"),
+                name="unique_report_artifact_version_without_object",
+            ),
+        ),
+    ]
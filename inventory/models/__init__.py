@@ -1,31 +1,49 @@
 from .batch_movement import BatchMovement
+from .cash_checkpoint import CashCheckpoint
+from .data_version import DataVersion
+from .demand_forecast import DemandForecast
 from .expense import Expense
+from .forecast_model import ForecastModel
 from .product import Product
+from .product_daily_snapshot import ProductDailySnapshot
 from .sale import Sale
 from .sale_line_item import SaleItem
 from .purchase import Purchase
 from .purchase_line_item import PurchaseItem
 from .stock_batch import StockBatch
 from .stock_movement import StockMovement
+from .stock_ledger_entry import StockLedgerEntry
+from .stock_valuation import StockValuation
 from .stock_adjustment import StockAdjustment
 from .stock_conversion import StockConversion
 from .transaction import Transaction
 from .report import Report
+from .report_artifact import ReportArtifact
 from .supplier import Supplier
+from .sync_change import SyncChange
 
 __all__ = [
     'BatchMovement',
+    'CashCheckpoint',
+    'DataVersion',
+    'DemandForecast',
     'Expense',
+    'ForecastModel',
     'Product',
+    'ProductDailySnapshot',
     'Sale',
     'SaleItem',
     'Purchase',
     'PurchaseItem',
     'StockBatch',
     'StockMovement',
+    'StockLedgerEntry',
+    'StockValuation',
     'StockAdjustment',
     'StockConversion',
     'Transaction',
     'Report',
+    'ReportArtifact',
     'Supplier',
+    'SyncChange',
 ]
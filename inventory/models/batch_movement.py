@@ -1,3 +1,4 @@
+from decimal import Decimal
 import uuid
 from django.db import models
 from django.utils import timezone
@@ -18,6 +19,11 @@ class BatchMovement(models.Model):
     date = models.DateTimeField(default=timezone.now)
     description = models.CharField(max_length=255, blank=True, null=True)
 
+    # Denormalized when the movement is written: the cost of its batch and,
+    # for sale consumption, the price it was sold at
+    unit_cost = models.DecimalField(max_digits=15, decimal_places=6, default=Decimal('0.0'))
+    unit_price = models.DecimalField(max_digits=15, decimal_places=6, null=True, blank=True)
+
     # GenericForeignKey fields
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
     object_id = models.UUIDField(null=True, blank=True)
@@ -33,15 +39,15 @@ class BatchMovement(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.batch.linked_object.product.name} - {self.movement_type} - {self.quantity} - {self.date.strftime('%Y-%m-%d')}"
+        return f"{self.batch.product.name} - {self.movement_type} - {self.quantity} - {self.date.strftime('%Y-%m-%d')}"
 
     @property
     def cost(self):
-        return self.quantity * self.batch.unit_cost
+        return self.quantity * self.unit_cost
 
     @property
     def revenue(self):
-        return 0  # TODO: Implement this
+        return self.quantity * self.unit_price if self.unit_price is not None else 0
 
     @property
     def profit(self):
@@ -0,0 +1,152 @@
+from datetime import timedelta
+from decimal import Decimal
+import uuid
+from django.db import models
+from django.db.models import Case, Count, DecimalField, F, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from inventory.models.product_daily_snapshot import day_start, local_day
+
+ZERO = Decimal('0.00')
+
+
+def signed_amount():
+    """
+    The amount of a transaction as it moves the cash balance: sales and
+    adjustments add to it, purchases and expenses take from it.
+    """
+    return Case(
+        When(transaction_type='SALE', then=F('amount')),
+        When(transaction_type='PURCHASE', then=-F('amount')),
+        When(transaction_type='EXPENSE', then=-F('amount')),
+        When(transaction_type='ADJUSTMENT', then=F('amount')),
+        default=Value(0),
+        output_field=DecimalField(max_digits=15, decimal_places=2)
+    )
+
+
+class CashCheckpointQuerySet(models.QuerySet):
+    def raw_cash(self, start=None, end=None):
+        """
+        Net cash of the transactions dated from `start` up to, not at, `end`
+        (either unbounded if None).
+
+        :return: `(net_cash, count)`
+        """
+        from inventory.models import Transaction
+
+        transactions = Transaction.objects.all()
+        if start is not None:
+            transactions = transactions.filter(date__gte=start)
+        if end is not None:
+            transactions = transactions.filter(date__lt=end)
+        totals = transactions.aggregate(net=Sum(signed_amount()), count=Count('id'))
+        return totals['net'] or ZERO, totals['count']
+
+    def daily_cash(self):
+        """
+        Net cash and number of transactions of every day with a transaction.
+
+        :return: `{day: (net_cash, count)}`
+        """
+        from inventory.models import Transaction
+
+        rows = (
+            Transaction.objects
+            .annotate(day=TruncDate('date', tzinfo=timezone.get_current_timezone()))
+            .order_by()
+            .values('day')
+            .annotate(net=Sum(signed_amount()), count=Count('id'))
+            .values_list('day', 'net', 'count')
+        )
+        return {day: (net or ZERO, count) for day, net, count in rows}
+
+    def closing_before(self, day):
+        """
+        Closing cash of the latest checkpoint before `day`.
+        """
+        closing = self.filter(day__lt=day).order_by('-day').values_list('closing_cash', flat=True).first()
+        return ZERO if closing is None else closing
+
+    def cash_at(self, date):
+        """
+        Cash at `date`, i.e. after every transaction before it: the closing
+        cash of the day before plus the transactions earlier that day.
+        """
+        day = local_day(date)
+        return self.closing_before(day) + self.raw_cash(day_start(day), date)[0]
+
+    def refresh(self, day):
+        """
+        Recompute the checkpoint of `day` from its transactions and shift the
+        closing cash of every later checkpoint by the change.
+        """
+        net, count = self.raw_cash(day_start(day), day_start(day + timedelta(days=1)))
+        checkpoint = self.filter(day=day).first()
+        delta = net - (checkpoint.net_cash if checkpoint else ZERO)
+        if delta:
+            self.filter(day__gt=day).update(closing_cash=F('closing_cash') + delta)
+
+        if not count:
+            if checkpoint is not None:
+                checkpoint.delete()
+            return
+        closing_cash = self.closing_before(day) + net
+        self.update_or_create(day=day, defaults={'net_cash': net, 'closing_cash': closing_cash})
+
+    def touch(self, dates):
+        """
+        Refresh the checkpoints of the days of every date in `dates`. Naive
+        dates are taken in the default timezone, as Django stores them.
+        """
+        dates = [timezone.make_aware(date) if timezone.is_naive(date) else date for date in dates]
+        for day in sorted({local_day(date) for date in dates}):
+            self.refresh(day)
+
+    def expected(self):
+        """
+        The checkpoints recomputed from every transaction.
+
+        :return: `{day: (net_cash, closing_cash)}`
+        """
+        checkpoints, closing_cash = {}, ZERO
+        for day, (net, _) in sorted(self.daily_cash().items()):
+            closing_cash += net
+            checkpoints[day] = (net, closing_cash)
+        return checkpoints
+
+    def rebuild(self, expected=None):
+        """
+        Recompute the checkpoints from scratch.
+        """
+        if expected is None:
+            expected = self.expected()
+        self.all().delete()
+        self.bulk_create(
+            [
+                self.model(day=day, net_cash=net, closing_cash=closing_cash)
+                for day, (net, closing_cash) in expected.items()
+            ],
+            batch_size=1000,
+        )
+        return len(expected)
+
+
+class CashCheckpoint(models.Model):
+    """
+    The net cash of the transactions of a day and the cash at its close.
+    Days without transactions have no row.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    day = models.DateField(unique=True)
+    net_cash = models.DecimalField(max_digits=15, decimal_places=2, default=ZERO)
+    closing_cash = models.DecimalField(max_digits=15, decimal_places=2, default=ZERO)
+
+    objects = CashCheckpointQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['day']
+
+    def __str__(self):
+        return f"{self.day} - {self.closing_cash}"
@@ -0,0 +1,45 @@
+import uuid
+from django.db import models
+from django.db.models import F
+
+
+class DataVersionQuerySet(models.QuerySet):
+    def current(self, name='data'):
+        """
+        Return the current value of the `name` counter, 0 if it was never
+        bumped.
+        """
+        return self.filter(name=name).values_list('value', flat=True).first() or 0
+
+    def locked(self, name='data'):
+        """
+        Return the current value of the `name` counter, locking its row until
+        the current transaction ends.
+        """
+        self.get_or_create(name=name)
+        return self.select_for_update().get(name=name).value
+
+    def bump(self, name='data'):
+        """
+        Increment the `name` counter inside the current transaction.
+        """
+        if not self.filter(name=name).update(value=F('value') + 1):
+            self.get_or_create(name=name)
+            self.filter(name=name).update(value=F('value') + 1)
+
+
+class DataVersion(models.Model):
+    """
+    A counter bumped whenever the data it covers changes, so results derived
+    from that data can be stored under the version they were computed at and
+    reused for as long as it stays current. Unlike the metrics cache versions,
+    it lives in the database and is shared with the task workers.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=50, unique=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    objects = DataVersionQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
@@ -0,0 +1,53 @@
+from decimal import Decimal
+import uuid
+from django.db import models, transaction
+from django.utils import timezone
+
+
+class DemandForecastQuerySet(models.QuerySet):
+    @transaction.atomic
+    def replace(self, product, records):
+        """
+        Replace the stored forecast of `product` with forecaster `records` of
+        `{'ds', 'yhat', 'yhat_lower', 'yhat_upper'}`. Of several records on
+        the same day, the latest is kept.
+        """
+        generated_at = timezone.now()
+        records = {record['ds'].date(): record for record in records}
+        self.filter(product=product).delete()
+        return self.bulk_create([
+            self.model(
+                product=product,
+                date=date,
+                quantity=round(Decimal(record['yhat']), 3),
+                quantity_lower=round(Decimal(record['yhat_lower']), 3),
+                quantity_upper=round(Decimal(record['yhat_upper']), 3),
+                generated_at=generated_at,
+            )
+            for date, record in records.items()
+        ])
+
+
+class DemandForecast(models.Model):
+    """
+    Daily sales quantities of a product predicted by the forecasting runner,
+    covering its sales history and the days ahead.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    product = models.ForeignKey('inventory.Product', related_name='demand_forecasts', on_delete=models.CASCADE)
+    date = models.DateField()
+    quantity = models.DecimalField(max_digits=15, decimal_places=3)
+    quantity_lower = models.DecimalField(max_digits=15, decimal_places=3)
+    quantity_upper = models.DecimalField(max_digits=15, decimal_places=3)
+    generated_at = models.DateTimeField()
+
+    objects = DemandForecastQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['product', 'date']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'date'], name='unique_product_forecast_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.date.strftime('%Y-%m-%d')} - {self.quantity}"
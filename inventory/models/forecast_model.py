@@ -0,0 +1,78 @@
+from datetime import timezone as dt_timezone
+import uuid
+from django.db import models
+from django.utils import timezone
+
+
+class ForecastModelQuerySet(models.QuerySet):
+    def cached(self, products):
+        """
+        Return `{product_id: (fingerprint, model_json)}` of the stored models
+        of `products`, marking them as used.
+        """
+        stored = self.filter(product__in=products)
+        cached = {
+            product_id: (digest, model_json)
+            for product_id, digest, model_json in stored.values_list('product_id', 'fingerprint', 'model_json')
+        }
+        stored.update(last_used_at=timezone.now())
+        return cached
+
+    def store(self, product, df, fitted):
+        """
+        Store the `(fingerprint, model_json)` fitted to the sales frame `df`
+        of `product`.
+        """
+        digest, model_json = fitted
+        now = timezone.now()
+        return self.update_or_create(product=product, defaults=dict(
+            fingerprint=digest,
+            model_json=model_json,
+            size=len(model_json),
+            observations=int(df['y'].count()),
+            # Frames hold naive UTC datetimes
+            watermark=df['ds'].max().to_pydatetime().replace(tzinfo=dt_timezone.utc),
+            trained_at=now,
+            last_used_at=now,
+        ))[0]
+
+    def evict(self, max_age=None, max_count=None, max_size=None):
+        """
+        Delete the models trained longer than `max_age` ago, then the least
+        recently used ones beyond `max_count` models or `max_size` bytes in
+        total.
+
+        :return: The number of models deleted.
+        """
+        evicted = []
+        if max_age is not None:
+            evicted.extend(self.filter(trained_at__lt=timezone.now() - max_age).values_list('id', flat=True))
+
+        count, size = 0, 0
+        for pk, model_size in self.exclude(id__in=evicted).order_by('-last_used_at').values_list('id', 'size'):
+            count, size = count + 1, size + model_size
+            if (max_count is not None and count > max_count) or (max_size is not None and size > max_size):
+                evicted.append(pk)
+        return self.filter(id__in=evicted).delete()[0]
+
+
+class ForecastModel(models.Model):
+    """
+    The serialized Prophet model last fitted to a product's sales, with the
+    watermark of the data it was trained on, so forecasts can reuse it while
+    the sales are unchanged and warm start the refit when new sales arrive.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    product = models.OneToOneField('inventory.Product', related_name='forecast_model', on_delete=models.CASCADE)
+    fingerprint = models.CharField(max_length=64)
+    watermark = models.DateTimeField(help_text='Date of the latest sale the model was trained on')
+    observations = models.PositiveIntegerField()
+    model_json = models.TextField()
+    size = models.PositiveIntegerField()
+    trained_at = models.DateTimeField()
+    last_used_at = models.DateTimeField()
+
+    objects = ForecastModelQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.product.name} - {self.watermark.strftime('%Y-%m-%d')}"
@@ -4,14 +4,154 @@ import math
 import uuid
 from django.db import models
 from django.utils import timezone
-from django.db.models import Sum, F, DecimalField, ExpressionWrapper, Q, Count, Case, When, Value, QuerySet
-from django.db.models.functions import Coalesce
+from django.db.models import (
+    Avg, Case, DecimalField, ExpressionWrapper, F, Func, OuterRef, QuerySet, Subquery, Sum, Value, When, Window,
+)
+from django.db.models.functions import Coalesce, Greatest, RowNumber
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.utils.functional import cached_property
 
+from inventory.cache import cached_metric
+
+
+def _decimal(max_digits=15, decimal_places=3):
+    return DecimalField(max_digits=max_digits, decimal_places=decimal_places)
+
+
+def _sum_subquery(queryset, expression, output_field):
+    """
+    Correlated subquery summing `expression` over `queryset`, or 0.
+    """
+    return Coalesce(
+        Subquery(
+            queryset.order_by().values(total=Func(expression, function='SUM'))[:1],
+            output_field=output_field,
+        ),
+        Value(Decimal('0.0')),
+        output_field=output_field,
+    )
+
+
+def _divide(numerator, denominator):
+    """
+    `numerator / denominator` as a decimal division. SQLite would otherwise
+    divide integer valued sums with integer division.
+    """
+    return Func(numerator, denominator, template='(%(expressions)s)', arg_joiner=' * 1.0 / ', output_field=_decimal(20, 6))
+
+
+class ProductQuerySet(models.QuerySet):
+    def annotate_metrics(self):
+        """
+        Annotate the queryset with the derived stock metrics as correlated
+        subqueries, so a list of products costs a single query and can be
+        sorted by any of them.
+
+        The annotations mirror the properties of the same meaning:
+        - `current_stock_level`: `stock_level`
+        - `batch_stock_level`: `batch_based_stock_level`
+        - `current_stock_value`: `stock_value`
+        - `remaining_unit_cost`: `average_unit_cost`
+        - `consumption_per_day`: `average_consumption`
+        - `days_to_sell_out`: `days_until_stockout`
+        - `gross_profit_per_day`: `average_gross_profit`
+        """
+        from inventory.models import BatchMovement, SaleItem, StockLedgerEntry
+
+        now = timezone.now()
+        signed_quantity = Case(
+            When(movement_type=BatchMovement.MovementType.OUT, then=-F('quantity')),
+            default=F('quantity'),
+        )
+        signed_value = ExpressionWrapper(signed_quantity * F('unit_cost'), output_field=_decimal(20, 6))
+        batch_movements = BatchMovement.objects.filter(batch__product=OuterRef('pk'))
+
+        stock_before_sale = Coalesce(
+            Subquery(
+                StockLedgerEntry.objects
+                .filter(product=OuterRef('product'), date__lt=OuterRef('sale__date'))
+                .order_by('-date')
+                .values('balance')[:1]
+            ),
+            Value(Decimal('0.0')),
+            output_field=_decimal(),
+        )
+        latest_in_stock_sales = (
+            SaleItem.objects
+            .filter(product=OuterRef(OuterRef('pk')))
+            .annotate(stock_before_sale=stock_before_sale)
+            .filter(stock_before_sale__gte=F('quantity'))
+            .annotate(recency=Window(RowNumber(), order_by=F('sale__date').desc()))
+            .filter(recency__lte=settings.AVERAGE_INTERVAL_DAYS)
+        )
+
+        week_sales = SaleItem.objects.filter(
+            product=OuterRef('pk'),
+            sale__date__gte=now - timedelta(days=7),
+            sale__date__lte=now,
+        )
+        week_costs = BatchMovement.objects.filter(
+            content_type=ContentType.objects.get_for_model(SaleItem),
+            object_id__in=SaleItem.objects.filter(
+                product=OuterRef(OuterRef('pk')),
+                sale__date__gte=now - timedelta(days=7),
+                sale__date__lte=now,
+            ).values('id'),
+        )
+
+        return self.annotate(
+            current_stock_level=Coalesce(
+                Subquery(
+                    StockLedgerEntry.objects.filter(product=OuterRef('pk')).order_by('-date').values('balance')[:1]
+                ),
+                Value(Decimal('0.0')),
+                output_field=_decimal(),
+            ),
+            batch_stock_level=_sum_subquery(
+                batch_movements.filter(batch__date_received__lt=now), signed_quantity, _decimal(),
+            ),
+            current_stock_value=_sum_subquery(
+                batch_movements.alias(counted_at=Greatest('date', 'batch__date_received')).filter(counted_at__lt=now),
+                signed_value,
+                _decimal(20, 6),
+            ),
+            remaining_quantity=_sum_subquery(batch_movements.filter(date__lt=now), signed_quantity, _decimal()),
+            remaining_value=_sum_subquery(batch_movements.filter(date__lt=now), signed_value, _decimal(20, 6)),
+            remaining_unit_cost=Case(
+                When(remaining_quantity__gt=0, then=_divide(F('remaining_value'), F('remaining_quantity'))),
+                default=Value(Decimal('0.0')),
+                output_field=_decimal(20, 6),
+            ),
+            consumption_per_day=Coalesce(
+                Subquery(
+                    SaleItem.objects
+                    .filter(pk__in=latest_in_stock_sales.values('pk'))
+                    .values('product')
+                    .annotate(average=Avg('quantity'))
+                    .values('average')[:1]
+                ),
+                Value(Decimal('0.0')),
+                output_field=_decimal(),
+            ),
+            days_to_sell_out=Case(
+                When(consumption_per_day__gt=0, then=_divide(F('current_stock_level'), F('consumption_per_day'))),
+                default=Value(Decimal('0.0')),
+                output_field=_decimal(20, 6),
+            ),
+            gross_profit_per_day=_divide(
+                _sum_subquery(week_sales, F('quantity') * F('unit_price'), _decimal(20, 6))
+                - _sum_subquery(week_costs, F('quantity') * F('unit_cost'), _decimal(20, 6)),
+                Value(settings.AVERAGE_INTERVAL_DAYS),
+            ),
+        )
+
 
 class Product(models.Model):
+    class ForecastEngine(models.TextChoices):
+        PROPHET = 'prophet', 'Prophet'
+        SMOOTHING = 'smoothing', 'Exponential smoothing'
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     supplier = models.ForeignKey('inventory.Supplier', on_delete=models.SET_NULL, null=True, blank=True)
     name = models.CharField(max_length=255)
@@ -22,22 +162,29 @@ class Product(models.Model):
     unit = models.CharField(max_length=20, blank=True)
     batch_size = models.PositiveIntegerField(default=1)
     predict_demand = models.BooleanField(default=True)
+    forecast_engine = models.CharField(
+        max_length=20,
+        choices=ForecastEngine.choices,
+        default=ForecastEngine.PROPHET,
+        help_text='Prophet fits trends and seasonality, smoothing is much faster for slow-moving products',
+    )
     is_active = models.BooleanField(default=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name}"
 
     @property
     def stock_level(self):
         """
-        Calculate current stock level based on stock movements.
+        Current stock level, read from the latest row of the stock ledger.
         """
-        stock_in = self.stock_movements.filter(movement_type='IN').aggregate(total=models.Sum('quantity'))['total'] or 0
-        stock_out = self.stock_movements.filter(movement_type='OUT').aggregate(total=models.Sum('quantity'))['total'] or 0
-        return stock_in - stock_out
+        from inventory.models import StockLedgerEntry
+        return StockLedgerEntry.objects.balance_at(self)
 
     @property
     def batch_based_stock_level(self):
@@ -55,6 +202,7 @@ class Product(models.Model):
         )
 
     @property
+    @cached_metric
     def stock_value(self):
         """
         Calculate the product's stock value using DB-level aggregation.
@@ -68,97 +216,28 @@ class Product(models.Model):
 
     @cached_property
     def batches(self) -> QuerySet:
-        from inventory.models import StockAdjustment, StockConversion, PurchaseItem, StockBatch
-
-        return StockBatch.objects.filter(
-            Q(
-                content_type=ContentType.objects.get_for_model(PurchaseItem),
-                object_id__in=self.purchase_items.values_list('id', flat=True)
-            )
-            | Q(
-                content_type=ContentType.objects.get_for_model(StockAdjustment),
-                object_id__in=self.adjustments.values_list('id', flat=True)
-            )
-            | Q(
-                content_type=ContentType.objects.get_for_model(StockConversion),
-                object_id__in=self.conversions_to.values_list('id', flat=True)
-            )
-        ).order_by('date_received')
+        return self.stock_batches.order_by('date_received')
 
     @property
+    @cached_metric
     def average_consumption(self):
         """
         Compute average based on the last N in-stock SaleItems, ignoring items
-        that were partially out of stock (net_stock < item.quantity).
-        """
-        N = settings.AVERAGE_INTERVAL_DAYS
-
-        # 1. Start with all SaleItems of this product.
-        queryset = self.sale_items.all()
-
-        # 2. Annotate how much stock was available at sale time.
-        #    This is the same logic as before to figure out in-stock vs out-of-stock.
-        annotated_items = queryset.annotate(
-            stock_in=Coalesce(
-                Sum(
-                    'product__stock_movements__quantity',
-                    filter=Q(
-                        product__stock_movements__movement_type='IN',
-                        product__stock_movements__date__lt=F('sale__date')
-                    )
-                ),
-                0
-            ),
-            stock_out=Coalesce(
-                Sum(
-                    'product__stock_movements__quantity',
-                    filter=Q(
-                        product__stock_movements__movement_type='OUT',
-                        product__stock_movements__date__lt=F('sale__date')
-                    )
-                ),
-                0
-            ),
-        ).annotate(
-            net_stock=ExpressionWrapper(
-                F('stock_in') - F('stock_out'),
-                output_field=DecimalField(max_digits=15, decimal_places=2)
-            )
-        )
-
-        # 3. Filter to keep only items that were fully in stock at the time of sale.
-        #    net_stock > quantity => not limited by stock.
-        in_stock_items = (
-            annotated_items
-            .filter(net_stock__gte=F('quantity'))
-            .order_by('-sale__date')  # most recent items first
-        )
-
-        # 4. Limit to the last N items
-        last_n_items = in_stock_items[:N]
-
-        # 5. Aggregate total quantity and count.
-        aggs = last_n_items.aggregate(
-            total_quantity=Coalesce(Sum('quantity'), Decimal('0.0')),
-            total_count=Coalesce(Count('id'), 0)
-        )
-        total_quantity = aggs['total_quantity']
-        total_count = aggs['total_count']
-
-        if total_count > 0:
-            average = total_quantity / total_count
-        else:
-            average = 0
-
-        return average
+        that were partially out of stock (net_stock < item.quantity), from the
+        product's censored demand series.
+        """
+        from inventory.demand import average_in_stock_demand, censored_demand
+        return average_in_stock_demand(censored_demand(self), settings.AVERAGE_INTERVAL_DAYS)
 
     @property
+    @cached_metric
     def days_until_stockout(self):
         if self.average_consumption:
             return self.stock_level / self.average_consumption
         return 0
 
     @property
+    @cached_metric
     def reorder_quantity(self):
         interval = settings.REORDER_INTERVAL_DAYS
 
@@ -193,6 +272,7 @@ class Product(models.Model):
         return 0
 
     @property
+    @cached_metric
     def average_unit_cost(self):
         """
         Returns average unit cost across non-empty batches, or 0 if none.
@@ -202,7 +282,7 @@ class Product(models.Model):
         for b in qs:
             remaining_qty = b.quantity_remaining
             total_quantity += remaining_qty
-            total_cost += (remaining_qty * b.linked_object.unit_cost)
+            total_cost += (remaining_qty * b.unit_cost)
 
         return total_cost / total_quantity if total_quantity > 0 else Decimal('0.0')
 
@@ -225,58 +305,41 @@ class Product(models.Model):
 
     def get_stock_level_at(self, date):
         """
-        Calculate stock level at a specific date.
+        Stock level at a specific date, i.e. the ledger balance before `date`.
         """
-        stock_in = self.stock_movements.filter(movement_type='IN', date__lt=date).aggregate(total=models.Sum('quantity'))['total'] or 0
-        stock_out = self.stock_movements.filter(movement_type='OUT', date__lt=date).aggregate(total=models.Sum('quantity'))['total'] or 0
-        return stock_in - stock_out
+        from inventory.models import StockLedgerEntry
+        return StockLedgerEntry.objects.balance_at(self, date)
+
+    def get_flows_between(self, start_date, end_date, *fields):
+        """
+        Totals of the daily snapshot `fields` between two dates.
+        """
+        from inventory.models import ProductDailySnapshot
+        return ProductDailySnapshot.objects.flows_between(start_date, end_date, [self.pk], fields)[self.pk]
 
     def get_incoming_stock_between(self, start_date, end_date):
         """
         Calculate stock increase between two dates.
         """
-        stock_in = self.stock_movements.filter(movement_type='IN', date__gte=start_date, date__lt=end_date).aggregate(total=models.Sum('quantity'))['total'] or 0
-        return stock_in
+        return self.get_flows_between(start_date, end_date, 'quantity_in')['quantity_in']
 
     def get_outgoing_stock_between(self, start_date, end_date):
         """
         Calculate stock decrease between two dates.
         """
-        stock_out = self.stock_movements.filter(movement_type='OUT', date__gte=start_date, date__lt=end_date).aggregate(total=models.Sum('quantity'))['total'] or 0
-        return stock_out
+        return self.get_flows_between(start_date, end_date, 'quantity_out')['quantity_out']
 
-    def get_stock_value_at(self, date=timezone.now()):
+    def get_stock_value_at(self, date=None):
         """
-        Calculate stock value at a specific date.
+        Calculate stock value at a specific date, from the latest daily
+        snapshot before it and the batch movements since. Valuations at a
+        given date are stored and shared by every product until the data
+        changes.
         """
-        from inventory.models.stock_batch import StockBatchQuerySet
-        from inventory.models.batch_movement import BatchMovement
-        qs: StockBatchQuerySet = self.batches
-        qs = qs.filter(date_received__lt=date)
-        qs = qs.annotate(
-            outstanding=Coalesce(
-                Sum(
-                    Case(
-                        When(
-                            movements__movement_type=BatchMovement.MovementType.IN,
-                            movements__date__lt=date,
-                            then=F('movements__quantity')),
-                        When(
-                            movements__movement_type=BatchMovement.MovementType.OUT,
-                            movements__date__lt=date,
-                            then=-F('movements__quantity')),
-                        default=Value(Decimal('0.0')),
-                    )
-                ),
-                Value(Decimal('0.0')),
-            ),
-        )
-        qs = qs.filter_empty_batches()
-        qs = qs.annotate_unit_costs()
-        qs = qs.annotate_remaining_values()
-        qs = qs.aggregate(total_value=Coalesce(Sum('batch_value'), Value(Decimal('0.0'))))
-
-        return qs['total_value'] or 0
+        from inventory.models import ProductDailySnapshot, StockValuation
+        if date is None:
+            return ProductDailySnapshot.objects.closing_at(timezone.now(), [self.pk])[self.pk]['value']
+        return StockValuation.objects.closing_at(date, [self.pk])[self.pk]['value']
 
     def is_below_minimum_stock(self):
         return self.stock_level < self.minimum_stock_level
@@ -285,31 +348,19 @@ class Product(models.Model):
         """
         Consume stock from the oldest batch(s) available.
         """
-        from inventory.models import StockBatch
-        remaining = quantity
-        while remaining > 0:
-            try:
-                batch: StockBatch = self.batches.annotate_remaining_quantities().filter(outstanding__gt=0.0001).earliest('date_received')
-            except StockBatch.DoesNotExist as e:
-                raise ValueError(f"Insufficient stock for {quantity} {self.unit} of {self.name} on {obj}")
-
-            remaining = batch.consume(remaining, obj)
+        from inventory.fifo import FifoAllocator
+        allocator = FifoAllocator()
+        remaining = allocator.allocate(self, quantity, obj)
+        allocator.flush()
 
-        if remaining > 0.001:
+        if remaining > 0:
             raise ValueError(f"Insufficient stock for {quantity} {self.unit} of {self.name} on {obj}")
 
     def get_total_purchases_between(self, start_date, end_date):
         """
         Get all purchase items between two dates.
         """
-        return self.purchase_items.filter(
-            purchase__date__range=[start_date, end_date]
-        ).annotate(
-            line_total=ExpressionWrapper(
-                F('quantity') * F('unit_cost'),
-                output_field=DecimalField(max_digits=10, decimal_places=3)
-            )
-        ).aggregate(total=models.Sum('line_total'))['total'] or 0
+        return self.get_flows_between(start_date, end_date, 'purchases_value')['purchases_value']
 
     def get_gross_profit_between(self, start_date, end_date):
         """
@@ -326,14 +377,7 @@ class Product(models.Model):
         """
         Get all sale items between two dates.
         """
-        return self.sale_items.filter(
-            sale__date__range=[start_date, end_date]
-        ).annotate(
-            line_total=ExpressionWrapper(
-                F('quantity') * F('unit_price'),
-                output_field=DecimalField(max_digits=10, decimal_places=3)
-            )
-        ).aggregate(total=models.Sum('line_total'))['total'] or 0
+        return self.get_flows_between(start_date, end_date, 'sales_value')['sales_value']
 
     def get_cost_of_goods_sold_between(self, start_date, end_date):
         """
@@ -355,60 +399,35 @@ class Product(models.Model):
         """
         Get all stock conversions in between two dates.
         """
-        return self.conversions_from.filter(
-            date__range=[start_date, end_date],
-        ).aggregate(total=models.Sum('quantity'))['total'] or 0
+        return self.get_flows_between(start_date, end_date, 'quantity_converted_from')['quantity_converted_from']
 
     def get_conversions_to_quantity_between(self, start_date, end_date):
         """
         Get all stock conversions in between two dates.
         """
-        return self.conversions_to.filter(
-            date__range=[start_date, end_date],
-        ).aggregate(total=models.Sum('quantity'))['total'] or 0
+        return self.get_flows_between(start_date, end_date, 'quantity_converted_to')['quantity_converted_to']
 
     def get_conversions_to_value_between(self, start_date, end_date):
         """
         Get all stock conversions in between two dates.
         """
-        return self.conversions_to.filter(
-            date__range=[start_date, end_date],
-        ).annotate(
-            line_total=ExpressionWrapper(
-                F('quantity') * F('unit_cost'),
-                output_field=DecimalField(max_digits=10, decimal_places=3)
-            )
-        ).aggregate(total=models.Sum('line_total'))['total'] or 0
+        return self.get_flows_between(start_date, end_date, 'value_converted_to')['value_converted_to']
 
     def get_conversions_from_value_between(self, start_date, end_date):
         """
         Get all stock conversions in between two dates.
         """
-        return self.conversions_from.filter(
-            date__range=[start_date, end_date],
-        ).annotate(
-            line_total=ExpressionWrapper(
-                F('quantity') * F('unit_cost'),
-                output_field=DecimalField(max_digits=10, decimal_places=3)
-            )
-        ).aggregate(total=models.Sum('line_total'))['total'] or 0
+        return self.get_flows_between(start_date, end_date, 'value_converted_from')['value_converted_from']
 
     def get_average_unit_cost_between(self, start_date, end_date):
         """
         Get average cost between two dates.
         """
-        total_cost = self.get_total_purchases_between(start_date, end_date)
-        total_weight = self.purchase_items.filter(
-            purchase__date__range=[start_date, end_date],
-            product=self,
-        ).aggregate(
-            total_weight=models.Sum('quantity')
-        )['total_weight'] or 0
-
-        if total_weight == 0:
+        flows = self.get_flows_between(start_date, end_date, 'purchases_value', 'quantity_purchased')
+        if flows['quantity_purchased'] == 0:
             return 0
 
-        return total_cost / total_weight
+        return flows['purchases_value'] / flows['quantity_purchased']
 
     def get_average_unit_price_between(self, start_date, end_date):
         """
@@ -421,39 +440,23 @@ class Product(models.Model):
         Returns:
             The average unit price as a decimal value, or 0 if no sales were found in the given period.
         """
+        flows = self.get_flows_between(start_date, end_date, 'unit_price_total', 'sale_count')
+        if flows['sale_count'] == 0:
+            return 0
 
-        from inventory.models import SaleItem
-
-        return SaleItem.objects.filter(
-            sale__date__range=[start_date, end_date],
-            product=self,
-        ).aggregate(
-            average_cost=models.Avg('unit_price')
-        )['average_cost'] or 0
+        return flows['unit_price_total'] / flows['sale_count']
 
     def get_adjustments_between(self, start_date, end_date):
-        return self.adjustments.filter(
-            date__range=[start_date, end_date]
-        ).aggregate(total=models.Sum('quantity'))['total'] or 0
+        return self.get_flows_between(start_date, end_date, 'quantity_adjusted')['quantity_adjusted']
 
     def get_average_unit_cost_with_adjustments_between(self, start_date, end_date):
-        from inventory.models import PurchaseItem
-
-        total_weight = PurchaseItem.objects.filter(
-            purchase__date__range=[start_date, end_date],
-            product=self,
-        ).aggregate(
-            total_weight=models.Sum('quantity')
-        )['total_weight'] or 0
-
-        total_cost = self.get_total_purchases_between(start_date, end_date)
-
-        adjusted_weight = self.get_adjustments_between(start_date, end_date)
+        flows = self.get_flows_between(start_date, end_date, 'purchases_value', 'quantity_purchased', 'quantity_adjusted')
+        adjusted_weight = flows['quantity_purchased'] + flows['quantity_adjusted']
 
-        if (total_weight + adjusted_weight) == 0:
+        if adjusted_weight == 0:
             return 0
 
-        return total_cost / (total_weight + adjusted_weight)
+        return flows['purchases_value'] / adjusted_weight
 
     def get_average_unit_profit_between(self, start_date, end_date):
         return (
@@ -462,6 +465,4 @@ class Product(models.Model):
         )
 
     def get_sold_quantity_between(self, start_date, end_date):
-        return self.sale_items.filter(
-            sale__date__range=[start_date, end_date]
-        ).aggregate(total=models.Sum('quantity'))['total'] or 0
+        return self.get_flows_between(start_date, end_date, 'quantity_sold')['quantity_sold']
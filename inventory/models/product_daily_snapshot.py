@@ -0,0 +1,360 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+import uuid
+from django.db import models
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+ZERO = Decimal('0.0')
+
+QUANTITY_FLOWS = (
+    'quantity_in', 'quantity_out', 'quantity_sold', 'quantity_purchased', 'quantity_adjusted',
+    'quantity_converted_from', 'quantity_converted_to',
+)
+VALUE_FLOWS = (
+    'value_in', 'value_out', 'sales_value', 'purchases_value', 'value_converted_from', 'value_converted_to',
+    'unit_price_total',
+)
+FLOWS = QUANTITY_FLOWS + VALUE_FLOWS + ('sale_count',)
+
+
+def day_start(day):
+    """
+    The aware datetime at which `day` starts in the current timezone.
+    """
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def local_day(date):
+    return timezone.localtime(date).date()
+
+
+def line_total(quantity, price):
+    """
+    `quantity * price` of each row, at the precision of the snapshot values.
+    """
+    return ExpressionWrapper(F(quantity) * F(price), output_field=DecimalField(max_digits=20, decimal_places=6))
+
+
+def _sources():
+    """
+    The raw tables the snapshot flows are summed from, as
+    `(queryset, product lookup, includes period end, aggregates)`. Each
+    queryset is annotated with the `snapshot_date` its rows count at.
+
+    Period queries on sales, purchases, adjustments and conversions have
+    always used `__range` and so include rows dated exactly at the period
+    end; stock and batch movements are counted up to, not at, the end.
+    """
+    from inventory.models import BatchMovement, PurchaseItem, SaleItem, StockAdjustment, StockConversion, StockMovement
+
+    # A batch movement only counts towards stock value once its batch has
+    # been received, see `Product.get_stock_value_at`
+    batch_value = line_total('quantity', 'batch__unit_cost')
+    return (
+        (
+            StockMovement.objects.annotate(snapshot_date=F('date')),
+            'product', False,
+            {
+                'quantity_in': Sum('quantity', filter=Q(movement_type='IN')),
+                'quantity_out': Sum('quantity', filter=Q(movement_type='OUT')),
+            },
+        ),
+        (
+            BatchMovement.objects.annotate(snapshot_date=Greatest('date', 'batch__date_received')),
+            'batch__product', False,
+            {
+                'value_in': Sum(batch_value, filter=Q(movement_type=BatchMovement.MovementType.IN)),
+                'value_out': Sum(batch_value, filter=Q(movement_type=BatchMovement.MovementType.OUT)),
+            },
+        ),
+        (
+            SaleItem.objects.annotate(snapshot_date=F('sale__date')),
+            'product', True,
+            {
+                'quantity_sold': Sum('quantity'),
+                'sales_value': Sum(line_total('quantity', 'unit_price')),
+                'sale_count': Count('id'),
+                'unit_price_total': Sum('unit_price'),
+            },
+        ),
+        (
+            PurchaseItem.objects.annotate(snapshot_date=F('purchase__date')),
+            'product', True,
+            {
+                'quantity_purchased': Sum('quantity'),
+                'purchases_value': Sum(line_total('quantity', 'unit_cost')),
+            },
+        ),
+        (
+            StockAdjustment.objects.annotate(snapshot_date=F('date')),
+            'product', True,
+            {'quantity_adjusted': Sum('quantity')},
+        ),
+        (
+            StockConversion.objects.annotate(snapshot_date=F('date')),
+            'from_product', True,
+            {
+                'quantity_converted_from': Sum('quantity'),
+                'value_converted_from': Sum(line_total('quantity', 'unit_cost')),
+            },
+        ),
+        (
+            StockConversion.objects.annotate(snapshot_date=F('date')),
+            'to_product', True,
+            {
+                'quantity_converted_to': Sum('quantity'),
+                'value_converted_to': Sum(line_total('quantity', 'unit_cost')),
+            },
+        ),
+    )
+
+
+def _window_condition(windows, end=None):
+    condition = Q()
+    for start, stop in windows:
+        if start < stop:
+            condition |= Q(snapshot_date__gte=start, snapshot_date__lt=stop)
+    if end is not None:
+        condition |= Q(snapshot_date=end)
+    return condition
+
+
+def empty_flows():
+    return dict.fromkeys(FLOWS, ZERO)
+
+
+class ProductDailySnapshotQuerySet(models.QuerySet):
+    def raw_flows(self, windows, products=None, fields=FLOWS, end=None, by_day=False):
+        """
+        Sum the flows in `fields` over the raw rows dated in any of the
+        `[start, stop)` `windows` (or all rows if `windows` is None), plus
+        rows dated exactly `end` for the sources that include the period end.
+
+        :return: `{product_id: {field: total}}`, or `{(product_id, day): ...}`
+            with `by_day=True`.
+        """
+        totals = defaultdict(empty_flows)
+        for queryset, product, includes_end, aggregates in _sources():
+            aggregates = {name: aggregate for name, aggregate in aggregates.items() if name in fields}
+            if not aggregates:
+                continue
+            if windows is not None:
+                condition = _window_condition(windows, end if includes_end else None)
+                if not condition:
+                    continue
+                queryset = queryset.filter(condition)
+            if products is not None:
+                queryset = queryset.filter(**{f'{product}__in': products})
+            keys = [product]
+            if by_day:
+                queryset = queryset.annotate(snapshot_day=TruncDate('snapshot_date', tzinfo=timezone.get_current_timezone()))
+                keys.append('snapshot_day')
+
+            for row in queryset.order_by().values(*keys).annotate(**aggregates).values(*keys, *aggregates):
+                key = tuple(row.pop(name) for name in keys) if by_day else row.pop(product)
+                for name, value in row.items():
+                    totals[key][name] += Decimal(value or 0)
+        return totals
+
+    def flows_between(self, start, end, products=None, fields=FLOWS):
+        """
+        Sum the flows in `fields` over the period from `start` to `end`:
+        whole days are read from the snapshots and only the partial days at
+        either end of the period from the raw tables.
+        """
+        first = local_day(start)
+        if day_start(first) < start:
+            first += timedelta(days=1)
+        last = local_day(end)
+        if first >= last:
+            return self.raw_flows([(start, end)], products, fields, end=end)
+
+        totals = self.raw_flows([(start, day_start(first)), (day_start(last), end)], products, fields, end=end)
+        snapshots = self.filter(day__gte=first, day__lt=last)
+        if products is not None:
+            snapshots = snapshots.filter(product__in=products)
+        aggregates = {f'total_{name}': Sum(name) for name in fields}
+        for row in snapshots.order_by().values('product').annotate(**aggregates).values('product', *aggregates):
+            for name in fields:
+                totals[row['product']][name] += row[f'total_{name}'] or 0
+        return totals
+
+    def latest_before(self, day, products=None):
+        """
+        The latest snapshot of each product before `day`.
+
+        :return: `{product_id: {'closing_quantity': ..., 'closing_value': ...}}`
+        """
+        latest = self.filter(
+            day__lt=day,
+            day=Subquery(
+                self.filter(product=OuterRef('product'), day__lt=day).order_by('-day').values('day')[:1]
+            ),
+        )
+        if products is not None:
+            latest = latest.filter(product__in=products)
+        return {
+            row.pop('product'): row
+            for row in latest.values('product', 'closing_quantity', 'closing_value')
+        }
+
+    def closing_at(self, date, products=None):
+        """
+        Stock level and value of each product at `date`, i.e. after every
+        movement before it.
+
+        :return: `{product_id: {'quantity': ..., 'value': ...}}`
+        """
+        day = local_day(date)
+        closing = defaultdict(lambda: {'quantity': ZERO, 'value': ZERO})
+        for product_id, latest in self.latest_before(day, products).items():
+            closing[product_id] = {'quantity': latest['closing_quantity'], 'value': latest['closing_value']}
+
+        partial = self.raw_flows(
+            [(day_start(day), date)], products, ('quantity_in', 'quantity_out', 'value_in', 'value_out'),
+        )
+        for product_id, flows in partial.items():
+            closing[product_id]['quantity'] += flows['quantity_in'] - flows['quantity_out']
+            closing[product_id]['value'] += flows['value_in'] - flows['value_out']
+        return closing
+
+    def _shift_after(self, day, deltas, field):
+        """
+        Add `deltas[product_id]` to `field` of every snapshot after `day`.
+        """
+        deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+        if deltas:
+            self.filter(product_id__in=deltas, day__gt=day).update(**{
+                field: F(field) + Case(
+                    *[When(product_id=product_id, then=Value(delta)) for product_id, delta in deltas.items()],
+                    output_field=DecimalField(max_digits=20, decimal_places=6),
+                )
+            })
+
+    def refresh(self, product_ids, day):
+        """
+        Recompute the flows of `product_ids` on `day` from the raw tables and
+        shift the closing balances of every later snapshot by the change, in
+        a fixed number of queries.
+        """
+        flows = self.raw_flows([(day_start(day), day_start(day + timedelta(days=1)))], product_ids)
+        snapshots = {snapshot.product_id: snapshot for snapshot in self.filter(product_id__in=product_ids, day=day)}
+        previous = self.latest_before(day, product_ids)
+
+        quantity_deltas, value_deltas = {}, {}
+        created, updated, deleted = [], [], []
+        for product_id in product_ids:
+            new, snapshot = flows[product_id], snapshots.get(product_id)
+            old = {name: getattr(snapshot, name) for name in FLOWS} if snapshot else empty_flows()
+            quantity_deltas[product_id] = (new['quantity_in'] - new['quantity_out']) - (old['quantity_in'] - old['quantity_out'])
+            value_deltas[product_id] = (new['value_in'] - new['value_out']) - (old['value_in'] - old['value_out'])
+
+            if not any(new.values()):
+                if snapshot is not None:
+                    deleted.append(snapshot.pk)
+                continue
+
+            if snapshot is None:
+                snapshot = self.model(product_id=product_id, day=day)
+                created.append(snapshot)
+            else:
+                updated.append(snapshot)
+            latest = previous.get(product_id, {'closing_quantity': ZERO, 'closing_value': ZERO})
+            for name, value in new.items():
+                setattr(snapshot, name, value)
+            snapshot.closing_quantity = latest['closing_quantity'] + new['quantity_in'] - new['quantity_out']
+            snapshot.closing_value = latest['closing_value'] + new['value_in'] - new['value_out']
+
+        self._shift_after(day, quantity_deltas, 'closing_quantity')
+        self._shift_after(day, value_deltas, 'closing_value')
+        if deleted:
+            self.filter(pk__in=deleted).delete()
+        if updated:
+            self.bulk_update(updated, FLOWS + ('closing_quantity', 'closing_value'))
+        if created:
+            self.bulk_create(created)
+
+    def touch(self, keys):
+        """
+        Refresh the snapshots of every `(product_id, date)` in `keys`.
+        """
+        days = defaultdict(set)
+        for product_id, date in keys:
+            if product_id:
+                days[local_day(date)].add(product_id)
+        for day, product_ids in sorted(days.items()):
+            self.refresh(sorted(product_ids, key=str), day)
+
+    def rebuild(self, product_ids=None):
+        """
+        Recompute the snapshots from scratch for the given products (or all).
+        """
+        snapshots = self.all()
+        if product_ids is not None:
+            snapshots = snapshots.filter(product_id__in=product_ids)
+        snapshots.delete()
+
+        flows = self.raw_flows(None, product_ids, by_day=True)
+        created = []
+        product_id, quantity, value = None, ZERO, ZERO
+        for (key, day), totals in sorted(flows.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+            if key != product_id:
+                product_id, quantity, value = key, ZERO, ZERO
+            if not any(totals.values()):
+                continue
+            quantity += totals['quantity_in'] - totals['quantity_out']
+            value += totals['value_in'] - totals['value_out']
+            created.append(self.model(product_id=key, day=day, closing_quantity=quantity, closing_value=value, **totals))
+        self.bulk_create(created, batch_size=1000)
+        return len(created)
+
+
+def _flow_field():
+    return models.DecimalField(max_digits=20, decimal_places=6, default=ZERO)
+
+
+class ProductDailySnapshot(models.Model):
+    """
+    Per product and day totals of every stock flow, with the closing stock
+    level and value at the end of the day. Days without activity have no row.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    product = models.ForeignKey('inventory.Product', related_name='daily_snapshots', on_delete=models.CASCADE)
+    day = models.DateField()
+
+    closing_quantity = _flow_field()
+    closing_value = _flow_field()
+
+    quantity_in = _flow_field()
+    value_in = _flow_field()
+    quantity_out = _flow_field()
+    value_out = _flow_field()
+
+    quantity_sold = _flow_field()
+    sales_value = _flow_field()
+    sale_count = models.PositiveIntegerField(default=0)
+    unit_price_total = _flow_field()
+
+    quantity_purchased = _flow_field()
+    purchases_value = _flow_field()
+    quantity_adjusted = _flow_field()
+
+    quantity_converted_from = _flow_field()
+    value_converted_from = _flow_field()
+    quantity_converted_to = _flow_field()
+    value_converted_to = _flow_field()
+
+    objects = ProductDailySnapshotQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['product', 'day']
+        verbose_name_plural = 'Product Daily Snapshots'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='unique_product_day_snapshot'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.day} - {self.closing_quantity}"
@@ -1,10 +1,8 @@
-from decimal import Decimal
 import uuid
 from django.db import models
 from django.utils import timezone
-from django.db.models import DecimalField, Sum, F, ExpressionWrapper, Case, When, Value, Q, Subquery, OuterRef
-from django.db.models.functions import Coalesce
-from django.contrib.contenttypes.models import ContentType
+from django.db.models import Sum
+from django.utils.functional import cached_property
 
 
 class Report(models.Model):
@@ -21,23 +19,11 @@ class Report(models.Model):
 
     @property
     def total_sales(self):
-        from inventory.models import SaleItem
-        return SaleItem.objects.filter(sale__date__range=[self.open_date, self.close_date]).annotate(
-            line_total=ExpressionWrapper(
-                F('quantity') * F('unit_price'),
-                output_field=DecimalField(max_digits=10, decimal_places=3)
-            )
-        ).aggregate(total=models.Sum('line_total'))['total'] or 0
+        return self.engine.total('sales_value')
 
     @property
     def total_purchases(self):
-        from inventory.models import PurchaseItem
-        return PurchaseItem.objects.filter(purchase__date__range=[self.open_date, self.close_date]).annotate(
-            line_total=ExpressionWrapper(
-                F('quantity') * F('unit_cost'),
-                output_field=DecimalField(max_digits=10, decimal_places=3)
-            )
-        ).aggregate(total=models.Sum('line_total'))['total'] or 0
+        return self.engine.total('purchases_value')
 
     @property
     def cost_of_goods_sold(self):
@@ -98,6 +84,11 @@ class Report(models.Model):
         # Group by description and category, and sum the amount for each group.
         return qs.values('description', 'category').annotate(amount=Sum('amount')).values('description', 'amount').order_by('-amount')
 
+    @cached_property
+    def engine(self):
+        from inventory.reporting import ReportEngine
+        return ReportEngine(self.open_date, self.close_date)
+
     @property
     def opening_inventory(self):
         """
@@ -105,18 +96,9 @@ class Report(models.Model):
             - product name
             - stock level
             - stock value
-        based on the current state of the inventory at the time of close_date
-        (or open_date, depending on your needs).
+        based on the state of the inventory at open_date.
         """
-        from inventory.models import Product
-        inventory = []
-        for product in Product.objects.all():
-            inventory.append({
-                'product': product.name,
-                'stock_level': product.get_stock_level_at(self.open_date),
-                'stock_value': product.get_stock_value_at(self.open_date),
-            })
-        return inventory
+        return self.engine.stock_at(self.open_date)
 
     @property
     def closing_inventory(self):
@@ -125,18 +107,9 @@ class Report(models.Model):
             - product name
             - stock level
             - stock value
-        based on the current state of the inventory at the time of close_date
-        (or open_date, depending on your needs).
+        based on the state of the inventory at close_date.
         """
-        from inventory.models import Product
-        inventory = []
-        for product in Product.objects.all():
-            inventory.append({
-                'product': product.name,
-                'stock_level': product.get_stock_level_at(self.close_date),
-                'stock_value': product.get_stock_value_at(self.close_date),
-            })
-        return inventory
+        return self.engine.stock_at(self.close_date)
 
     # TODO: Resolve how conversions affect the profitability report
     @property
@@ -149,109 +122,16 @@ class Report(models.Model):
             - opening stock value
             - closing stock value
         """
-        from inventory.models import Product
-        inventory = []
-        for product in Product.objects.all():
-            if (
-                product.get_stock_level_at(self.open_date)
-                or product.get_stock_level_at(self.close_date)
-                or product.get_outgoing_stock_between(self.open_date, self.close_date)
-                or product.get_incoming_stock_between(self.open_date, self.close_date)
-            ):
-                inventory.append({
-                    'product': product,
-                    'opening_stock_level': product.get_stock_level_at(self.open_date),
-                    'closing_stock_level': product.get_stock_level_at(self.close_date),
-                    'opening_stock_value': product.get_stock_value_at(self.open_date),
-                    'closing_stock_value': product.get_stock_value_at(self.close_date),
-                    'adjustments': product.get_adjustments_between(self.open_date, self.close_date),
-                    'incoming_stock': product.get_incoming_stock_between(self.open_date, self.close_date),
-                    'conversions_from': product.get_conversions_from_quantity_between(self.open_date, self.close_date),
-                    'conversions_to': product.get_conversions_to_quantity_between(self.open_date, self.close_date),
-                    'outgoing_stock': product.get_outgoing_stock_between(self.open_date, self.close_date),
-                    'sold_stock': product.get_sold_quantity_between(self.open_date, self.close_date),
-                })
-        return inventory
+        return self.engine.inventory_balances()
 
     @property
     def product_performances(self):
-        from inventory.models import Product
-        perfomances = []
-        for product in Product.objects.all():
-            if (
-                product.get_stock_level_at(self.open_date)
-                or product.get_stock_level_at(self.close_date)
-                or product.get_outgoing_stock_between(self.open_date, self.close_date)
-                or product.get_incoming_stock_between(self.open_date, self.close_date)
-            ):
-                perfomances.append({
-                    'product': product,
-                    'sales': product.get_total_sales_between(self.open_date, self.close_date),
-                    'opening_stock_value': product.get_stock_value_at(self.open_date),
-                    'purchases': product.get_total_purchases_between(self.open_date, self.close_date),
-                    'closing_stock_value': product.get_stock_value_at(self.close_date),
-                    'cost_of_goods_sold': product.get_cost_of_goods_sold_between(self.open_date, self.close_date),
-                    'gross_profit': product.get_gross_profit_between(self.open_date, self.close_date),
-                    'conversions_from': product.get_conversions_from_value_between(self.open_date, self.close_date),
-                    'conversions_to': product.get_conversions_to_value_between(self.open_date, self.close_date),
-                    'average_unit_cost_with_adjustments': product.get_average_unit_cost_with_adjustments_between(self.open_date, self.close_date),
-                    'average_unit_cost': product.get_average_unit_cost_between(self.open_date, self.close_date),
-                    'adjustments': product.get_adjustments_between(self.open_date, self.close_date),
-                    'average_unit_price': product.get_average_unit_price_between(self.open_date, self.close_date),
-                    'average_unit_profit': product.get_average_unit_profit_between(self.open_date, self.close_date),
-                })
-        return perfomances
+        return self.engine.product_performances()
 
     def get_stock_value_at(self, date):
-        from inventory.models import StockBatch, BatchMovement, PurchaseItem, StockAdjustment, StockConversion
-        return StockBatch.objects.filter(date_received__lt=date).annotate(
-            total_in=Coalesce(
-                Sum(
-                    'movements__quantity',
-                    filter=Q(movements__date__lt=date, movements__movement_type=BatchMovement.MovementType.IN),
-                ),
-                Value(Decimal(0.0))
-            ),
-            total_out=Coalesce(
-                Sum(
-                    'movements__quantity',
-                    filter=Q(movements__date__lt=date, movements__movement_type=BatchMovement.MovementType.OUT),
-                ),
-                Value(Decimal(0.0))
-            ),
-            net_qty=F('total_in') - F('total_out')
-        ).annotate(
-            value=ExpressionWrapper(
-                F('net_qty') * Case(
-                    When(content_type=ContentType.objects.get_for_model(PurchaseItem),
-                         then=Subquery(
-                        PurchaseItem.objects.filter(pk=OuterRef('object_id')).values('unit_cost')[:1]
-                    )),
-                    When(content_type=ContentType.objects.get_for_model(StockAdjustment),
-                         then=Subquery(
-                        StockAdjustment.objects.filter(pk=OuterRef('object_id')).values('unit_cost')[:1]
-                    )),
-                    When(content_type=ContentType.objects.get_for_model(StockConversion),
-                         then=Subquery(
-                        StockConversion.objects.filter(pk=OuterRef('object_id')).values('unit_cost')[:1]
-                    )),
-                    default=Value(Decimal(0.0)),
-                ),
-                output_field=DecimalField(max_digits=15, decimal_places=2)
-            )
-        ).aggregate(total=Coalesce(Sum('value'), Value(Decimal(0.0))))['total'] or 0
+        from inventory.models import StockValuation
+        return sum(balance['value'] for balance in StockValuation.objects.closing_at(date).values())
 
     def get_cash_at(self, date):
-        from inventory.models import Transaction
-        return Transaction.objects.filter(date__lt=date).aggregate(
-            total_cash=Sum(
-                Case(
-                    When(transaction_type='SALE', then=F('amount')),
-                    When(transaction_type='PURCHASE', then=-F('amount')),
-                    When(transaction_type='EXPENSE', then=-F('amount')),
-                    When(transaction_type='ADJUSTMENT', then=F('amount')),
-                    default=Value(0),
-                    output_field=DecimalField(max_digits=15, decimal_places=2)
-                )
-            )
-        )['total_cash'] or 0
+        from inventory.models import CashCheckpoint
+        return CashCheckpoint.objects.cash_at(date)
@@ -0,0 +1,111 @@
+from datetime import timedelta
+import uuid
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class ReportArtifactQuerySet(models.QuerySet):
+    def request(self, kind, object_id=None, open_date=None, close_date=None):
+        """
+        Return the artifact of `kind` for `object_id` and the given period at
+        the current data version, queueing it for rendering when it does not
+        exist yet, the last attempt failed or its task was queued longer ago
+        than a worker may run it, so was lost or killed.
+        """
+        from inventory.models import DataVersion
+        from inventory.tasks import trigger_render_report_artifact
+
+        # Concurrent requests for the same export collide on the unique
+        # constraints, and `get_or_create` then reads the artifact created
+        # by the other request
+        artifact, created = self.get_or_create(
+            kind=kind,
+            object_id=object_id,
+            open_date=open_date,
+            close_date=close_date,
+            data_version=DataVersion.objects.current(),
+        )
+        if created:
+            trigger_render_report_artifact(artifact)
+        elif artifact.status == ReportArtifact.Status.FAILED or artifact.is_stale:
+            now = timezone.now()
+            # Only the request that moves the artifact back to pending queues it
+            requeued = self.filter(pk=artifact.pk, status=artifact.status, queued_at=artifact.queued_at).update(
+                status=ReportArtifact.Status.PENDING, error='', queued_at=now,
+            )
+            artifact.refresh_from_db()
+            if requeued:
+                trigger_render_report_artifact(artifact)
+        return artifact
+
+
+class ReportArtifact(models.Model):
+    """
+    A PDF export rendered in the background, keyed by what it reports on, the
+    period it covers and the data version it was rendered at.
+    """
+    class Kind(models.TextChoices):
+        INCOME_STATEMENT = 'INCOME_STATEMENT', 'Income Statement'
+        MOVEMENT_REPORT = 'MOVEMENT_REPORT', 'Inventory Movement Report'
+        PROFITABILITY_REPORT = 'PROFITABILITY_REPORT', 'Profitability Report'
+        PRODUCT_REPORT = 'PRODUCT_REPORT', 'Product Report'
+        SUGGESTED_BUDGET = 'SUGGESTED_BUDGET', 'Suggested Budget'
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        DONE = 'DONE', 'Done'
+        FAILED = 'FAILED', 'Failed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=30, choices=Kind.choices)
+    object_id = models.UUIDField(null=True, blank=True)
+    open_date = models.DateTimeField(null=True, blank=True)
+    close_date = models.DateTimeField(null=True, blank=True)
+    data_version = models.PositiveBigIntegerField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    file = models.FileField(upload_to='reports/', blank=True)
+    filename = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    task_id = models.CharField(max_length=64, blank=True)
+    queued_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ReportArtifactQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created_at']
+        # NULLs never collide in a unique index, so the exports without a
+        # period or object have constraints of their own
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id', 'open_date', 'close_date', 'data_version'],
+                name='unique_report_artifact_version',
+            ),
+            models.UniqueConstraint(
+                fields=['kind', 'object_id', 'data_version'],
+                condition=Q(open_date__isnull=True, close_date__isnull=True),
+                name='unique_report_artifact_version_without_period',
+            ),
+            models.UniqueConstraint(
+                fields=['kind', 'data_version'],
+                condition=Q(object_id__isnull=True, open_date__isnull=True, close_date__isnull=True),
+                name='unique_report_artifact_version_without_object',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} ({self.get_status_display()})"
+
+    @property
+    def is_stale(self):
+        """
+        Whether the artifact is still pending or running after the task
+        timeout of the cluster.
+        """
+        if self.status not in (self.Status.PENDING, self.Status.RUNNING):
+            return False
+        return self.queued_at < timezone.now() - timedelta(seconds=settings.Q_CLUSTER['timeout'])
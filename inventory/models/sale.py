@@ -1,8 +1,47 @@
+from decimal import Decimal
 import uuid
 from django.db import models
 from django.utils import timezone
-from django.db.models import F, ExpressionWrapper, DecimalField, Case, When, Value, Subquery, OuterRef, Sum
-from django.contrib.contenttypes.models import ContentType
+from django.db.models import F, ExpressionWrapper, DecimalField, Func, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from inventory.models.product_daily_snapshot import line_total
+
+
+def _total_subquery(queryset, expression):
+    """
+    Correlated subquery summing `expression` over `queryset`, or 0.
+    """
+    output_field = DecimalField(max_digits=20, decimal_places=6)
+    return Coalesce(
+        Subquery(queryset.order_by().values(total=Func(expression, function='SUM'))[:1], output_field=output_field),
+        Value(Decimal('0.0')),
+        output_field=output_field,
+    )
+
+
+class SaleQuerySet(models.QuerySet):
+    def annotate_totals(self):
+        """
+        Annotate each sale with its totals as correlated subqueries, so a
+        page of sales costs a single query and can be sorted by them.
+
+        The annotations mirror the properties of the same meaning:
+        - `revenue`: `total_amount`
+        - `cost`: `cost_of_goods_sold`
+        - `profit`: `gross_profit`
+        """
+        from inventory.models import BatchMovement, SaleItem
+
+        return self.annotate(
+            revenue=_total_subquery(
+                SaleItem.objects.filter(sale=OuterRef('pk')), line_total('quantity', 'unit_price'),
+            ),
+            cost=_total_subquery(
+                BatchMovement.objects.filter(sale_item__sale=OuterRef('pk')), line_total('quantity', 'unit_cost'),
+            ),
+            profit=ExpressionWrapper(F('revenue') - F('cost'), output_field=DecimalField(max_digits=20, decimal_places=6)),
+        )
 
 
 class Sale(models.Model):
@@ -10,6 +49,8 @@ class Sale(models.Model):
     date = models.DateTimeField(default=timezone.now)
     notes = models.TextField(blank=True)
 
+    objects = SaleQuerySet.as_manager()
+
     def __str__(self):
         return f"Sale {self.id} on {self.date.strftime('%Y-%m-%d')}"
 
@@ -26,58 +67,12 @@ class Sale(models.Model):
 
     @property
     def movements(self):
-        from inventory.models import BatchMovement, SaleItem
-        saleitem_ct = ContentType.objects.get_for_model(SaleItem)
-        return BatchMovement.objects.filter(
-            content_type=saleitem_ct,
-            object_id__in=[i['id'] for i in self.items.values('id')]
-        )
+        from inventory.models import BatchMovement
+        return BatchMovement.objects.filter(sale_item__sale=self)
 
     @property
     def cost_of_goods_sold(self):
-        from inventory.models import PurchaseItem, StockAdjustment, StockConversion
-        movements_with_cost = self.movements.annotate(
-            cost_price=Case(
-                When(
-                    batch__content_type=ContentType.objects.get_for_model(PurchaseItem),
-                    then=Subquery(
-                        PurchaseItem.objects
-                        .filter(pk=OuterRef('batch__object_id'))
-                        .values('unit_cost')[:1]
-                    )
-                ),
-                When(
-                    batch__content_type=ContentType.objects.get_for_model(StockAdjustment),
-                    then=Subquery(
-                        StockAdjustment.objects
-                        .filter(pk=OuterRef('batch__object_id'))
-                        .values('unit_cost')[:1]
-                    )
-                ),
-                When(
-                    batch__content_type=ContentType.objects.get_for_model(StockConversion),
-                    then=Subquery(
-                        StockConversion.objects
-                        .filter(pk=OuterRef('batch__object_id'))
-                        .values('unit_cost')[:1]
-                    )
-                ),
-                default=Value(0),
-                output_field=DecimalField(max_digits=10, decimal_places=2)
-            )
-        ).annotate(
-            total_movement_cost=ExpressionWrapper(
-                F('quantity') * F('cost_price'),
-                output_field=DecimalField(max_digits=10, decimal_places=2)
-            )
-        )
-
-        # Sum those costs across all movements
-        total_cost = movements_with_cost.aggregate(
-            total=Sum('total_movement_cost')
-        )['total'] or 0
-
-        return total_cost
+        return self.movements.aggregate(total=Sum(line_total('quantity', 'unit_cost')))['total'] or 0
 
     @property
     def gross_profit(self):
@@ -85,4 +80,5 @@ class Sale(models.Model):
 
     @property
     def gross_margin(self):
-        return self.gross_profit / self.total_amount if self.total_amount else 0
+        total_amount = self.total_amount
+        return (total_amount - self.cost_of_goods_sold) / total_amount if total_amount else 0
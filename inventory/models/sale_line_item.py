@@ -1,8 +1,7 @@
 from decimal import Decimal
 import uuid
 from django.db import models
-from django.db.models import Sum, F, ExpressionWrapper, DecimalField, Subquery, OuterRef, Value, Case, When
-from django.contrib.contenttypes.models import ContentType
+from django.db.models import Sum, F, ExpressionWrapper, DecimalField
 from django.contrib.contenttypes.fields import GenericRelation
 
 
@@ -29,45 +28,13 @@ class SaleItem(models.Model):
 
     @property
     def cost(self):
-        from inventory.models import PurchaseItem, StockAdjustment, StockConversion
-        movements_with_cost = self.movements.annotate(
-            cost_price=Case(
-                When(
-                    batch__content_type=ContentType.objects.get_for_model(PurchaseItem),
-                    then=Subquery(
-                        PurchaseItem.objects
-                        .filter(pk=OuterRef('batch__object_id'))
-                        .values('unit_cost')[:1]
-                    )
-                ),
-                When(
-                    batch__content_type=ContentType.objects.get_for_model(StockAdjustment),
-                    then=Subquery(
-                        StockAdjustment.objects
-                        .filter(pk=OuterRef('batch__object_id'))
-                        .values('unit_cost')[:1]
-                    )
-                ),
-                When(
-                    batch__content_type=ContentType.objects.get_for_model(StockConversion),
-                    then=Subquery(
-                        StockConversion.objects
-                        .filter(pk=OuterRef('batch__object_id'))
-                        .values('unit_cost')[:1]
-                    )
-                ),
-                default=Value(0),
-                output_field=DecimalField(max_digits=10, decimal_places=2)
+        total_cost = self.movements.aggregate(
+            total=Sum(
+                ExpressionWrapper(
+                    F('quantity') * F('unit_cost'),
+                    output_field=DecimalField(max_digits=20, decimal_places=6)
+                )
             )
-        ).annotate(
-            total_movement_cost=ExpressionWrapper(
-                F('quantity') * F('cost_price'),
-                output_field=DecimalField(max_digits=10, decimal_places=2)
-            )
-        )
-
-        total_cost = movements_with_cost.aggregate(
-            total=Sum('total_movement_cost')
         )['total'] or 0
 
         return Decimal(total_cost)
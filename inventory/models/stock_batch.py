@@ -4,7 +4,7 @@ from django.db import models
 from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
-from django.db.models import F, Sum, DecimalField, ExpressionWrapper, Subquery, OuterRef, Value, Case, When
+from django.db.models import F, Sum, DecimalField, ExpressionWrapper, Value, Case, When
 from django.db.models.functions import Coalesce
 
 
@@ -39,36 +39,15 @@ class StockBatchQuerySet(models.QuerySet):
 
     def annotate_unit_costs(self):
         """
-        Annotate the queryset with the effective unit cost based on the linked object type.
+        Annotate the queryset with the effective unit cost of each batch.
 
         This function adds an annotation to the queryset:
-        - effective_unit_cost: The unit cost determined by the linked content type.
-        The annotation is calculated using a Case expression that evaluates the
-        content type of each object in the queryset. The effective unit cost is
-        retrieved from related models such as PurchaseItem, StockAdjustment, or
-        StockConversion using a Subquery.
-
-        The default value of the effective unit cost is set to 0. The annotation
-        uses a DecimalField with a precision of up to 15 digits and 6 decimal places.
+        - effective_unit_cost: The unit cost denormalized onto the batch from
+          its linked PurchaseItem, StockAdjustment or StockConversion.
         """
-
-        from inventory.models import PurchaseItem, StockAdjustment, StockConversion
-
         return self.annotate(
-            effective_unit_cost=Case(
-                When(
-                    content_type=ContentType.objects.get_for_model(PurchaseItem),
-                    then=Subquery(PurchaseItem.objects.filter(pk=OuterRef('object_id')).values('unit_cost')[:1])
-                ),
-                When(
-                    content_type=ContentType.objects.get_for_model(StockAdjustment),
-                    then=Subquery(StockAdjustment.objects.filter(pk=OuterRef('object_id')).values('unit_cost')[:1])
-                ),
-                When(
-                    content_type=ContentType.objects.get_for_model(StockConversion),
-                    then=Subquery(StockConversion.objects.filter(pk=OuterRef('object_id')).values('unit_cost')[:1])
-                ),
-                default=Value(0),
+            effective_unit_cost=ExpressionWrapper(
+                F('unit_cost'),
                 output_field=DecimalField(max_digits=15, decimal_places=6),
             )
         )
@@ -103,6 +82,11 @@ class StockBatch(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     date_received = models.DateTimeField(default=timezone.now)
 
+    # Denormalized from the linked object, kept in sync by the save signals
+    product = models.ForeignKey('inventory.Product', related_name='stock_batches', on_delete=models.CASCADE, null=True, blank=True)
+    quantity = models.DecimalField(decimal_places=3, max_digits=15, default=Decimal('0.0'))
+    unit_cost = models.DecimalField(max_digits=15, decimal_places=6, default=Decimal('0.0'))
+
     # GenericForeignKey fields
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
     object_id = models.UUIDField(null=True, blank=True)
@@ -116,22 +100,11 @@ class StockBatch(models.Model):
         indexes = [
             models.Index(fields=['content_type', 'object_id']),
             models.Index(fields=['date_received']),
+            models.Index(fields=['product', 'date_received']),
         ]
 
     def __str__(self):
-        return f"{self.date_received.date()} - {self.linked_object.product.name} - {self.linked_object.quantity} {self.linked_object.product.unit}"
-
-    @property
-    def product(self):
-        return self.linked_object.product
-
-    @property
-    def quantity(self):
-        return self.linked_object.quantity
-
-    @property
-    def unit_cost(self):
-        return self.linked_object.unit_cost
+        return f"{self.date_received.date()} - {self.product.name} - {self.quantity} {self.product.unit}"
 
     @property
     def quantity_remaining(self):
@@ -149,68 +122,21 @@ class StockBatch(models.Model):
     def profit(self):
         """
         Calculate profit using database-level aggregation:
-        profit = sum(quantity * (selling_price - unit_cost)) for all movements
-        This is equivalent to:
-        profit = sum(quantity * selling_price) - unit_cost * sum(quantity)
-        """
-        from inventory.models import BatchMovement, SaleItem
-        movements = self.movements.filter(movement_type=BatchMovement.MovementType.OUT)
-
-        movements = movements.annotate(
-            sale_price=Subquery(
-                SaleItem.objects
-                .filter(pk=OuterRef('object_id'))
-                .values('unit_price')[:1]
-            )
-        )
-
-        revenue_aggregation = (
-            movements
-            .filter(
-                content_type=ContentType.objects.get_for_model(SaleItem)
-            )
-            .annotate(
-                total_revenue=ExpressionWrapper(
-                    F('quantity') * F('sale_price'),
-                    output_field=DecimalField(max_digits=10, decimal_places=2)
-                )
-            )
-            .aggregate(revenue=Sum('total_revenue'))
-        )['revenue'] or 0
-
-        quantity_aggregation = (
-            movements.filter(
-                content_type=ContentType.objects.get_for_model(SaleItem)
-            )
-            .aggregate(total_quantity=Sum('quantity'))['total_quantity']
-            or 0
-        )
-
-        unit_cost = self.linked_object.unit_cost
-        return revenue_aggregation - (unit_cost * Decimal(quantity_aggregation))
-
-    def consume(self, quantity, associated_item):
-        """
-        Consume stock from this batch.
-
-        :param quantity: The quantity to consume
-        :param associated_item: The item associated with the consumption (e.g. a SaleItem or PurchaseItem)
-        :return: The remaining quantity left after consumption.
+        profit = sum(quantity * (unit_price - unit_cost)) over the movements
+        selling from this batch, at the price and cost they recorded.
         """
         from inventory.models import BatchMovement
-        ear_marked = min(quantity, self.quantity_remaining)
-        ct = ContentType.objects.get_for_model(type(associated_item))
-
-        if 0 < ear_marked <= self.quantity_remaining:
-            self.movements.create(
-                batch=self,
-                content_type=ct,
-                object_id=associated_item.id if associated_item else None,
-                quantity=ear_marked,
-                date=associated_item.date or timezone.now(),
-                movement_type=BatchMovement.MovementType.OUT,
+        return self.movements.filter(
+            movement_type=BatchMovement.MovementType.OUT,
+            unit_price__isnull=False,
+        ).aggregate(
+            profit=Sum(
+                ExpressionWrapper(
+                    F('quantity') * (F('unit_price') - F('unit_cost')),
+                    output_field=DecimalField(max_digits=20, decimal_places=6)
+                )
             )
-        return quantity - ear_marked
+        )['profit'] or 0
 
     def get_quantity_remaining(self, date=None):
         from inventory.models import BatchMovement
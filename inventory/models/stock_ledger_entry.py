@@ -0,0 +1,161 @@
+from collections import defaultdict
+from decimal import Decimal
+from itertools import groupby
+from operator import attrgetter
+import uuid
+from django.db import models
+from django.db.models import F, OuterRef, Subquery
+
+
+class StockLedgerEntryQuerySet(models.QuerySet):
+    def balance_at(self, product, date=None, inclusive=False):
+        """
+        Return the stock balance of `product` at `date` from the latest ledger
+        row before it. Every row carries the balance after all movements
+        sharing its timestamp, so `inclusive=True` gives the balance right
+        after movements dated exactly `date`.
+        """
+        qs = self.filter(product=product)
+        if date is not None:
+            qs = qs.filter(date__lte=date) if inclusive else qs.filter(date__lt=date)
+        entry = qs.order_by('-date').values('balance').first()
+        return entry['balance'] if entry else Decimal('0.000')
+
+    def record(self, movement):
+        """
+        Insert the ledger row for `movement` and shift the running balance of
+        every later row of the same product.
+        """
+        from inventory.models import SyncChange
+
+        delta = movement.signed_quantity
+        SyncChange.objects.record([movement.product_id])
+        balance = self.balance_at(movement.product_id, movement.date, inclusive=True) + delta
+        self.filter(product_id=movement.product_id, date__gte=movement.date).update(
+            balance=F('balance') + delta
+        )
+        return self.create(
+            product_id=movement.product_id,
+            movement=movement,
+            date=movement.date,
+            quantity=delta,
+            balance=balance,
+        )
+
+    def record_many(self, movements):
+        """
+        Insert the ledger rows for `movements` and recompute the running
+        balances of every later row of their products in memory, with a
+        fixed number of queries however many movements and dates there are.
+        """
+        from inventory.models import SyncChange
+
+        movements = list(movements)
+        if not movements:
+            return []
+        start = min(movement.date for movement in movements)
+        product_ids = {movement.product_id for movement in movements}
+        SyncChange.objects.record(product_ids)
+
+        # The balance of each product right before the earliest movement
+        opening = dict(
+            self.filter(
+                product_id__in=product_ids,
+                date=Subquery(
+                    self.filter(product=OuterRef('product'), date__lt=start).order_by('-date').values('date')[:1]
+                ),
+            ).values_list('product_id', 'balance')
+        )
+        later = list(self.filter(product_id__in=product_ids, date__gte=start))
+        created = [
+            self.model(product_id=movement.product_id, movement=movement, date=movement.date, quantity=movement.signed_quantity)
+            for movement in movements
+        ]
+
+        by_product = defaultdict(list)
+        for entry in later + created:
+            by_product[entry.product_id].append(entry)
+        for product_id, entries in by_product.items():
+            balance = opening.get(product_id, Decimal('0.000'))
+            # Rows sharing a timestamp all carry the balance after the last one
+            for _, group in groupby(sorted(entries, key=attrgetter('date')), key=attrgetter('date')):
+                group = list(group)
+                balance += sum(entry.quantity for entry in group)
+                for entry in group:
+                    entry.balance = balance
+
+        self.bulk_update(later, ['balance'], batch_size=1000)
+        return self.bulk_create(created, batch_size=1000)
+
+    def discard(self, product_id, date, quantity):
+        """
+        Undo the effect of a movement of signed `quantity` at `date` on the
+        running balances of `product_id`.
+        """
+        from inventory.models import SyncChange
+
+        SyncChange.objects.record([product_id])
+        self.filter(product_id=product_id, date__gte=date).update(
+            balance=F('balance') - quantity
+        )
+
+    def rebuild(self, product_ids=None):
+        """
+        Recompute the ledger from scratch for the given products (or all).
+        """
+        from inventory.models import Product, StockMovement, SyncChange
+
+        movements = StockMovement.objects.order_by('product_id', 'date')
+        entries = self.all()
+        if product_ids is not None:
+            movements = movements.filter(product_id__in=product_ids)
+            entries = entries.filter(product_id__in=product_ids)
+        entries.delete()
+        SyncChange.objects.record(
+            product_ids if product_ids is not None else Product.objects.values_list('id', flat=True)
+        )
+
+        created = []
+        group = []
+        product_id, balance = None, Decimal('0.000')
+        for movement in movements.iterator(chunk_size=2000):
+            if movement.product_id != product_id:
+                product_id, balance = movement.product_id, Decimal('0.000')
+                group = []
+            elif group and group[-1].date != movement.date:
+                group = []
+            balance += movement.signed_quantity
+            entry = self.model(
+                product_id=movement.product_id,
+                movement=movement,
+                date=movement.date,
+                quantity=movement.signed_quantity,
+            )
+            group.append(entry)
+            created.append(entry)
+            # Rows sharing a timestamp all carry the balance after the last one
+            for entry in group:
+                entry.balance = balance
+        self.bulk_create(created, batch_size=1000)
+        return len(created)
+
+
+class StockLedgerEntry(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    product = models.ForeignKey('inventory.Product', related_name='ledger_entries', on_delete=models.CASCADE)
+    movement = models.OneToOneField('inventory.StockMovement', related_name='ledger_entry', on_delete=models.CASCADE)
+    date = models.DateTimeField()
+    quantity = models.DecimalField(decimal_places=3, max_digits=15)
+    balance = models.DecimalField(decimal_places=3, max_digits=15)
+
+    objects = StockLedgerEntryQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['product', 'date']
+        verbose_name_plural = 'Stock Ledger Entries'
+        indexes = [
+            models.Index(fields=['product', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.date.strftime('%Y-%m-%d')} - {self.balance}"
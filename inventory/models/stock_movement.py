@@ -1,3 +1,4 @@
+from decimal import Decimal
 import uuid
 from django.db import models
 from django.utils import timezone
@@ -30,5 +31,10 @@ class StockMovement(models.Model):
     def __str__(self):
         return f"{self.get_movement_type_display()} - {self.product.name} - {self.quantity}"
 
+    @property
+    def signed_quantity(self):
+        quantity = Decimal(str(self.quantity))
+        return quantity if self.movement_type == 'IN' else -quantity
+
     def get_admin_url(self):
         return f'/admin/inventory/stockmovement/{self.id}/change/'
@@ -0,0 +1,110 @@
+from collections import defaultdict
+from decimal import Decimal
+import uuid
+from django.db import models
+from django.db.models import Subquery
+from django.db.models.functions import Coalesce
+
+from utils.transactions import on_commit_once
+
+ZERO = Decimal('0.0')
+
+# The `DataVersion` counter the valuations are keyed on, bumped by every
+# change to the stock movements and batches they are computed from
+VERSION_COUNTER = 'stock'
+
+
+def _bump_version():
+    from inventory.models import DataVersion
+    DataVersion.objects.bump(VERSION_COUNTER)
+
+
+def _balances(values=()):
+    balances = defaultdict(lambda: {'quantity': ZERO, 'value': ZERO})
+    for product_id, (quantity, value) in values:
+        balances[product_id] = {'quantity': Decimal(quantity), 'value': Decimal(value)}
+    return balances
+
+
+class StockValuationQuerySet(models.QuerySet):
+    def closing_at(self, date, products=None):
+        """
+        `ProductDailySnapshot.objects.closing_at`, remembered for `date` until
+        the stock version changes.
+
+        The valuation of every product is computed on the first request for
+        a date, so later requests for any subset of products read the stored
+        row instead. The stock version is only bumped once the changes it
+        covers commit, and is read here before the stock is, so a valuation
+        stored under a version never predates the changes that bumped it.
+        """
+        from inventory.models import DataVersion, ProductDailySnapshot
+
+        # 0, as `DataVersion.objects.current`, until the counter is first bumped
+        current = Coalesce(Subquery(DataVersion.objects.filter(name=VERSION_COUNTER).values('value')[:1]), 0)
+        stored = self.filter(data_version=current, date=date).values_list('balances', flat=True).first()
+        if stored is not None:
+            balances = _balances((uuid.UUID(product_id), values) for product_id, values in stored.items())
+        else:
+            version = DataVersion.objects.current(VERSION_COUNTER)
+            balances = ProductDailySnapshot.objects.closing_at(date)
+            self.store(version, date, balances)
+
+        if products is None:
+            return balances
+        product_ids = {getattr(product, 'pk', product) for product in products}
+        return _balances(
+            (product_id, (balance['quantity'], balance['value']))
+            for product_id, balance in balances.items() if product_id in product_ids
+        )
+
+    def store(self, data_version, date, balances):
+        """
+        Store the valuation at `date`. Those of older versions are left for
+        `prune`, so reads never wait on deleting them.
+        """
+        # Ignoring the valuation stored meanwhile by a concurrent request
+        self.bulk_create([self.model(data_version=data_version, date=date, balances={
+            str(product_id): [str(balance['quantity']), str(balance['value'])]
+            for product_id, balance in balances.items()
+        })], ignore_conflicts=True)
+
+    def invalidate(self):
+        """
+        Bump the stock version once the current transaction commits, so the
+        stored valuations are computed again. However many rows the
+        transaction changes, the counter's row is updated once and never
+        locked while the transaction runs.
+        """
+        on_commit_once(_bump_version)
+
+    def prune(self):
+        """
+        Delete the valuations of older stock versions.
+
+        :return: the number of valuations deleted
+        """
+        from inventory.models import DataVersion
+        return self.filter(data_version__lt=DataVersion.objects.current(VERSION_COUNTER)).delete()[0]
+
+
+class StockValuation(models.Model):
+    """
+    The stock level and value of every product at a date, stored under the
+    stock version it was computed at and reused until the version changes.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    date = models.DateTimeField()
+    data_version = models.PositiveBigIntegerField()
+    balances = models.JSONField(help_text='{product_id: [quantity, value]}')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = StockValuationQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'data_version'], name='unique_stock_valuation_version'),
+        ]
+
+    def __str__(self):
+        return f"{self.date.strftime('%Y-%m-%d %H:%M')} @ {self.data_version}"
@@ -0,0 +1,118 @@
+from django.db import models, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from utils.transactions import on_commit_once
+
+# The `DataVersion` counter holding the latest sequence handed out
+SEQUENCE_COUNTER = 'sync'
+
+
+def _publish():
+    SyncChange.objects.publish()
+
+
+class SyncChangeQuerySet(models.QuerySet):
+    def record(self, product_ids, deleted=False):
+        """
+        Log a change of the products with `product_ids`, to be pulled by the
+        POS on its next sync once the current transaction commits.
+        """
+        product_ids = set(product_ids)
+        changes = self.bulk_create([self.model(product_id=product_id, deleted=deleted) for product_id in product_ids])
+        # A single numbering covers every change of the transaction
+        on_commit_once(_publish)
+        return changes
+
+    def publish(self):
+        """
+        Number the committed changes that have no sequence yet, after the
+        latest one handed out.
+
+        The counter row stays locked until the numbering commits, so
+        sequences become visible in increasing order: once a client has
+        pulled a sequence, no lower one can appear later. Sequences taken
+        at insert time would not give that, as a long transaction could
+        commit a lower one after a client moved past it.
+
+        :return: The number of changes numbered.
+        """
+        from inventory.models import DataVersion
+
+        with transaction.atomic():
+            latest = DataVersion.objects.locked(SEQUENCE_COUNTER)
+            pending = list(self.filter(sequence__isnull=True).order_by('id'))
+            for i, change in enumerate(pending, 1):
+                change.sequence = latest + i
+            self.bulk_update(pending, ['sequence'], batch_size=1000)
+            DataVersion.objects.filter(name=SEQUENCE_COUNTER).update(value=latest + len(pending))
+        return len(pending)
+
+    def latest_sequence(self):
+        return self.aggregate(latest=Max('sequence'))['latest'] or 0
+
+    def is_expired(self, cursor):
+        """
+        Whether changes after `cursor` may have been pruned, so a client at
+        that cursor has to pull everything again.
+        """
+        oldest = self.aggregate(oldest=Min('sequence'))['oldest']
+        return oldest is not None and cursor < oldest - 1
+
+    def since(self, cursor, limit):
+        """
+        The changes after `cursor`, oldest first, with a single entry per
+        product carrying its latest state.
+
+        :return: `(changes, next cursor, whether more changes follow)`, where
+            `changes` is `{product_id: deleted}`.
+        """
+        rows = list(
+            self.filter(sequence__gt=cursor)
+            .order_by('sequence')
+            .values_list('sequence', 'product_id', 'deleted')[:limit + 1]
+        )
+        more = len(rows) > limit
+        rows = rows[:limit]
+        changes = {product_id: deleted for _, product_id, deleted in rows}
+        return changes, rows[-1][0] if rows else cursor, more
+
+    def prune(self, max_age):
+        """
+        Delete the published changes logged longer than `max_age` ago,
+        always keeping the latest one so the sequence carries on from it.
+
+        :return: The number of changes deleted.
+        """
+        return (
+            self.filter(sequence__isnull=False, created_at__lt=timezone.now() - max_age)
+            .exclude(sequence=self.latest_sequence())
+            .delete()[0]
+        )
+
+
+class SyncChange(models.Model):
+    """
+    An append-only log of the products whose name, prices or stock level
+    changed, numbered by a monotonic sequence the POS syncs from. Changes
+    are numbered when the transaction recording them commits, see
+    `publish`, and are not served before.
+
+    The product is not a foreign key so that deletions are kept as
+    tombstones.
+    """
+    id = models.BigAutoField(primary_key=True)
+    sequence = models.PositiveBigIntegerField(null=True, blank=True, unique=True)
+    product_id = models.UUIDField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = SyncChangeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.sequence}: {self.product_id}{' (deleted)' if self.deleted else ''}"
@@ -0,0 +1,118 @@
+import base64
+import datetime
+import json
+import typing
+import strawberry
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+from strawberry_django.resolvers import django_resolver
+
+T = typing.TypeVar('T')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+@strawberry.type
+class PageInfo:
+    has_next_page: bool
+    end_cursor: typing.Optional[str]
+
+
+@strawberry.type
+class Edge(typing.Generic[T]):
+    cursor: str
+    node: T
+
+
+@strawberry.type
+class Connection(typing.Generic[T]):
+    edges: typing.List[Edge[T]]
+    page_info: PageInfo
+    queryset: strawberry.Private[QuerySet]
+
+    @strawberry.field
+    @django_resolver
+    def total_count(self) -> int:
+        """
+        The number of rows matching the filters, only counted when asked for.
+        """
+        return self.queryset.count()
+
+
+def _cursor_value(value):
+    # `DjangoJSONEncoder` cuts datetimes to milliseconds, which would make
+    # the cursor skip rows sharing the timestamp down to the microsecond
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(values):
+    values = [_cursor_value(value) for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values, cls=DjangoJSONEncoder).encode()).decode()
+
+
+def decode_cursor(queryset, ordering, cursor):
+    """
+    The values of the `ordering` fields encoded in `cursor`.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise ValueError
+        return [
+            queryset.model._meta.get_field(name.lstrip('-')).to_python(value)
+            for name, value in zip(ordering, values)
+        ]
+    except (ValueError, ValidationError):
+        raise ValueError(f"Invalid cursor {cursor!r}")
+
+
+def after_cursor(ordering, values):
+    """
+    Rows strictly after `values` in `ordering`, e.g. for `('-date', '-id')`:
+    `date < d OR (date = d AND id < i)`.
+    """
+    condition = Q()
+    for i, (name, value) in enumerate(zip(ordering, values)):
+        field = name.lstrip('-')
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        equal = {previous.lstrip('-'): previous_value for previous, previous_value in zip(ordering[:i], values[:i])}
+        condition |= Q(**equal, **{f'{field}__{lookup}': value})
+    return condition
+
+
+def paginate(queryset, ordering, first=DEFAULT_PAGE_SIZE, after=None):
+    """
+    Keyset pagination of `queryset` by `ordering`, which must end with a
+    unique field. Pages are found by seeking past the cursor, so later pages
+    cost the same as the first one.
+
+    :return: A `Connection` of the `first` rows after the cursor `after`.
+    """
+    first = max(0, min(first, MAX_PAGE_SIZE))
+    queryset = queryset.order_by(*ordering)
+    page = queryset
+    if after is not None:
+        page = page.filter(after_cursor(ordering, decode_cursor(queryset, ordering, after)))
+
+    # One extra row tells whether there is a next page
+    rows = list(page[:first + 1])
+    has_next_page = len(rows) > first
+    edges = [
+        Edge(
+            cursor=encode_cursor([getattr(row, name.lstrip('-')) for name in ordering]),
+            node=row,
+        )
+        for row in rows[:first]
+    ]
+    return Connection(
+        edges=edges,
+        page_info=PageInfo(
+            has_next_page=has_next_page,
+            end_cursor=edges[-1].cursor if edges else None,
+        ),
+        queryset=queryset,
+    )
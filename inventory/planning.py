@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+from decimal import Decimal
+import math
+from django.conf import settings
+from django.db.models import DecimalField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from inventory.demand import average_in_stock_demand, demand_frames
+from inventory.models import Product, PurchaseItem, StockLedgerEntry
+
+ZERO = Decimal('0.0')
+
+
+@dataclass
+class ReorderLine:
+    product: Product
+    stock_level: Decimal
+    average_consumption: Decimal
+    days_until_stockout: Decimal
+    reorder_quantity: Decimal
+    batch_sized_reorder_quantity: Decimal
+    unit_cost: Decimal
+
+    @property
+    def reorder_value(self):
+        return self.batch_sized_reorder_quantity * self.unit_cost
+
+    def as_dict(self):
+        return {
+            'product_id': str(self.product.pk),
+            'product': self.product.name,
+            'unit': self.product.unit,
+            'stock_level': self.stock_level,
+            'average_consumption': self.average_consumption,
+            'days_until_stockout': self.days_until_stockout,
+            'reorder_quantity': self.reorder_quantity,
+            'batch_sized_reorder_quantity': self.batch_sized_reorder_quantity,
+            'unit_cost': self.unit_cost,
+            'reorder_value': self.reorder_value,
+        }
+
+
+class ReorderPlanner:
+    """
+    Works out how much of each product to buy for its stock to last
+    `horizon_days`, for all products at once.
+
+    The rules are those of `Product.reorder_quantity`: a product consuming
+    its average in-stock demand per day is reordered when its stock runs out
+    within the horizon, up to the stock covering the whole horizon, rounded
+    up to whole batches and priced at its latest purchase cost. Instead of
+    evaluating them product by product, the inputs come from a fixed number
+    of grouped queries: the products with their stock level and latest
+    unit cost, and their sales and stock movements for consumption.
+    """
+
+    def __init__(self, horizon_days=None):
+        self.horizon_days = horizon_days if horizon_days is not None else settings.REORDER_INTERVAL_DAYS
+
+    def products(self, products=None):
+        if products is None:
+            products = Product.objects.filter(is_active=True)
+        decimal = DecimalField(max_digits=15, decimal_places=6)
+        return list(products.annotate(
+            ledger_balance=Coalesce(
+                Subquery(StockLedgerEntry.objects.filter(product=OuterRef('pk')).order_by('-date').values('balance')[:1]),
+                Value(ZERO),
+                output_field=decimal,
+            ),
+            latest_unit_cost=Coalesce(
+                Subquery(
+                    PurchaseItem.objects.filter(product=OuterRef('pk')).order_by('-purchase__date').values('unit_cost')[:1]
+                ),
+                Value(ZERO),
+                output_field=decimal,
+            ),
+        ).order_by('name'))
+
+    def line(self, product, consumption):
+        stock_level = product.ledger_balance
+        days = stock_level / consumption if consumption else ZERO
+        required = ZERO
+        if consumption > 0 and days < self.horizon_days:
+            required = max(self.horizon_days * consumption - stock_level, ZERO)
+        batch_size = product.batch_size or 1
+        batches = math.ceil(required / batch_size)
+        return ReorderLine(
+            product=product,
+            stock_level=stock_level,
+            average_consumption=consumption,
+            days_until_stockout=days,
+            reorder_quantity=required,
+            batch_sized_reorder_quantity=Decimal(batches * batch_size),
+            unit_cost=product.latest_unit_cost,
+        )
+
+    def plan(self, products=None):
+        """
+        The reorder line of every product in `products`, by default every
+        active product, whether it needs reordering or not.
+        """
+        products = self.products(products)
+        demand = demand_frames(products)
+        return [
+            self.line(product, Decimal(average_in_stock_demand(demand[product.pk], settings.AVERAGE_INTERVAL_DAYS)))
+            for product in products
+        ]
+
+    def reorders(self, products=None):
+        """
+        The reorder lines of the products that need reordering.
+        """
+        return [line for line in self.plan(products) if line.reorder_quantity > 0]
@@ -1,36 +1,134 @@
+import datetime
 import typing
 import strawberry
+from django.db.models import Exists, OuterRef, Q
 from strawberry_django.optimizer import DjangoOptimizerExtension
+from strawberry_django.resolvers import django_resolver
 
 from . import types
 from . import models
+from .pagination import DEFAULT_PAGE_SIZE, Connection, paginate
+
+# Newest first, with the id breaking ties between rows on the same date
+BY_DATE = ('-date', '-id')
+
+
+def filter_dates(queryset, date_from, date_to):
+    if date_from is not None:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to is not None:
+        queryset = queryset.filter(date__lte=date_to)
+    return queryset
 
 
 @strawberry.type
 class Query:
     @strawberry.field
-    def products(self, info: strawberry.Info, name: str = None) -> typing.List[types.Product]:
-        return models.Product.objects.filter(is_active=True)
+    @django_resolver
+    def products(
+        self,
+        info: strawberry.Info,
+        name: typing.Optional[str] = None,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: typing.Optional[str] = None,
+    ) -> Connection[types.Product]:
+        queryset = models.Product.objects.filter(is_active=True)
+        if name:
+            queryset = queryset.filter(name__icontains=name)
+        return paginate(queryset, ('name', 'id'), first, after)
 
     @strawberry.field
     def product(self, info: strawberry.Info, id: strawberry.ID) -> types.Product:
         return models.Product.objects.aget(id=id)
 
     @strawberry.field
-    def purchases(self, info: strawberry.Info) -> typing.List[types.Purchase]:
-        return models.Purchase.objects.all()
+    @django_resolver
+    def purchases(
+        self,
+        info: strawberry.Info,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: typing.Optional[str] = None,
+        date_from: typing.Optional[datetime.datetime] = None,
+        date_to: typing.Optional[datetime.datetime] = None,
+        product: typing.Optional[strawberry.ID] = None,
+        search: typing.Optional[str] = None,
+    ) -> Connection[types.Purchase]:
+        queryset = filter_dates(models.Purchase.objects.all(), date_from, date_to)
+        if product is not None:
+            queryset = queryset.filter(Exists(models.PurchaseItem.objects.filter(purchase=OuterRef('pk'), product=product)))
+        if search:
+            queryset = queryset.filter(notes__icontains=search)
+        return paginate(queryset, BY_DATE, first, after)
 
     @strawberry.field
-    def sales(self, info: strawberry.Info) -> typing.List[types.Sale]:
-        return models.Sale.objects.all()
+    @django_resolver
+    def sales(
+        self,
+        info: strawberry.Info,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: typing.Optional[str] = None,
+        date_from: typing.Optional[datetime.datetime] = None,
+        date_to: typing.Optional[datetime.datetime] = None,
+        product: typing.Optional[strawberry.ID] = None,
+        search: typing.Optional[str] = None,
+    ) -> Connection[types.Sale]:
+        queryset = filter_dates(models.Sale.objects.all(), date_from, date_to)
+        if product is not None:
+            queryset = queryset.filter(Exists(models.SaleItem.objects.filter(sale=OuterRef('pk'), product=product)))
+        if search:
+            queryset = queryset.filter(notes__icontains=search)
+        return paginate(queryset, BY_DATE, first, after)
 
     @strawberry.field
-    def stock_adjustments(self, info: strawberry.Info) -> typing.List[types.StockAdjustment]:
-        return models.StockAdjustment.objects.all()
+    @django_resolver
+    def stock_adjustments(
+        self,
+        info: strawberry.Info,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: typing.Optional[str] = None,
+        date_from: typing.Optional[datetime.datetime] = None,
+        date_to: typing.Optional[datetime.datetime] = None,
+        product: typing.Optional[strawberry.ID] = None,
+        search: typing.Optional[str] = None,
+    ) -> Connection[types.StockAdjustment]:
+        queryset = filter_dates(models.StockAdjustment.objects.all(), date_from, date_to)
+        if product is not None:
+            queryset = queryset.filter(product=product)
+        if search:
+            queryset = queryset.filter(reason__icontains=search)
+        return paginate(queryset, BY_DATE, first, after)
 
     @strawberry.field
-    def stock_conversions(self, info: strawberry.Info) -> typing.List[types.StockConversion]:
-        return models.StockConversion.objects.all()
+    @django_resolver
+    def stock_conversions(
+        self,
+        info: strawberry.Info,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: typing.Optional[str] = None,
+        date_from: typing.Optional[datetime.datetime] = None,
+        date_to: typing.Optional[datetime.datetime] = None,
+        product: typing.Optional[strawberry.ID] = None,
+        search: typing.Optional[str] = None,
+    ) -> Connection[types.StockConversion]:
+        queryset = filter_dates(models.StockConversion.objects.all(), date_from, date_to)
+        if product is not None:
+            queryset = queryset.filter(Q(from_product=product) | Q(to_product=product))
+        if search:
+            queryset = queryset.filter(reason__icontains=search)
+        return paginate(queryset, BY_DATE, first, after)
+
+    @strawberry.field
+    @django_resolver
+    def reorder_plan(
+        self,
+        info: strawberry.Info,
+        horizon_days: typing.Optional[int] = None,
+        only_reorders: bool = True,
+    ) -> typing.List[types.ReorderLine]:
+        from .planning import ReorderPlanner
+
+        planner = ReorderPlanner(horizon_days)
+        return planner.reorders() if only_reorders else planner.plan()
 
 
 schema = strawberry.Schema(query=Query, extensions=[DjangoOptimizerExtension])
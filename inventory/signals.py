@@ -1,13 +1,86 @@
-from django.db.models.signals import post_save, pre_delete
+from django.db.models import Q
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, pre_save, pre_delete, post_delete
 from django.dispatch import receiver
 from django.contrib.contenttypes.models import ContentType
 from django.db import transaction
+from contextlib import contextmanager
+from threading import local
 from logging import getLogger
 
-from .models import Expense, StockBatch, BatchMovement, PurchaseItem, SaleItem, StockAdjustment, StockConversion, StockMovement, Transaction
+from . import cache
+from .models import CashCheckpoint, DataVersion, Expense, Product, Sale, StockBatch, BatchMovement, ProductDailySnapshot, PurchaseItem, SaleItem, StockAdjustment, StockConversion, StockMovement, StockLedgerEntry, StockValuation, SyncChange, Transaction
+from utils.transactions import on_commit_once
 
 logger = getLogger(__name__)
 
+_state = local()
+
+
+# Product and date lookups of the rows each document feeds into the daily
+# snapshots, besides the batch movements linked to it
+SNAPSHOT_SOURCES = {
+    PurchaseItem: (('product', 'purchase__date'),),
+    SaleItem: (('product', 'sale__date'),),
+    StockAdjustment: (('product', 'date'),),
+    StockConversion: (('from_product', 'date'), ('to_product', 'date')),
+}
+
+
+@contextmanager
+def ledger_suspended():
+    """
+    Skip the per-row stock ledger and daily snapshot upkeep. Meant for bulk
+    rebuilds that recompute both with `StockLedgerEntry.objects.rebuild` and
+    `ProductDailySnapshot.objects.rebuild` afterwards.
+    """
+    _state.ledger_suspended = True
+    try:
+        yield
+    finally:
+        _state.ledger_suspended = False
+
+
+def snapshot_keys(instance):
+    """
+    Return the `(product_id, date)` pairs whose daily snapshot depends on
+    `instance` as currently stored, including the batch movements it created
+    and those consuming the batches it created.
+    """
+    model = type(instance)
+    rows = model.objects.filter(pk=instance.pk)
+    keys = set()
+    for product, date in SNAPSHOT_SOURCES[model]:
+        keys.update(rows.values_list(product, date))
+
+    content_type = ContentType.objects.get_for_model(model)
+    keys.update(
+        BatchMovement.objects.filter(
+            Q(content_type=content_type, object_id=instance.pk)
+            | Q(batch__content_type=content_type, batch__object_id=instance.pk)
+        )
+        .annotate(snapshot_date=Greatest('date', 'batch__date_received'))
+        .values_list('batch__product', 'snapshot_date')
+    )
+    return keys
+
+
+# Registered ahead of the handlers below, which delete derived rows the
+# old snapshot keys are read from
+@receiver(pre_save, sender=PurchaseItem)
+@receiver(pre_save, sender=SaleItem)
+@receiver(pre_save, sender=StockAdjustment)
+@receiver(pre_save, sender=StockConversion)
+@receiver(pre_delete, sender=PurchaseItem)
+@receiver(pre_delete, sender=SaleItem)
+@receiver(pre_delete, sender=StockAdjustment)
+@receiver(pre_delete, sender=StockConversion)
+def stash_snapshot_keys(sender, instance, **kwargs):
+    if getattr(_state, 'ledger_suspended', False) or instance._state.adding:
+        instance._snapshot_keys = set()
+        return
+    instance._snapshot_keys = snapshot_keys(instance)
+
 
 @receiver(post_save, sender=PurchaseItem)
 def on_purchase_item_save(sender, instance: PurchaseItem, created, **kwargs):
@@ -31,6 +104,9 @@ def on_purchase_item_save(sender, instance: PurchaseItem, created, **kwargs):
         object_id=instance.id,
         defaults=dict(
             date_received=instance.purchase.date,
+            product=instance.product,
+            quantity=instance.quantity,
+            unit_cost=instance.unit_cost,
         )
     )
 
@@ -139,6 +215,9 @@ def on_stock_adjustment_save(sender, instance: StockAdjustment, created, **kwarg
             object_id=instance.id,
             defaults=dict(
                 date_received=instance.date,
+                product=instance.product,
+                quantity=instance.quantity,
+                unit_cost=instance.unit_cost,
             )
         )
         StockMovement.objects.update_or_create(
@@ -204,6 +283,9 @@ def on_stock_conversion_save(sender, instance: StockConversion, created, **kwarg
         object_id=instance.id,
         defaults=dict(
             date_received=instance.date,
+            product=instance.to_product,
+            quantity=instance.quantity,
+            unit_cost=instance.unit_cost,
         )
     )
 
@@ -222,8 +304,138 @@ def on_stock_batch_save(sender, instance: StockBatch, created, **kwargs):
         movement_type=BatchMovement.MovementType.IN,
         batch=instance,
         defaults=dict(
-            quantity=instance.linked_object.quantity,
+            quantity=instance.quantity,
             date=instance.date_received,
-            description=f"Creation of {instance.linked_object.quantity} {instance.linked_object.product.unit} {instance.linked_object.product.name}",
+            description=f"Creation of {instance.quantity} {instance.product.unit} {instance.product.name}",
+            unit_cost=instance.unit_cost,
         )
     )
+    # Movements out of the batch carry its cost too
+    instance.movements.exclude(unit_cost=instance.unit_cost).update(unit_cost=instance.unit_cost)
+
+
+@receiver(post_save, sender=StockMovement)
+def on_stock_movement_save(sender, instance: StockMovement, created, **kwargs):
+    if getattr(_state, 'ledger_suspended', False):
+        return
+
+    entry = StockLedgerEntry.objects.filter(movement=instance).first()
+    if entry is not None:
+        StockLedgerEntry.objects.discard(entry.product_id, entry.date, entry.quantity)
+        entry.delete()
+    StockLedgerEntry.objects.record(instance)
+
+
+@receiver(post_delete, sender=StockMovement)
+def on_stock_movement_delete(sender, instance: StockMovement, **kwargs):
+    if getattr(_state, 'ledger_suspended', False):
+        return
+
+    StockLedgerEntry.objects.discard(instance.product_id, instance.date, instance.signed_quantity)
+
+
+# Registered last so the snapshots are refreshed from the final derived rows
+@receiver(post_save, sender=PurchaseItem)
+@receiver(post_save, sender=SaleItem)
+@receiver(post_save, sender=StockAdjustment)
+@receiver(post_save, sender=StockConversion)
+def refresh_snapshots_on_save(sender, instance, **kwargs):
+    if getattr(_state, 'ledger_suspended', False):
+        return
+
+    keys = getattr(instance, '_snapshot_keys', set()) | snapshot_keys(instance)
+    ProductDailySnapshot.objects.touch(keys)
+
+
+@receiver(post_delete, sender=PurchaseItem)
+@receiver(post_delete, sender=SaleItem)
+@receiver(post_delete, sender=StockAdjustment)
+@receiver(post_delete, sender=StockConversion)
+def refresh_snapshots_on_delete(sender, instance, **kwargs):
+    if getattr(_state, 'ledger_suspended', False):
+        return
+
+    ProductDailySnapshot.objects.touch(getattr(instance, '_snapshot_keys', set()))
+
+
+@receiver(post_save, sender=StockMovement)
+@receiver(post_delete, sender=StockMovement)
+@receiver(post_save, sender=StockBatch)
+@receiver(post_delete, sender=StockBatch)
+@receiver(post_save, sender=SaleItem)
+@receiver(post_delete, sender=SaleItem)
+def invalidate_product_metrics(sender, instance, **kwargs):
+    if getattr(_state, 'ledger_suspended', False) or instance.product_id is None:
+        return
+
+    cache.invalidate(instance.product_id)
+
+
+@receiver(pre_save, sender=Transaction)
+def stash_cash_dates(sender, instance: Transaction, **kwargs):
+    # The stored date, whose checkpoint also changes if the date is moved
+    instance._cash_dates = set(Transaction.objects.filter(pk=instance.pk).values_list('date', flat=True))
+
+
+@receiver(post_save, sender=Transaction)
+def on_transaction_save(sender, instance: Transaction, **kwargs):
+    CashCheckpoint.objects.touch(getattr(instance, '_cash_dates', set()) | {instance.date})
+
+
+@receiver(post_delete, sender=Transaction)
+def on_transaction_delete(sender, instance: Transaction, **kwargs):
+    CashCheckpoint.objects.touch([instance.date])
+
+
+@receiver(post_save, sender=Product)
+def on_product_save(sender, instance: Product, **kwargs):
+    SyncChange.objects.record([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def on_product_delete(sender, instance: Product, **kwargs):
+    SyncChange.objects.record([instance.pk], deleted=True)
+
+
+@receiver(post_save, sender=StockMovement)
+@receiver(post_delete, sender=StockMovement)
+@receiver(post_save, sender=BatchMovement)
+@receiver(post_delete, sender=BatchMovement)
+@receiver(post_save, sender=StockBatch)
+@receiver(post_delete, sender=StockBatch)
+def invalidate_stock_valuations(sender, instance, **kwargs):
+    if getattr(_state, 'ledger_suspended', False):
+        return
+
+    StockValuation.objects.invalidate()
+
+
+def _bump_data_version():
+    DataVersion.objects.bump()
+
+
+# What the reports read: products, sales and expenses directly, purchases,
+# adjustments and conversions through the stock movements, batches and
+# transactions derived from them
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Sale)
+@receiver(post_delete, sender=Sale)
+@receiver(post_save, sender=SaleItem)
+@receiver(post_delete, sender=SaleItem)
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+@receiver(post_save, sender=StockMovement)
+@receiver(post_delete, sender=StockMovement)
+@receiver(post_save, sender=StockBatch)
+@receiver(post_delete, sender=StockBatch)
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def bump_data_version(sender, instance, **kwargs):
+    if getattr(_state, 'ledger_suspended', False):
+        return
+
+    # Once per transaction and after it commits, so the counter's row is not
+    # locked while the transaction runs and the new version is never read
+    # before the data it covers
+    on_commit_once(_bump_data_version)
@@ -0,0 +1,70 @@
+from decimal import Decimal
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from inventory.models import Product, StockLedgerEntry, SyncChange
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 2000
+
+FIELDS = ('id', 'name', 'unit', 'unit_price', 'stock_level')
+
+
+def product_rows(queryset):
+    """
+    The synced fields of the products in `queryset`, as lists in the order
+    of `FIELDS`, with the stock level from the latest ledger row.
+    """
+    balance = StockLedgerEntry.objects.filter(product=OuterRef('pk')).order_by('-date').values('balance')[:1]
+    return [
+        list(row)
+        for row in queryset.annotate(
+            stock_level=Coalesce(Subquery(balance), Value(Decimal('0.000'))),
+        ).order_by('name').values_list(*FIELDS)
+    ]
+
+
+def change_feed(cursor=0, limit=DEFAULT_LIMIT):
+    """
+    The products changed since the sync `cursor`, for the POS to apply to
+    its local copy.
+
+    A `cursor` of 0, or one older than the pruned part of the change log,
+    returns every active product with `reset` set, and the client replaces
+    its copy. Otherwise at most `limit` changes are returned; products that
+    were deleted or deactivated are listed by id in `deleted`. Clients pull
+    again from the returned `cursor` while `more` is set.
+
+    Changes are numbered when the transaction recording them commits, in
+    the order of those commits, so pulling from the last returned cursor
+    never misses a change: any change committed after the pull gets a
+    higher sequence.
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    if cursor <= 0 or SyncChange.objects.is_expired(cursor):
+        # Read before the products, so changes made meanwhile are pulled again
+        # on the next sync rather than missed
+        latest = SyncChange.objects.latest_sequence()
+        return {
+            'cursor': latest,
+            'more': False,
+            'reset': True,
+            'fields': FIELDS,
+            'products': product_rows(Product.objects.filter(is_active=True)),
+            'deleted': [],
+        }
+
+    changes, next_cursor, more = SyncChange.objects.since(cursor, limit)
+    products = product_rows(Product.objects.filter(
+        pk__in=[product_id for product_id, deleted in changes.items() if not deleted],
+        is_active=True,
+    ))
+    present = {row[0] for row in products}
+    return {
+        'cursor': next_cursor,
+        'more': more,
+        'reset': False,
+        'fields': FIELDS,
+        'products': products,
+        'deleted': [product_id for product_id in changes if product_id not in present],
+    }
@@ -0,0 +1,236 @@
+import csv
+import datetime
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+from django.http import StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+from inventory.models import Transaction
+
+# Rows fetched per database round trip while streaming
+CHUNK_SIZE = 2000
+
+# Sign of each transaction type in the cash balance, as in `signed_amount`
+CASH_SIGNS = {'SALE': 1, 'PURCHASE': -1, 'EXPENSE': -1, 'ADJUSTMENT': 1}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def movement_rows(report):
+    header = [
+        'Product', 'Unit', 'Opening Stock Level', 'Incoming Stock', 'Conversions From', 'Conversions To',
+        'Adjustments', 'Closing Stock Level', 'Outgoing Stock', 'Sold Stock', 'Opening Stock Value',
+        'Closing Stock Value',
+    ]
+    rows = (
+        [
+            row['product'].name, row['product'].unit, row['opening_stock_level'], row['incoming_stock'],
+            row['conversions_from'], row['conversions_to'], row['adjustments'], row['closing_stock_level'],
+            row['outgoing_stock'], row['sold_stock'], row['opening_stock_value'], row['closing_stock_value'],
+        ]
+        for row in report.inventory_balances
+    )
+    return f"inventory_movements_{report.id}", header, rows
+
+
+def profitability_rows(report):
+    header = [
+        'Product', 'Sales', 'Opening Inventory', 'Purchases', 'Conversions To', 'Closing Inventory',
+        'Cost of Goods Sold', 'Conversions From', 'Average Unit Cost', 'Average Unit Cost Adjusted',
+        'Average Unit Price', 'Average Unit Profit', 'Gross Profit',
+    ]
+    rows = (
+        [
+            row['product'].name, row['sales'], row['opening_stock_value'], row['purchases'], row['conversions_to'],
+            row['closing_stock_value'], row['cost_of_goods_sold'], row['conversions_from'], row['average_unit_cost'],
+            row['average_unit_cost_with_adjustments'], row['average_unit_price'], row['average_unit_profit'],
+            row['gross_profit'],
+        ]
+        for row in report.product_performances
+    )
+    return f"profitability_{report.id}", header, rows
+
+
+def transaction_rows(report):
+    """
+    The transactions of the report's period, oldest first, with the cash
+    balance after each of them.
+    """
+    header = ['Date', 'Type', 'Amount', 'Cash Balance', 'Source', 'Source ID']
+
+    def rows():
+        balance = report.opening_cash
+        transactions = (
+            Transaction.objects
+            .filter(date__gte=report.open_date, date__lt=report.close_date)
+            .order_by('date', 'id')
+            .values_list('date', 'transaction_type', 'amount', 'content_type__model', 'object_id')
+        )
+        for date, transaction_type, amount, source, object_id in transactions.iterator(chunk_size=CHUNK_SIZE):
+            balance += CASH_SIGNS.get(transaction_type, 0) * amount
+            yield [date, transaction_type, amount, balance, source or '', object_id or '']
+
+    return f"transactions_{report.id}", header, rows()
+
+
+def product_movement_rows(product):
+    """
+    Every stock movement of `product`, oldest first, with the stock balance
+    after each of them.
+    """
+    header = ['Date', 'Type', 'Quantity', 'Balance', 'Source', 'Source ID']
+
+    def rows():
+        balance = 0
+        movements = (
+            product.stock_movements
+            .order_by('date', 'movement_type', 'id')
+            .values_list('date', 'movement_type', 'quantity', 'content_type__model', 'object_id')
+        )
+        for date, movement_type, quantity, source, object_id in movements.iterator(chunk_size=CHUNK_SIZE):
+            balance += quantity if movement_type == 'IN' else -quantity
+            yield [date, movement_type, quantity, balance, source or '', object_id or '']
+
+    return f"{product.name} movements", header, rows()
+
+
+class Echo:
+    """
+    A file-like object handing back what is written to it, so `csv.writer`
+    can format one row at a time.
+    """
+    def write(self, value):
+        return value
+
+
+def _text(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def csv_chunks(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([_text(value) for value in row])
+
+
+class _Buffer:
+    """
+    An unseekable file collecting what a `ZipFile` writes until it is
+    drained, so the archive can be sent while it is being built.
+    """
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+# Characters XML 1.0 does not allow, even escaped
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _cell(value):
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    text = escape(_INVALID_XML.sub('', _text(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _row(values):
+    return ('<row>' + ''.join(_cell(value) for value in values) + '</row>').encode()
+
+
+def xlsx_chunks(header, rows):
+    """
+    A single sheet workbook of `header` and `rows`, yielded as it is
+    compressed. Strings are stored inline rather than in a shared table, so
+    no row has to be kept once written.
+    """
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_row(header))
+            for i, row in enumerate(rows, 1):
+                sheet.write(_row(row))
+                if i % CHUNK_SIZE == 0:
+                    yield buffer.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.drain()
+
+
+WRITERS = {
+    'csv': csv_chunks,
+    'xlsx': xlsx_chunks,
+}
+
+
+def streaming_response(fmt, table):
+    """
+    Stream the `(filename, header, rows)` of `table` as a `fmt` file, one
+    chunk of rows at a time.
+    """
+    filename, header, rows = table
+    response = StreamingHttpResponse(WRITERS[fmt](header, rows), content_type=CONTENT_TYPES[fmt])
+    # Product names may hold quotes, semicolons or non ASCII characters
+    response['Content-Disposition'] = content_disposition_header(True, f"{filename}.{fmt}")
+    return response
@@ -1,11 +1,106 @@
+from logging import getLogger
 from django_q.tasks import async_task
+from django.core.files.base import ContentFile
 from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+
+logger = getLogger(__name__)
 
 
 def recreate_batches_task():
-    call_command('recreate_batches')
+    call_command('recreate_batches', replay=True)
 
 
 def trigger_recreate_batches():
     task_id = async_task('inventory.tasks.recreate_batches_task')
     return task_id
+
+
+def forecast_demand_task():
+    """
+    Forecast the demand of every product in the worker's own process. The
+    cluster's workers are daemonic, and daemonic processes may not start
+    the process pool `ForecastRunner` otherwise fits in.
+    """
+    from inventory.forecasting import ForecastRunner
+    return ForecastRunner(workers=1).run()
+
+
+def trigger_forecast_demand():
+    task_id = async_task('inventory.tasks.forecast_demand_task')
+    return task_id
+
+
+def plan_reorders_task(horizon_days=None):
+    """
+    The products to reorder for the coming `horizon_days`, as plain dicts
+    kept with the task result.
+    """
+    from inventory.planning import ReorderPlanner
+    reorders = ReorderPlanner(horizon_days).reorders()
+    logger.info(f"{len(reorders)} products to reorder, ${sum(line.reorder_value for line in reorders):.2f} in total")
+    return [line.as_dict() for line in reorders]
+
+
+def prune_sync_changes_task():
+    from datetime import timedelta
+    from django.conf import settings
+    from inventory.models import SyncChange
+    # Number the changes left behind by a process that died between a
+    # commit and its `on_commit` callbacks
+    SyncChange.objects.publish()
+    return SyncChange.objects.prune(timedelta(days=settings.SYNC_CHANGE_MAX_AGE_DAYS))
+
+
+def prune_stock_valuations_task():
+    from inventory.models import StockValuation
+    return StockValuation.objects.prune()
+
+
+def render_report_artifact_task(artifact_id):
+    """
+    Render a queued PDF export and store it on its artifact, replacing the
+    artifacts of the same export rendered at older data versions.
+    """
+    from inventory.exports import render_pdf
+    from inventory.models import ReportArtifact
+
+    artifact = ReportArtifact.objects.get(pk=artifact_id)
+    artifact.status = ReportArtifact.Status.RUNNING
+    artifact.save(update_fields=['status'])
+    try:
+        filename, pdf = render_pdf(artifact.kind, artifact.object_id)
+    except Exception as e:
+        logger.exception(f"Error rendering {artifact}")
+        artifact.status = ReportArtifact.Status.FAILED
+        artifact.error = str(e)
+        artifact.finished_at = timezone.now()
+        artifact.save(update_fields=['status', 'error', 'finished_at'])
+        return
+
+    artifact.file.save(f"{artifact.pk}.pdf", ContentFile(pdf), save=False)
+    artifact.filename = filename
+    artifact.status = ReportArtifact.Status.DONE
+    artifact.finished_at = timezone.now()
+    artifact.save(update_fields=['file', 'filename', 'status', 'finished_at'])
+
+    superseded = ReportArtifact.objects.filter(
+        kind=artifact.kind,
+        object_id=artifact.object_id,
+        open_date=artifact.open_date,
+        close_date=artifact.close_date,
+        data_version__lt=artifact.data_version,
+    )
+    for old in superseded:
+        old.file.delete(save=False)
+    superseded.delete()
+
+
+def trigger_render_report_artifact(artifact):
+    def enqueue():
+        artifact.task_id = async_task('inventory.tasks.render_report_artifact_task', artifact.pk)
+        artifact.save(update_fields=['task_id'])
+
+    # The worker must be able to read the artifact
+    transaction.on_commit(enqueue)
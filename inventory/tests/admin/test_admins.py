@@ -32,6 +32,7 @@ def test_admin_pages_load(client):
             '/admin/django_q/success/add/',
             '/admin/django_q/failure/add/',
             '/admin/django_q/ormq/add/',
+            '/admin/inventory/reportartifact/add/',
         ]
         if add_url not in excluded_urls:
             admin_urls.append(add_url)
@@ -0,0 +1,66 @@
+import pytest
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory.models import Product
+
+# list_display columns after name and unit_cost, with their annotations
+COLUMNS = (
+    ('average_unit_cost', 'remaining_unit_cost'),
+    ('stock_level', 'current_stock_level'),
+    ('batch_level', 'batch_stock_level'),
+    ('stock_value', 'current_stock_value'),
+    ('days_to_sell_out', 'days_to_sell_out'),
+    ('average_consumption', 'consumption_per_day'),
+    ('average_gross_profit', 'gross_profit_per_day'),
+)
+
+
+def stock(product_factory, purchase_item_factory, sale_item_factory, count):
+    now = timezone.now()
+    for i in range(count):
+        product = product_factory()
+        purchase_item_factory(product=product, quantity=10 + i, unit_cost=2, purchase__date=now - timedelta(days=3))
+        sale_item_factory(product=product, quantity=1 + i, unit_price=5, sale__date=now - timedelta(days=1))
+
+
+def changelist_queries(client, **params):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('admin:inventory_product_changelist'), params)
+    assert response.status_code == 200
+    return len(queries)
+
+
+@pytest.mark.django_db
+def test_changelist_query_count_does_not_grow_with_products(admin_client, product_factory, purchase_item_factory, sale_item_factory):
+    stock(product_factory, purchase_item_factory, sale_item_factory, 2)
+    few = changelist_queries(admin_client)
+    stock(product_factory, purchase_item_factory, sale_item_factory, 8)
+    assert changelist_queries(admin_client) == few
+
+
+@pytest.mark.django_db
+def test_annotations_match_properties(product_factory, purchase_item_factory, sale_item_factory):
+    stock(product_factory, purchase_item_factory, sale_item_factory, 3)
+    for product in Product.objects.annotate_metrics():
+        assert product.current_stock_level == product.stock_level
+        assert product.batch_stock_level == product.batch_based_stock_level
+        assert product.current_stock_value == pytest.approx(product.stock_value)
+        assert product.remaining_unit_cost == pytest.approx(product.average_unit_cost)
+        assert product.consumption_per_day == product.average_consumption
+        assert product.days_to_sell_out == pytest.approx(product.days_until_stockout)
+        assert product.gross_profit_per_day == pytest.approx(product.average_gross_profit)
+
+
+@pytest.mark.django_db
+def test_changelist_sorts_by_computed_columns(admin_client, product_factory, purchase_item_factory, sale_item_factory):
+    stock(product_factory, purchase_item_factory, sale_item_factory, 3)
+    url = reverse('admin:inventory_product_changelist')
+    for index, (column, annotation) in enumerate(COLUMNS, start=3):
+        response = admin_client.get(url, {'o': f'-{index}'})
+        assert response.status_code == 200, column
+        values = [getattr(product, annotation) for product in response.context['cl'].result_list]
+        assert values == sorted(values, reverse=True), column
@@ -0,0 +1,90 @@
+import pytest
+from datetime import datetime, timedelta
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.timezone import make_aware
+
+from inventory.models import DataVersion, Report, ReportArtifact
+
+
+@pytest.fixture
+def sync_tasks(settings, tmp_path, monkeypatch):
+    settings.MEDIA_ROOT = tmp_path
+    # Run queued tasks in process, once the request's transaction commits
+    monkeypatch.setattr('django_q.conf.Conf.SYNC', True)
+
+
+@pytest.fixture
+def report(product_factory, purchase_item_factory):
+    purchase_item_factory(product=product_factory(), quantity=10, unit_cost=2, purchase__date=make_aware(datetime(2022, 1, 2)))
+    return Report.objects.create(open_date=make_aware(datetime(2022, 1, 1)), close_date=make_aware(datetime(2022, 2, 1)))
+
+
+def export(client, report, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        return client.get(reverse('admin:income-statement', kwargs={'object_id': report.pk}))
+
+
+@pytest.mark.django_db
+def test_export_is_rendered_in_background_and_reused(admin_client, sync_tasks, report, django_capture_on_commit_callbacks):
+    response = export(admin_client, report, django_capture_on_commit_callbacks)
+    assert response.status_code == 200
+    assert 'admin/report_artifact_status.html' in [t.name for t in response.templates]
+
+    artifact = ReportArtifact.objects.get()
+    assert artifact.status == ReportArtifact.Status.DONE
+    assert artifact.data_version == DataVersion.objects.current()
+    status = admin_client.get(reverse('admin:report-artifact-status', args=[artifact.pk])).json()
+    assert status == {'status': 'DONE', 'error': ''}
+
+    response = export(admin_client, report, django_capture_on_commit_callbacks)
+    assert response['Content-Type'] == 'application/pdf'
+    assert b''.join(response.streaming_content) == artifact.file.open('rb').read()
+    assert ReportArtifact.objects.count() == 1
+
+
+# Committing for real, as the data version is bumped once changes commit
+@pytest.mark.django_db(transaction=True)
+def test_export_is_rendered_again_after_data_changes(admin_client, sync_tasks, report, django_capture_on_commit_callbacks, sale_item_factory):
+    export(admin_client, report, django_capture_on_commit_callbacks)
+    old = ReportArtifact.objects.get()
+
+    sale_item_factory(quantity=1, sale__date=make_aware(datetime(2022, 1, 3)))
+    response = export(admin_client, report, django_capture_on_commit_callbacks)
+    assert 'admin/report_artifact_status.html' in [t.name for t in response.templates]
+
+    # The artifact rendered from the old data is replaced
+    new = ReportArtifact.objects.get()
+    assert new.pk != old.pk
+    assert new.data_version > old.data_version
+    assert new.status == ReportArtifact.Status.DONE
+
+
+@pytest.mark.django_db(transaction=True)
+def test_data_version_is_bumped_once_per_transaction(sale_item_factory):
+    version = DataVersion.objects.current()
+    with transaction.atomic():
+        sale_item_factory(quantity=1, sale__date=make_aware(datetime(2022, 1, 3)))
+        sale_item_factory(quantity=2, sale__date=make_aware(datetime(2022, 1, 4)))
+        # Not before the changes commit
+        assert DataVersion.objects.current() == version
+    assert DataVersion.objects.current() == version + 1
+
+
+@pytest.mark.django_db
+def test_stale_artifacts_are_queued_again(sync_tasks, settings, django_capture_on_commit_callbacks):
+    kind, version = ReportArtifact.Kind.SUGGESTED_BUDGET, DataVersion.objects.current()
+    running = ReportArtifact.objects.create(kind=kind, data_version=version, status=ReportArtifact.Status.RUNNING)
+    with pytest.raises(IntegrityError), transaction.atomic():
+        ReportArtifact.objects.create(kind=kind, data_version=version)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert ReportArtifact.objects.request(kind).status == ReportArtifact.Status.RUNNING
+
+    # Its task was lost or killed by the cluster's timeout
+    ReportArtifact.objects.update(queued_at=timezone.now() - timedelta(seconds=settings.Q_CLUSTER['timeout'] + 1))
+    with django_capture_on_commit_callbacks(execute=True):
+        ReportArtifact.objects.request(kind)
+    assert ReportArtifact.objects.get().pk == running.pk
+    assert ReportArtifact.objects.get().status == ReportArtifact.Status.DONE
@@ -0,0 +1,42 @@
+import pytest
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory.models import Sale
+
+
+def sell(product_factory, purchase_item_factory, sale_item_factory, count):
+    now = timezone.now()
+    for i in range(count):
+        product = product_factory()
+        purchase_item_factory(product=product, quantity=10, unit_cost=2 + i, purchase__date=now - timedelta(days=3))
+        sale = sale_item_factory(product=product, quantity=1 + i, unit_price=5, sale__date=now - timedelta(days=1)).sale
+        sale_item_factory(sale=sale, product=product, quantity=1, unit_price=4)
+
+
+def changelist_queries(client):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('admin:inventory_sale_changelist'))
+    assert response.status_code == 200
+    return len(queries)
+
+
+@pytest.mark.django_db
+def test_changelist_query_count_does_not_grow_with_sales(admin_client, product_factory, purchase_item_factory, sale_item_factory):
+    sell(product_factory, purchase_item_factory, sale_item_factory, 2)
+    few = changelist_queries(admin_client)
+    sell(product_factory, purchase_item_factory, sale_item_factory, 8)
+    assert changelist_queries(admin_client) == few
+
+
+@pytest.mark.django_db
+def test_annotations_match_properties(product_factory, purchase_item_factory, sale_item_factory):
+    sell(product_factory, purchase_item_factory, sale_item_factory, 3)
+    for sale in Sale.objects.annotate_totals():
+        assert sale.revenue == sale.total_amount
+        assert sale.cost == sale.cost_of_goods_sold
+        assert sale.profit == sale.gross_profit
+        assert sale.cost > 0
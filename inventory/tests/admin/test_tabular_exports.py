@@ -0,0 +1,82 @@
+import csv
+import io
+import zipfile
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from django.urls import reverse
+from django.utils.timezone import make_aware
+
+from inventory.models import Report
+
+
+def day(n):
+    return make_aware(datetime(2022, 1, n))
+
+
+@pytest.fixture
+def product(product_factory, purchase_item_factory, sale_item_factory):
+    product = product_factory(name="Flour")
+    purchase_item_factory(product=product, quantity=10, unit_cost=2, purchase__date=day(2))
+    sale_item_factory(product=product, quantity=3, unit_price=5, sale__date=day(3))
+    sale_item_factory(product=product, quantity=4, unit_price=5, sale__date=day(4))
+    return product
+
+
+@pytest.fixture
+def report(product):
+    return Report.objects.create(open_date=day(1), close_date=make_aware(datetime(2022, 2, 1)))
+
+
+def download(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.streaming
+    return b''.join(response.streaming_content)
+
+
+def read_csv(content):
+    return list(csv.reader(io.StringIO(content.decode())))
+
+
+@pytest.mark.django_db
+def test_product_movements_csv_has_running_balance(admin_client, product):
+    rows = read_csv(download(admin_client, reverse('admin:product-movements-export', args=[product.pk, 'csv'])))
+    assert rows[0] == ['Date', 'Type', 'Quantity', 'Balance', 'Source', 'Source ID']
+    assert [(row[1], Decimal(row[3])) for row in rows[1:]] == [('IN', 10), ('OUT', 7), ('OUT', 3)]
+
+
+@pytest.mark.django_db
+def test_report_transactions_csv_has_cash_balance(admin_client, report):
+    url = reverse('admin:report-table-export', args=[report.pk, 'transactions', 'csv'])
+    rows = read_csv(download(admin_client, url))
+    assert [(row[1], Decimal(row[3])) for row in rows[1:]] == [('PURCHASE', -20), ('SALE', -5), ('SALE', 15)]
+    assert Decimal(rows[-1][3]) == report.closing_cash
+
+
+@pytest.mark.django_db
+def test_report_profitability_xlsx_is_a_workbook(admin_client, report):
+    url = reverse('admin:report-table-export', args=[report.pk, 'profitability', 'xlsx'])
+    archive = zipfile.ZipFile(io.BytesIO(download(admin_client, url)))
+    assert archive.testzip() is None
+    sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+    assert sheet.count('<row>') == 2
+    assert '<t xml:space="preserve">Flour</t>' in sheet
+    assert f'<v>{report.product_performances[0]["sales"]}</v>' in sheet
+
+
+@pytest.mark.django_db
+def test_unknown_table_or_format_is_not_found(admin_client, report):
+    assert admin_client.get(reverse('admin:report-table-export', args=[report.pk, 'ledger', 'csv'])).status_code == 404
+    assert admin_client.get(reverse('admin:report-table-export', args=[report.pk, 'movements', 'pdf'])).status_code == 404
+
+
+@pytest.mark.django_db
+def test_product_name_is_quoted_in_filename(admin_client, product_factory):
+    product = product_factory(name='5" pans; steel')
+    response = admin_client.get(reverse('admin:product-movements-export', args=[product.pk, 'csv']))
+    assert response['Content-Disposition'] == 'attachment; filename="5\\" pans; steel movements.csv"'
+
+    product = product_factory(name='Crème')
+    response = admin_client.get(reverse('admin:product-movements-export', args=[product.pk, 'csv']))
+    assert response['Content-Disposition'] == "attachment; filename*=utf-8''Cr%C3%A8me%20movements.csv"
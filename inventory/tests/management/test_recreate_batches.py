@@ -0,0 +1,63 @@
+import pytest
+from datetime import datetime
+from io import StringIO
+from django.core.management import call_command
+from django.utils.timezone import make_aware
+
+from inventory.models import BatchMovement, StockBatch, StockLedgerEntry, StockMovement
+
+
+def day(n):
+    return make_aware(datetime(2022, 1, n))
+
+
+def derived_state():
+    return {
+        'batches': sorted(
+            (str(b.object_id), b.date_received, b.quantity_remaining) for b in StockBatch.objects.all()
+        ),
+        'batch_movements': sorted(
+            (str(m.object_id), m.movement_type, m.quantity, m.date, m.unit_cost, m.unit_price)
+            for m in BatchMovement.objects.all()
+        ),
+        'stock_movements': sorted(
+            (str(m.object_id), m.product_id.hex, m.movement_type, m.quantity, m.date) for m in StockMovement.objects.all()
+        ),
+        'ledger': sorted(
+            (str(e.movement.object_id), e.movement.movement_type, e.balance) for e in StockLedgerEntry.objects.all()
+        ),
+    }
+
+
+@pytest.fixture
+def history(product_factory, purchase_item_factory, sale_item_factory, stock_adjustment_factory, stock_conversion_factory):
+    beef = product_factory(name='Beef', unit='kg')
+    bones = product_factory(name='Bones', unit='kg')
+    purchase_item_factory(product=beef, quantity=10, unit_cost=2, purchase__date=day(1))
+    purchase_item_factory(product=beef, quantity=10, unit_cost=3, purchase__date=day(2))
+    sale_item_factory(product=beef, quantity=4, sale__date=day(3))
+    stock_adjustment_factory(product=beef, quantity=3, unit_cost=2, date=day(3))
+    stock_adjustment_factory(product=beef, quantity=-2, unit_cost=2, date=day(4))
+    stock_conversion_factory(from_product=beef, to_product=bones, quantity=8, unit_cost=2, date=day(5))
+    sale_item_factory(product=beef, quantity=5, sale__date=day(6))
+    sale_item_factory(product=bones, quantity=3, sale__date=day(6))
+    return beef, bones
+
+
+@pytest.mark.django_db
+def test_replay_reproduces_signal_state(history):
+    expected = derived_state()
+    out = StringIO()
+    call_command('recreate_batches', replay=True, chunk_size=3, stdout=out)
+    assert derived_state() == expected
+    assert 'Replayed 8/8 rows' in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_replay_single_product(history):
+    beef, bones = history
+    expected = derived_state()
+    call_command('recreate_batches', replay=True, product='bones', stdout=StringIO())
+    assert derived_state() == expected
+    assert bones.stock_level == 5
+    assert beef.stock_level == 4
@@ -0,0 +1,30 @@
+import pytest
+from datetime import datetime
+from io import StringIO
+from django.core.management import CommandError, call_command
+from django.utils.timezone import make_aware
+
+from inventory.models import CashCheckpoint, Expense
+
+
+def at(day):
+    return make_aware(datetime(2022, 1, day, 12))
+
+
+@pytest.mark.django_db
+def test_verify_rebuilds_drifted_checkpoints():
+    for day in (1, 2, 4):
+        Expense.objects.create(date=at(day), amount=day, description="Rent")
+    expected = CashCheckpoint.objects.expected()
+    CashCheckpoint.objects.filter(day=at(2).date()).update(closing_cash=100)
+    CashCheckpoint.objects.filter(day=at(4).date()).delete()
+
+    with pytest.raises(CommandError):
+        call_command('verify_cash_checkpoints', '--check', stdout=StringIO())
+
+    out = StringIO()
+    call_command('verify_cash_checkpoints', stdout=out)
+    assert 'Found 2 discrepancies' in out.getvalue()
+    assert {c.day: (c.net_cash, c.closing_cash) for c in CashCheckpoint.objects.all()} == expected
+
+    call_command('verify_cash_checkpoints', '--check', stdout=StringIO())
@@ -0,0 +1,46 @@
+import pytest
+from datetime import datetime
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import make_aware
+
+from inventory.models import BatchMovement, StockBatch
+
+
+def day(n):
+    return make_aware(datetime(2022, 1, n))
+
+
+@pytest.fixture
+def sale_item(product_factory, purchase_item_factory, sale_item_factory):
+    product = product_factory()
+    purchase_item_factory(product=product, quantity=2, unit_cost=3, purchase__date=day(1))
+    purchase_item_factory(product=product, quantity=10, unit_cost=4, purchase__date=day(2))
+    return sale_item_factory(product=product, quantity=5, unit_price=10, sale__date=day(3))
+
+
+@pytest.mark.django_db
+def test_allocation_records_batch_cost_and_sale_price(sale_item):
+    movements = sale_item.movements.order_by('unit_cost')
+    assert [(m.quantity, m.unit_cost, m.unit_price) for m in movements] == [(2, 3, 10), (3, 4, 10)]
+    assert [(m.cost, m.revenue, m.profit) for m in movements] == [(6, 20, 14), (12, 30, 18)]
+    assert not BatchMovement.objects.filter(movement_type=BatchMovement.MovementType.IN, unit_price__isnull=False).exists()
+
+    with CaptureQueriesContext(connection) as queries:
+        assert sale_item.cost == 18
+        assert sale_item.sale.cost_of_goods_sold == 18
+    assert len(queries) == 2
+    assert [batch.profit for batch in StockBatch.objects.order_by('date_received')] == [14, 18]
+
+
+@pytest.mark.django_db
+def test_movements_follow_batch_cost_and_sale_price(sale_item, purchase_item_factory):
+    purchase = StockBatch.objects.get(date_received=day(1)).linked_object
+    purchase.unit_cost = 5
+    purchase.save()
+    assert sorted(BatchMovement.objects.filter(batch__date_received=day(1)).values_list('unit_cost', flat=True)) == [5, 5]
+
+    sale_item.unit_price = 8
+    sale_item.save()
+    assert set(sale_item.movements.values_list('unit_price', flat=True)) == {8}
+    assert sale_item.cost == 22
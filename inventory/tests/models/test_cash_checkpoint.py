@@ -0,0 +1,68 @@
+import pytest
+from datetime import datetime
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import make_aware
+
+from inventory.models import CashCheckpoint, Expense, Report, Transaction
+from inventory.models.cash_checkpoint import signed_amount
+
+
+def at(day, hour=12):
+    return make_aware(datetime(2022, 1, day, hour))
+
+
+def scanned_cash(date):
+    return Transaction.objects.filter(date__lt=date).aggregate(total=Sum(signed_amount()))['total'] or 0
+
+
+def assert_cash_matches_scan():
+    for day in range(1, 8):
+        for hour in (0, 9, 12, 13, 23):
+            assert CashCheckpoint.objects.cash_at(at(day, hour)) == scanned_cash(at(day, hour))
+    assert {c.day: (c.net_cash, c.closing_cash) for c in CashCheckpoint.objects.all()} == CashCheckpoint.objects.expected()
+
+
+@pytest.fixture
+def ledger(purchase_item_factory, sale_item_factory):
+    purchase_item_factory(quantity=10, unit_cost=2, purchase__date=at(2, 9))
+    sale_item_factory(quantity=2, unit_price=5, sale__date=at(3, 12))
+    sale_item_factory(quantity=1, unit_price=7, sale__date=at(3, 18))
+    return Expense.objects.create(date=at(5), amount=4, description="Rent")
+
+
+@pytest.mark.django_db
+def test_checkpoints_follow_transaction_saves(ledger):
+    assert [(c.day.day, c.net_cash, c.closing_cash) for c in CashCheckpoint.objects.all()] == [
+        (2, -20, -20), (3, 17, -3), (5, -4, -7),
+    ]
+    assert_cash_matches_scan()
+
+
+@pytest.mark.django_db
+def test_checkpoints_follow_moved_and_deleted_transactions(ledger, sale_item_factory):
+    ledger.date = at(1)
+    ledger.amount = 6
+    ledger.save()
+    assert_cash_matches_scan()
+    assert not CashCheckpoint.objects.filter(day=at(5).date()).exists()
+
+    sale_item_factory(quantity=1, unit_price=3, sale__date=at(6)).delete()
+    assert_cash_matches_scan()
+    ledger.delete()
+    assert_cash_matches_scan()
+
+
+@pytest.mark.django_db
+def test_report_cash_queries_do_not_grow_with_transactions(ledger, sale_item_factory):
+    report = Report.objects.create(open_date=at(3, 13), close_date=at(6))
+    with CaptureQueriesContext(connection) as queries:
+        assert report.opening_cash == scanned_cash(report.open_date)
+    few = len(queries)
+
+    for day in range(1, 7):
+        sale_item_factory(quantity=1, unit_price=1, sale__date=at(day, 10))
+    with CaptureQueriesContext(connection) as queries:
+        assert report.closing_cash == scanned_cash(report.close_date)
+    assert len(queries) == few
@@ -0,0 +1,50 @@
+import math
+import pytest
+from datetime import datetime
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import make_aware
+
+from inventory.demand import censored_demand, demand_frames
+from inventory.models import StockLedgerEntry
+
+
+def at(day, hour=12):
+    return make_aware(datetime(2022, 1, day, hour))
+
+
+@pytest.mark.django_db
+def test_sales_limited_by_stock_are_censored(product_factory, purchase_item_factory, sale_item_factory):
+    product = product_factory()
+    purchase_item_factory(product=product, quantity=10, purchase__date=at(1))
+    # Two purchases sharing a timestamp both count before the next sale
+    purchase_item_factory(product=product, quantity=3, purchase__date=at(2))
+    purchase_item_factory(product=product, quantity=2, purchase__date=at(2))
+    sales = [
+        sale_item_factory(product=product, quantity=quantity, sale__date=date)
+        for quantity, date in ((4, at(1)), (6, at(3)), (9, at(4)), (2, at(5)))
+    ]
+
+    demand = censored_demand(product)
+    assert list(demand['quantity']) == [4, 6, 9, 2]
+    assert list(demand['stock_before']) == [
+        StockLedgerEntry.objects.balance_at(product, item.sale.date) for item in sales
+    ] == [0, 11, 5, -4]
+    # Sold on the purchase's timestamp, then more than what was left
+    assert [math.isnan(y) for y in demand['y']] == [True, False, True, True]
+    assert product.average_consumption == 6
+
+
+@pytest.mark.django_db
+def test_extraction_queries_do_not_grow_with_history(product_factory, purchase_item_factory, sale_item_factory):
+    products = [product_factory() for _ in range(3)]
+    for day in range(1, 11):
+        for product in products:
+            purchase_item_factory(product=product, quantity=5, purchase__date=at(day, 9))
+            sale_item_factory(product=product, quantity=4, sale__date=at(day))
+
+    with CaptureQueriesContext(connection) as queries:
+        frames = demand_frames(products)
+    assert len(queries) == 2
+    assert all(len(frames[product.pk]) == 10 for product in products)
+    assert list(frames[products[0].pk]['stock_before'][:3]) == [5, 6, 7]
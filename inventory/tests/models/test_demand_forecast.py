@@ -0,0 +1,49 @@
+import pytest
+from datetime import datetime, timedelta
+from django.utils.timezone import make_aware
+
+from inventory.forecasting import ForecastRunner
+from inventory.models import DemandForecast
+from inventory.tasks import forecast_demand_task
+
+
+def sell_daily(product, purchase_item_factory, sale_item_factory, days=14):
+    start = make_aware(datetime(2022, 1, 1))
+    purchase_item_factory(product=product, quantity=1000, unit_cost=2, purchase__date=start)
+    for day in range(days):
+        sale_item_factory(product=product, quantity=5 + day % 7, unit_price=3, sale__date=start + timedelta(days=day, hours=12))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('workers', [1, 2])
+def test_runner_stores_forecasts(workers, product_factory, purchase_item_factory, sale_item_factory):
+    beef, pork, unsold = product_factory(name='Beef'), product_factory(name='Pork'), product_factory(name='Lamb')
+    sell_daily(beef, purchase_item_factory, sale_item_factory)
+    sell_daily(pork, purchase_item_factory, sale_item_factory)
+
+    runner = ForecastRunner(workers=workers, days=5)
+    assert runner.run() == 2
+    assert runner.failed == []
+
+    dates = list(beef.demand_forecasts.values_list('date', flat=True))
+    assert dates[0] == datetime(2022, 1, 1).date()
+    assert dates[-1] == datetime(2022, 1, 19).date()
+    assert pork.demand_forecasts.count() == len(dates)
+    assert not unsold.demand_forecasts.exists()
+
+    # Running again replaces the stored forecasts
+    runner.run([beef])
+    assert DemandForecast.objects.filter(product=beef).count() == len(dates)
+
+
+@pytest.mark.django_db
+def test_task_fits_in_its_worker_process(monkeypatch, product_factory, purchase_item_factory, sale_item_factory):
+    # Daemonic django-q workers may not start a process pool
+    def no_pool(*args, **kwargs):
+        raise AssertionError('daemonic processes are not allowed to have children')
+    monkeypatch.setattr('inventory.forecasting.ProcessPoolExecutor', no_pool)
+
+    beef = product_factory(name='Beef')
+    sell_daily(beef, purchase_item_factory, sale_item_factory)
+    assert forecast_demand_task() == 1
+    assert beef.demand_forecasts.exists()
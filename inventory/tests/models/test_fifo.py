@@ -0,0 +1,54 @@
+import pytest
+from datetime import datetime
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import make_aware
+
+from inventory.fifo import FifoAllocator
+from inventory.models import BatchMovement, Sale, SaleItem
+
+
+def consume_queries(product, quantity):
+    sale = Sale.objects.create(date=make_aware(datetime(2022, 2, 1)))
+    item = SaleItem(sale=sale, product=product, quantity=quantity, unit_price=1)
+    with CaptureQueriesContext(connection) as queries:
+        product.consume(quantity, item)
+    return len(queries)
+
+
+@pytest.mark.django_db
+def test_consumption_queries_do_not_depend_on_batches(product_factory, purchase_item_factory):
+    few, many = product_factory(), product_factory()
+    purchase_item_factory(product=few, quantity=20)
+    for _ in range(10):
+        purchase_item_factory(product=many, quantity=2)
+
+    assert consume_queries(few, 20) == consume_queries(many, 20)
+    assert many.batch_based_stock_level == 0
+
+
+@pytest.mark.django_db
+def test_allocator_walks_batches_in_memory(product_factory, purchase_item_factory, sale_item_factory):
+    product = product_factory()
+    first = purchase_item_factory(product=product, quantity=5, purchase__date=make_aware(datetime(2022, 1, 1)))
+    second = purchase_item_factory(product=product, quantity=5, purchase__date=make_aware(datetime(2022, 1, 2)))
+    sale_item = sale_item_factory(product=product, quantity=1)
+    sale_item.movements.all().delete()
+
+    allocator = FifoAllocator()
+    assert allocator.allocate(product, 4, sale_item) == 0
+    assert allocator.allocate(product, 4, sale_item) == 0
+    assert allocator.allocate(product, 4, sale_item) == 2
+    allocator.flush()
+
+    assert first.batch.quantity_remaining == 0
+    assert second.batch.quantity_remaining == 0
+    assert sale_item.movements.filter(movement_type=BatchMovement.MovementType.OUT).count() == 4
+
+
+@pytest.mark.django_db
+def test_insufficient_stock_raises(product_factory, purchase_item_factory, stock_adjustment_factory):
+    product = product_factory()
+    purchase_item_factory(product=product, quantity=5)
+    with pytest.raises(ValueError):
+        stock_adjustment_factory(product=product, quantity=-8, unit_cost=1)
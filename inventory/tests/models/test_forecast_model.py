@@ -0,0 +1,62 @@
+import pytest
+from datetime import datetime, timedelta
+from django.utils import timezone
+from django.utils.timezone import make_aware
+
+from inventory.forecasting import ForecastRunner
+from inventory.models import ForecastModel
+
+START = make_aware(datetime(2022, 1, 1))
+
+
+@pytest.fixture
+def beef(product_factory, purchase_item_factory, sale_item_factory):
+    beef = product_factory(name='Beef')
+    purchase_item_factory(product=beef, quantity=1000, unit_cost=2, purchase__date=START)
+    for day in range(14):
+        sale_item_factory(product=beef, quantity=5 + day % 7, unit_price=3, sale__date=START + timedelta(days=day, hours=12))
+    return beef
+
+
+@pytest.mark.django_db
+def test_unchanged_sales_reuse_the_stored_model(beef):
+    ForecastRunner(workers=1).run()
+    model = ForecastModel.objects.get(product=beef)
+    assert model.watermark == START + timedelta(days=13, hours=12)
+    assert model.observations == 14
+
+    runner = ForecastRunner(workers=1)
+    runner.run()
+    assert runner.reused == 1
+    assert ForecastModel.objects.get(product=beef).trained_at == model.trained_at
+
+
+@pytest.mark.django_db
+def test_new_sales_refit_from_the_stored_model(beef, sale_item_factory):
+    ForecastRunner(workers=1).run()
+    model = ForecastModel.objects.get(product=beef)
+
+    sale_item_factory(product=beef, quantity=6, unit_price=3, sale__date=START + timedelta(days=14, hours=12))
+    runner = ForecastRunner(workers=1)
+    runner.run()
+    assert runner.reused == 0
+
+    refitted = ForecastModel.objects.get(product=beef)
+    assert refitted.fingerprint != model.fingerprint
+    assert refitted.watermark == START + timedelta(days=14, hours=12)
+    assert beef.demand_forecasts.latest('date').date == (START + timedelta(days=26)).date()
+
+
+@pytest.mark.django_db
+def test_models_are_evicted_by_age_count_and_size(product_factory):
+    now = timezone.now()
+    for age in range(4):
+        ForecastModel.objects.create(
+            product=product_factory(), fingerprint='', watermark=now, observations=2, model_json='{}', size=100,
+            trained_at=now - timedelta(days=age * 10), last_used_at=now - timedelta(days=age),
+        )
+
+    assert ForecastModel.objects.evict(max_age=timedelta(days=25)) == 1
+    assert ForecastModel.objects.evict(max_count=2) == 1
+    assert ForecastModel.objects.evict(max_size=150) == 1
+    assert ForecastModel.objects.get().last_used_at == now
@@ -0,0 +1,82 @@
+import subprocess
+import sys
+import pytest
+from datetime import datetime, timedelta
+from django.core.management import call_command
+from django.utils.timezone import make_aware
+import pandas as pd
+
+from inventory.forecasting import ForecastRunner, compare_forecasters
+from inventory.models import ForecastModel, Product
+from utils.forecasting import SmoothingForecaster
+
+START = make_aware(datetime(2022, 1, 3))  # a Monday
+
+
+def frame(quantities):
+    return pd.DataFrame({
+        'ds': [pd.Timestamp(2022, 1, 3, 12) + pd.Timedelta(days=day) for day in range(len(quantities))],
+        'y': quantities,
+    })
+
+
+def test_smoothing_follows_weekday_pattern():
+    # Sells 10 on weekdays and nothing at weekends, for four weeks
+    df = frame([10.0 if day % 7 < 5 else 0.0 for day in range(28)])
+    records, fitted = SmoothingForecaster().forecast(df, days=7)
+
+    assert fitted is None
+    assert len(records) == 35
+    future = records[-7:]
+    assert future[0]['ds'] == pd.Timestamp(2022, 1, 31)
+    assert [round(r['yhat'], 6) for r in future] == [10.0] * 5 + [0.0] * 2
+    assert all(r['yhat_lower'] >= 0 for r in records)
+
+
+def test_smoothing_skips_stock_limited_days():
+    df = frame([4.0, None, 4.0, 4.0])
+    records, _ = SmoothingForecaster().forecast(df, days=1)
+    assert records[-1]['yhat'] == pytest.approx(4.0)
+
+
+def test_smoothing_does_not_import_prophet():
+    code = (
+        "import sys, pandas as pd\n"
+        "from utils.forecasting import SmoothingForecaster\n"
+        "df = pd.DataFrame({'ds': pd.date_range('2022-01-01', periods=10), 'y': [1.0] * 10})\n"
+        "SmoothingForecaster().forecast(df)\n"
+        "assert 'prophet' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+@pytest.fixture
+def lamb(product_factory, purchase_item_factory, sale_item_factory):
+    lamb = product_factory(name='Lamb', forecast_engine=Product.ForecastEngine.SMOOTHING)
+    purchase_item_factory(product=lamb, quantity=1000, unit_cost=2, purchase__date=START)
+    for day in range(28):
+        sale_item_factory(product=lamb, quantity=5 + day % 7, unit_price=3, sale__date=START + timedelta(days=day, hours=12))
+    return lamb
+
+
+@pytest.mark.django_db
+def test_runner_uses_product_engine(lamb):
+    runner = ForecastRunner(workers=1)
+    assert runner.run() == 1
+    assert runner.reused == 0
+    assert not ForecastModel.objects.exists()
+
+    latest = lamb.demand_forecasts.latest('date')
+    assert latest.date == (START + timedelta(days=27 + 12)).date()
+    # Day 39 falls on a Friday, which sells 9
+    assert float(latest.quantity) == pytest.approx(9, abs=0.5)
+
+
+@pytest.mark.django_db
+def test_compare_forecasters(lamb, capsys):
+    results = compare_forecasters(holdout=7, engines=['smoothing'])
+    assert results['smoothing']['products'] == 1
+    assert results['smoothing']['mae'] < 1
+
+    call_command('compare_forecasters', holdout=7, engine=['smoothing'])
+    assert 'smoothing: MAE' in capsys.readouterr().out
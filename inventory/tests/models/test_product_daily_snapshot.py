@@ -0,0 +1,67 @@
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from django.utils.timezone import make_aware
+
+from inventory.models import ProductDailySnapshot
+
+
+def at(day, hour=0):
+    return make_aware(datetime(2022, 1, day, hour))
+
+
+def snapshot_rows(product):
+    fields = ('day', 'closing_quantity', 'closing_value', 'quantity_in', 'quantity_out', 'value_in', 'value_out', 'sales_value')
+    return list(product.daily_snapshots.order_by('day').values_list(*fields))
+
+
+@pytest.fixture
+def beef(product_factory, purchase_item_factory, sale_item_factory, stock_adjustment_factory):
+    beef = product_factory(name='Beef')
+    purchase_item_factory(product=beef, quantity=100, unit_cost=2, purchase__date=at(1, 9))
+    sale_item_factory(product=beef, quantity=30, unit_price=5, sale__date=at(3, 10))
+    sale_item_factory(product=beef, quantity=10, unit_price=6, sale__date=at(3, 18))
+    purchase_item_factory(product=beef, quantity=50, unit_cost=3, purchase__date=at(5, 12))
+    stock_adjustment_factory(product=beef, quantity=-5, unit_cost=2, date=at(6, 8))
+    sale_item_factory(product=beef, quantity=80, unit_price=6, sale__date=at(7, 15))
+    return beef
+
+
+@pytest.mark.django_db
+def test_snapshots_keep_daily_closing_balances(beef):
+    assert snapshot_rows(beef) == [
+        (at(1).date(), 100, 200, 100, 0, 200, 0, 0),
+        (at(3).date(), 60, 120, 0, 40, 0, 80, 210),
+        (at(5).date(), 110, 270, 50, 0, 150, 0, 0),
+        (at(6).date(), 105, 260, 0, 5, 0, 10, 0),
+        (at(7).date(), 25, 75, 0, 80, 0, 185, 480),
+    ]
+
+
+@pytest.mark.django_db
+def test_partial_days_are_read_from_raw_rows(beef):
+    # Opens half way through the 3rd and closes half way through the 7th
+    start, end = at(3, 12), at(7, 12)
+    assert beef.get_stock_level_at(start) == 70
+    assert beef.get_stock_value_at(start) == 140
+    assert beef.get_stock_value_at(end) == 260
+    assert beef.get_sold_quantity_between(start, end) == 10
+    assert beef.get_total_sales_between(start, end) == 60
+    assert beef.get_total_purchases_between(start, end) == 150
+    assert beef.get_outgoing_stock_between(start, end) == 15
+    assert beef.get_adjustments_between(start, end) == -5
+    assert beef.get_average_unit_price_between(at(3), at(7, 23)) == pytest.approx(Decimal(17) / 3)
+
+
+@pytest.mark.django_db
+def test_incremental_upkeep_matches_rebuild(beef, purchase_item_factory):
+    purchase_item = beef.purchase_items.get(quantity=100)
+    purchase_item.unit_cost = 4
+    purchase_item.save()
+    beef.sale_items.get(quantity=10).delete()
+    purchase_item_factory(product=beef, quantity=20, unit_cost=1, purchase__date=at(2, 9))
+
+    incremental = snapshot_rows(beef)
+    ProductDailySnapshot.objects.rebuild([beef.pk])
+    assert snapshot_rows(beef) == incremental
+    assert beef.get_stock_value_at(at(8)) == beef.stock_value
@@ -0,0 +1,50 @@
+import pytest
+from datetime import datetime
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import make_aware
+
+from inventory import cache
+
+
+@pytest.fixture
+def product(product_factory, purchase_item_factory, sale_item_factory):
+    product = product_factory()
+    purchase_item_factory(product=product, quantity=100, unit_cost=2, purchase__date=make_aware(datetime(2022, 1, 1)))
+    sale_item_factory(product=product, quantity=10, unit_price=5, sale__date=make_aware(datetime(2022, 1, 2)))
+    return product
+
+
+@pytest.mark.django_db
+def test_metrics_are_served_from_cache(product):
+    assert product.stock_value == 180
+    assert product.average_consumption == 10
+    assert product.average_unit_cost == 2
+
+    with CaptureQueriesContext(connection) as queries:
+        assert product.stock_value == 180
+        assert product.average_consumption == 10
+        assert product.average_unit_cost == 2
+    assert len(queries) == 0
+
+
+@pytest.mark.django_db
+def test_movements_invalidate_cached_metrics(product, sale_item_factory):
+    assert product.stock_value == 180
+    assert product.days_until_stockout == 9
+
+    sale_item_factory(product=product, quantity=30, unit_price=5, sale__date=make_aware(datetime(2022, 1, 3)))
+    assert product.stock_value == 120
+    assert product.average_consumption == 20
+
+    product.sale_items.latest('sale__date').delete()
+    assert product.stock_value == 180
+
+
+@pytest.mark.django_db
+def test_invalidating_everything(product, product_factory):
+    other = product_factory()
+    keys = cache.metric_key(product.pk, 'stock_value'), cache.metric_key(other.pk, 'stock_value')
+    cache.invalidate()
+    assert cache.metric_key(product.pk, 'stock_value') != keys[0]
+    assert cache.metric_key(other.pk, 'stock_value') != keys[1]
@@ -0,0 +1,61 @@
+import pytest
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from inventory.planning import ReorderPlanner
+from inventory.schema import schema
+
+
+@pytest.fixture
+def products(product_factory, purchase_item_factory, sale_item_factory):
+    now = timezone.now()
+    beef = product_factory(name='Beef', batch_size=5)
+    lamb = product_factory(name='Lamb')
+    purchase_item_factory(product=beef, quantity=10, unit_cost=2, purchase__date=now - timedelta(days=10))
+    purchase_item_factory(product=beef, quantity=10, unit_cost=3, purchase__date=now - timedelta(days=9))
+    purchase_item_factory(product=lamb, quantity=100, unit_cost=4, purchase__date=now - timedelta(days=10))
+    for day in range(1, 5):
+        sale_item_factory(product=beef, quantity=4, unit_price=5, sale__date=now - timedelta(days=day))
+        sale_item_factory(product=lamb, quantity=1, unit_price=5, sale__date=now - timedelta(days=day))
+    return beef, lamb
+
+
+@pytest.mark.django_db
+def test_plan_matches_product_properties(products):
+    beef, lamb = products
+    lines = {line.product: line for line in ReorderPlanner().plan()}
+
+    for product in (beef, lamb):
+        line = lines[product]
+        assert line.stock_level == product.stock_level
+        assert line.average_consumption == product.average_consumption
+        assert line.reorder_quantity == product.reorder_quantity
+        assert line.batch_sized_reorder_quantity == product.batch_sized_reorder_quantity
+
+    # 4 left, 4 a day for 7 days, rounded up to batches of 5 at the latest cost
+    assert (lines[beef].reorder_quantity, lines[beef].batch_sized_reorder_quantity) == (24, 25)
+    assert lines[beef].reorder_value == 75
+    assert lines[lamb].reorder_quantity == 0
+    assert [line.product for line in ReorderPlanner(horizon_days=200).reorders()] == [beef, lamb]
+
+
+@pytest.mark.django_db
+def test_plan_queries_do_not_grow_with_products(products, product_factory, purchase_item_factory):
+    def count():
+        with CaptureQueriesContext(connection) as queries:
+            ReorderPlanner().plan()
+        return len(queries)
+
+    before = count()
+    for i in range(5):
+        purchase_item_factory(product=product_factory(), quantity=10, unit_cost=1)
+    assert count() == before
+
+
+@pytest.mark.django_db
+def test_reorder_plan_query(products):
+    result = schema.execute_sync('{ reorderPlan(horizonDays: 7) { product { name } batchSizedReorderQuantity reorderValue } }')
+    assert result.errors is None
+    assert [line['product']['name'] for line in result.data['reorderPlan']] == ['Beef']
@@ -0,0 +1,130 @@
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import make_aware
+
+from inventory.models import Report
+
+
+def day(n):
+    return make_aware(datetime(2022, 1, n))
+
+
+@pytest.fixture
+def report(product_factory, purchase_item_factory, sale_item_factory, stock_adjustment_factory, stock_conversion_factory):
+    beef = product_factory(name='Beef', unit='kg')
+    bones = product_factory(name='Bones', unit='kg')
+    product_factory(name='Idle', unit='unit')
+
+    purchase_item_factory(product=beef, quantity=100, unit_cost=2, purchase__date=day(1))
+    purchase_item_factory(product=beef, quantity=50, unit_cost=3, purchase__date=day(5))
+    sale_item_factory(product=beef, quantity=30, unit_price=5, sale__date=day(3))
+    sale_item_factory(product=beef, quantity=90, unit_price=6, sale__date=day(6))
+    stock_adjustment_factory(product=beef, quantity=-5, unit_cost=2, date=day(7))
+    stock_conversion_factory(from_product=beef, to_product=bones, quantity=10, unit_cost=1, date=day(8))
+    sale_item_factory(product=bones, quantity=4, unit_price=2, sale__date=day(9))
+
+    return Report.objects.create(open_date=day(2), close_date=day(10))
+
+
+# Beef sells its first batch at 2 and part of its second at 3 over the
+# period, loses 5 kg to an adjustment and 10 kg to a conversion into Bones
+# valued at 1, and closes with 15 kg of the second batch
+EXPECTED_PERFORMANCES = {
+    'Beef': {
+        'sales': 690,
+        'opening_stock_value': 200,
+        'purchases': 150,
+        'closing_stock_value': 45,
+        'cost_of_goods_sold': 305,
+        'gross_profit': 395,
+        'conversions_from': 10,
+        'conversions_to': 0,
+        'average_unit_cost_with_adjustments': Decimal(10) / 3,
+        'average_unit_cost': 3,
+        'adjustments': -5,
+        'average_unit_price': Decimal('5.5'),
+        'average_unit_profit': Decimal('5.5') - Decimal(10) / 3,
+    },
+    'Bones': {
+        'sales': 8,
+        'opening_stock_value': 0,
+        'purchases': 0,
+        'closing_stock_value': 6,
+        'cost_of_goods_sold': 4,
+        'gross_profit': 4,
+        'conversions_from': 0,
+        'conversions_to': 10,
+        'average_unit_cost_with_adjustments': 0,
+        'average_unit_cost': 0,
+        'adjustments': 0,
+        'average_unit_price': 2,
+        'average_unit_profit': 2,
+    },
+}
+
+EXPECTED_BALANCES = {
+    'Beef': {
+        'opening_stock_level': 100,
+        'closing_stock_level': 15,
+        'opening_stock_value': 200,
+        'closing_stock_value': 45,
+        'adjustments': -5,
+        'incoming_stock': 50,
+        'outgoing_stock': 135,
+        'sold_stock': 120,
+        'conversions_from': 10,
+        'conversions_to': 0,
+    },
+    'Bones': {
+        'opening_stock_level': 0,
+        'closing_stock_level': 6,
+        'opening_stock_value': 0,
+        'closing_stock_value': 6,
+        'adjustments': 0,
+        'incoming_stock': 10,
+        'outgoing_stock': 4,
+        'sold_stock': 4,
+        'conversions_from': 0,
+        'conversions_to': 10,
+    },
+}
+
+
+@pytest.mark.django_db
+def test_product_performances(report):
+    rows = {row['product'].name: row for row in report.product_performances}
+    assert sorted(rows) == ['Beef', 'Bones']
+    for name, expected in EXPECTED_PERFORMANCES.items():
+        for column, value in expected.items():
+            assert rows[name][column] == pytest.approx(value), (name, column)
+
+
+@pytest.mark.django_db
+def test_inventory_balances(report):
+    rows = {row['product'].name: row for row in report.inventory_balances}
+    assert sorted(rows) == ['Beef', 'Bones']
+    for name, expected in EXPECTED_BALANCES.items():
+        for column, value in expected.items():
+            assert rows[name][column] == pytest.approx(value), (name, column)
+
+
+@pytest.mark.django_db
+def test_report_query_count_does_not_grow_with_products(report, product_factory, purchase_item_factory):
+    for i in range(5):
+        purchase_item_factory(product=product_factory(), quantity=10, purchase__date=day(4))
+
+    report = Report.objects.get(pk=report.pk)
+    with CaptureQueriesContext(connection) as queries:
+        report.inventory_balances
+        report.product_performances
+    # The valuations at both ends are computed and stored on first use
+    assert len(queries) <= 16
+
+    report = Report.objects.get(pk=report.pk)
+    with CaptureQueriesContext(connection) as warm:
+        report.inventory_balances
+        report.product_performances
+    assert len(warm) <= len(queries) - 6
@@ -0,0 +1,51 @@
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import make_aware
+
+from inventory.models import StockBatch
+
+
+@pytest.mark.django_db
+def test_batch_carries_linked_product_quantity_and_cost(
+    product_factory,
+    purchase_item_factory,
+    stock_adjustment_factory,
+    stock_conversion_factory,
+):
+    beef, bones = product_factory(), product_factory()
+    purchase_item = purchase_item_factory(product=beef, quantity=10, unit_cost=4, purchase__date=make_aware(datetime(2022, 1, 1)))
+    adjustment = stock_adjustment_factory(product=beef, quantity=2, unit_cost=3, date=make_aware(datetime(2022, 1, 2)))
+    conversion = stock_conversion_factory(from_product=beef, to_product=bones, quantity=5, unit_cost=1, date=make_aware(datetime(2022, 1, 3)))
+
+    for linked, product, quantity, unit_cost in (
+        (purchase_item, beef, 10, 4),
+        (adjustment, beef, 2, 3),
+        (conversion, bones, 5, 1),
+    ):
+        batch = linked.batches.get()
+        assert batch.product == product
+        assert batch.quantity == quantity
+        assert batch.unit_cost == unit_cost
+
+    purchase_item.unit_cost = 6
+    purchase_item.save()
+    assert purchase_item.batch.unit_cost == 6
+
+
+@pytest.mark.django_db
+def test_stock_value_reads_cost_from_batch(product_factory, purchase_item_factory, sale_item_factory):
+    product = product_factory()
+    purchase_item_factory(product=product, quantity=10, unit_cost=Decimal('2.5'), purchase__date=make_aware(datetime(2022, 1, 1)))
+    sale_item = sale_item_factory(product=product, quantity=4, unit_price=5, sale__date=make_aware(datetime(2022, 1, 2)))
+
+    assert product.stock_value == Decimal('15.0')
+    assert sale_item.cost == Decimal('10.0')
+    assert list(product.batches) == list(StockBatch.objects.filter(product=product))
+
+    with CaptureQueriesContext(connection) as queries:
+        sale_item.cost
+    assert len(queries) == 1
+    assert 'inventory_purchaseitem' not in queries[0]['sql']
@@ -0,0 +1,66 @@
+import pytest
+from datetime import datetime
+from django.utils.timezone import make_aware
+
+from inventory.models import StockLedgerEntry, StockMovement
+
+
+@pytest.mark.django_db
+def test_ledger_tracks_running_balance(product_factory, purchase_item_factory, sale_item_factory):
+    product = product_factory()
+    purchase_item_factory(product=product, quantity=100, purchase__date=make_aware(datetime(2022, 1, 1)))
+    sale_item_factory(product=product, quantity=30, sale__date=make_aware(datetime(2022, 1, 3)))
+    # Inserted out of order, shifts the balance of the later sale
+    purchase_item_factory(product=product, quantity=20, purchase__date=make_aware(datetime(2022, 1, 2)))
+
+    balances = list(product.ledger_entries.order_by('date').values_list('balance', flat=True))
+    assert balances == [100, 120, 90]
+    assert product.stock_level == 90
+    assert product.get_stock_level_at(make_aware(datetime(2022, 1, 2))) == 100
+    assert product.get_stock_level_at(make_aware(datetime(2022, 1, 1))) == 0
+
+
+@pytest.mark.django_db
+def test_ledger_follows_updates_and_deletes(product_factory, purchase_item_factory, sale_item_factory):
+    product = product_factory()
+    purchase_item = purchase_item_factory(product=product, quantity=100, purchase__date=make_aware(datetime(2022, 1, 1)))
+    sale_item = sale_item_factory(product=product, quantity=30, sale__date=make_aware(datetime(2022, 1, 3)))
+
+    purchase_item.quantity = 50
+    purchase_item.save()
+    assert sale_item.product.stock_level == 20
+
+    sale_item.delete()
+    assert product.stock_level == 50
+    assert StockLedgerEntry.objects.count() == StockMovement.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_ledger_rebuild_matches_incremental(product_factory, purchase_item_factory, sale_item_factory):
+    product = product_factory()
+    for day, quantity in [(1, 40), (2, 10), (2, 15)]:
+        purchase_item_factory(product=product, quantity=quantity, purchase__date=make_aware(datetime(2022, 1, day)))
+    sale_item_factory(product=product, quantity=5, sale__date=make_aware(datetime(2022, 1, 2)))
+
+    incremental = sorted(product.ledger_entries.values_list('movement_id', 'balance'))
+    StockLedgerEntry.objects.rebuild([product.id])
+    rebuilt = sorted(product.ledger_entries.values_list('movement_id', 'balance'))
+    assert incremental == rebuilt
+    assert product.stock_level == 60
+
+
+@pytest.mark.django_db
+def test_record_many_spans_several_dates(product_factory, purchase_item_factory, sale_item_factory):
+    product = product_factory()
+    purchase_item_factory(product=product, quantity=100, purchase__date=make_aware(datetime(2022, 1, 1)))
+    sale_item_factory(product=product, quantity=30, sale__date=make_aware(datetime(2022, 1, 5)))
+
+    movements = StockMovement.objects.bulk_create([
+        StockMovement(product=product, movement_type='IN', quantity=10, date=make_aware(datetime(2022, 1, 2))),
+        StockMovement(product=product, movement_type='OUT', quantity=5, date=make_aware(datetime(2022, 1, 3))),
+        StockMovement(product=product, movement_type='IN', quantity=1, date=make_aware(datetime(2022, 1, 6))),
+    ])
+    StockLedgerEntry.objects.record_many(movements)
+
+    balances = list(product.ledger_entries.order_by('date').values_list('balance', flat=True))
+    assert balances == [100, 110, 105, 75, 76]
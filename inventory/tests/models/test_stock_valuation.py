@@ -0,0 +1,57 @@
+import pytest
+from datetime import datetime
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import make_aware
+
+from inventory.models import DataVersion, Expense, ProductDailySnapshot, StockValuation
+
+
+def day(n):
+    return make_aware(datetime(2022, 1, n))
+
+
+# Committing for real, as the stock version is bumped once changes commit
+@pytest.mark.django_db(transaction=True)
+def test_valuations_are_reused_until_data_changes(product_factory, purchase_item_factory, sale_item_factory):
+    beef, lamb = product_factory(name='Beef'), product_factory(name='Lamb')
+    purchase_item_factory(product=beef, quantity=10, unit_cost=2, purchase__date=day(1))
+    purchase_item_factory(product=lamb, quantity=4, unit_cost=5, purchase__date=day(1))
+
+    assert StockValuation.objects.closing_at(day(5)) == ProductDailySnapshot.objects.closing_at(day(5))
+    with CaptureQueriesContext(connection) as queries:
+        assert beef.get_stock_value_at(day(5)) == 20
+        assert lamb.get_stock_value_at(day(5)) == 20
+    assert len(queries) == 2
+
+    sale_item_factory(product=beef, quantity=3, unit_price=5, sale__date=day(2))
+    assert beef.get_stock_value_at(day(5)) == 14
+    assert StockValuation.objects.count() == 2
+    assert StockValuation.objects.prune() == 1
+    assert beef.get_stock_value_at(day(5)) == 14
+
+
+@pytest.mark.django_db
+def test_valuations_are_kept_across_other_changes(product_factory, purchase_item_factory):
+    beef = product_factory(name='Beef')
+    purchase_item_factory(product=beef, quantity=10, unit_cost=2, purchase__date=day(1))
+    assert beef.get_stock_value_at(day(5)) == 20
+
+    beef.name = 'Brisket'
+    beef.save()
+    Expense.objects.create(description='Rent', amount=100, date=day(2))
+    assert StockValuation.objects.prune() == 0
+    assert StockValuation.objects.count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stock_version_is_bumped_once_per_transaction(product_factory, purchase_item_factory, sale_item_factory):
+    beef = product_factory(name='Beef')
+    purchase_item_factory(product=beef, quantity=10, unit_cost=2, purchase__date=day(1))
+    version = DataVersion.objects.current('stock')
+    with transaction.atomic():
+        sale_item_factory(product=beef, quantity=3, unit_price=5, sale__date=day(2))
+        sale_item_factory(product=beef, quantity=2, unit_price=5, sale__date=day(3))
+        # Not before the changes commit
+        assert DataVersion.objects.current('stock') == version
+    assert DataVersion.objects.current('stock') == version + 1
@@ -0,0 +1,47 @@
+import os
+import re
+import subprocess
+import sys
+from django.conf import settings
+
+# Import time budget of setting up Django and loading the URLconf, which
+# imports every admin and the GraphQL schema
+STARTUP_BUDGET_MS = 2500
+
+# Optional dependencies that must only be imported on first use
+HEAVY_MODULES = ('pandas', 'numpy', 'prophet', 'weasyprint')
+
+STARTUP = f"""
+import os, sys
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+import django
+django.setup()
+import core.urls
+print(' '.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))
+"""
+
+
+def import_times(stderr):
+    """
+    Cumulative import time in microseconds of each top level module in the
+    output of `python -X importtime`.
+    """
+    times = {}
+    for line in stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \| (\S.*)', line)
+        if match:
+            times[match.group(2)] = int(match.group(1))
+    return times
+
+
+def test_startup_does_not_import_heavy_dependencies():
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP],
+        capture_output=True, text=True, check=True, cwd=settings.BASE_DIR, env=os.environ,
+    )
+    assert result.stdout.split() == []
+
+    times = import_times(result.stderr)
+    total = sum(times.values()) / 1000
+    slowest = sorted(times, key=times.get, reverse=True)[:5]
+    assert total < STARTUP_BUDGET_MS, f"Startup imports took {total:.0f}ms, slowest: {slowest}"
@@ -0,0 +1,123 @@
+import pytest
+from decimal import Decimal
+from datetime import datetime, timedelta
+from django.utils.timezone import make_aware
+
+from inventory.schema import schema
+
+START = make_aware(datetime(2022, 1, 1))
+
+SALES = """
+query Sales($first: Int!, $after: String, $product: ID, $dateFrom: DateTime, $search: String) {
+  sales(first: $first, after: $after, product: $product, dateFrom: $dateFrom, search: $search) {
+    edges { cursor node { notes } }
+    pageInfo { hasNextPage endCursor }
+    totalCount
+  }
+}
+"""
+
+
+def query_sales(**variables):
+    result = schema.execute_sync(SALES, variable_values={'first': 50, **variables})
+    assert result.errors is None, result.errors
+    return result.data['sales']
+
+
+@pytest.fixture
+def sales(product_factory, purchase_item_factory, sale_item_factory):
+    beef, lamb = product_factory(name='Beef'), product_factory(name='Lamb')
+    for product in (beef, lamb):
+        purchase_item_factory(product=product, quantity=100, unit_cost=2, purchase__date=START)
+    # Pairs of sales on the same date, so pages split ties on the id
+    for i in range(6):
+        sale_item_factory(
+            product=beef if i % 2 else lamb, quantity=1, unit_price=3,
+            sale__date=START + timedelta(days=1 + i // 2), sale__notes=f'sale {i}',
+        )
+    return beef, lamb
+
+
+@pytest.mark.django_db
+def test_sales_are_paged_by_cursor(sales):
+    seen = []
+    after = None
+    while True:
+        page = query_sales(first=4, after=after)
+        seen += [edge['node']['notes'] for edge in page['edges']]
+        if not page['pageInfo']['hasNextPage']:
+            break
+        after = page['pageInfo']['endCursor']
+
+    assert len(seen) == len(set(seen)) == 6
+    # Newest first
+    assert set(seen[:2]) == {'sale 4', 'sale 5'}
+    assert set(seen[-2:]) == {'sale 0', 'sale 1'}
+    assert page['totalCount'] == 6
+
+
+@pytest.mark.django_db
+def test_sales_sharing_a_timestamp_are_all_paged(sale_factory):
+    date = START + timedelta(microseconds=123456)
+    for i in range(3):
+        sale_factory(date=date, notes=f'sale {i}')
+
+    seen, after = [], None
+    while True:
+        page = query_sales(first=1, after=after)
+        seen += [edge['node']['notes'] for edge in page['edges']]
+        if not page['pageInfo']['hasNextPage']:
+            break
+        after = page['pageInfo']['endCursor']
+    assert sorted(seen) == ['sale 0', 'sale 1', 'sale 2']
+
+
+@pytest.mark.django_db
+def test_sales_are_filtered(sales):
+    beef, _ = sales
+    page = query_sales(product=str(beef.pk))
+    assert sorted(edge['node']['notes'] for edge in page['edges']) == ['sale 1', 'sale 3', 'sale 5']
+
+    page = query_sales(dateFrom=(START + timedelta(days=3)).isoformat())
+    assert page['totalCount'] == 2
+
+    page = query_sales(search='SALE 2')
+    assert [edge['node']['notes'] for edge in page['edges']] == ['sale 2']
+
+
+@pytest.mark.django_db
+def test_products_are_filtered_by_name(sales):
+    result = schema.execute_sync('{ products(name: "bee") { edges { node { name } } } }')
+    assert result.data['products']['edges'] == [{'node': {'name': 'Beef'}}]
+
+
+@pytest.mark.django_db
+def test_invalid_cursor_is_an_error(sales):
+    result = schema.execute_sync(SALES, variable_values={'first': 2, 'after': 'nonsense'})
+    assert 'Invalid cursor' in result.errors[0].message
+
+
+METRICS = """
+{
+  products { edges { node { name stockLevel stockValue daysUntilStockout } } }
+  sales(first: 2) { edges { node { totalAmount grossProfit } } }
+  purchases { edges { node { totalAmount } } }
+}
+"""
+
+
+@pytest.mark.django_db
+def test_metrics_are_loaded_in_batches(sales, client, django_assert_max_num_queries):
+    beef, lamb = sales
+    with django_assert_max_num_queries(8):
+        response = client.post('/graphql/', {'query': METRICS}, content_type='application/json')
+    data = response.json()['data']
+
+    products = {edge['node']['name']: edge['node'] for edge in data['products']['edges']}
+    assert Decimal(products['Beef']['stockLevel']) == beef.stock_level == 97
+    assert Decimal(products['Lamb']['stockValue']) == lamb.stock_value == 194
+    assert Decimal(products['Lamb']['daysUntilStockout']) == 97
+    # Each sale is one unit at 3 bought at 2
+    for edge in data['sales']['edges']:
+        assert (Decimal(edge['node']['totalAmount']), Decimal(edge['node']['grossProfit'])) == (3, 1)
+    assert [Decimal(edge['node']['totalAmount']) for edge in data['purchases']['edges']] == [200, 200]
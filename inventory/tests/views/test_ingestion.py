@@ -0,0 +1,65 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from inventory.models import BatchMovement, Product, ProductDailySnapshot, StockLedgerEntry, StockMovement, Transaction
+
+
+def post_purchases(client, rows, date='2022-01-01'):
+    data = '\n'.join(f'{name}, {quantity}kg, ${total}' for name, quantity, total in rows)
+    return client.post(reverse('inventory:purchases_form'), {'purchases_data': data, 'date': date, 'create_missing_products': True})
+
+
+def post_sales(client, rows, date='2022-01-03'):
+    data = '\n'.join(f'{name} ({price}), {quantity}' for name, quantity, price in rows)
+    return client.post(reverse('inventory:sales_form'), {'sales_data': data, 'date': date})
+
+
+def derived_rows():
+    return (
+        sorted(StockLedgerEntry.objects.values_list('product__name', 'date', 'quantity', 'balance')),
+        sorted(ProductDailySnapshot.objects.values_list('product__name', 'day', 'closing_quantity', 'closing_value', 'sales_value')),
+    )
+
+
+@pytest.mark.django_db
+def test_pasted_lines_create_derived_rows(client):
+    post_purchases(client, [('Beef', 10, 50), ('Pork', 4, 8)])
+    post_purchases(client, [('beef', 5, 30)], date='2022-01-02')
+    assert set(Product.objects.values_list('name', flat=True)) == {'Beef', 'Pork'}
+    beef = Product.objects.get(name='Beef')
+    assert beef.purchase_items.count() == 2
+    assert beef.stock_level == 15
+
+    post_sales(client, [('Beef', 12, 9), ('Pork', 1, 3)])
+    assert beef.stock_level == 3
+    assert beef.stock_value == 18
+    assert StockMovement.objects.count() == 5
+    assert BatchMovement.objects.filter(movement_type='OUT').count() == 3
+    assert Transaction.objects.filter(transaction_type='SALE').count() == 2
+
+    ingested = derived_rows()
+    StockLedgerEntry.objects.rebuild()
+    ProductDailySnapshot.objects.rebuild()
+    assert derived_rows() == ingested
+
+
+@pytest.mark.django_db
+def test_ingestion_queries_do_not_grow_with_lines(client):
+    def count(rows):
+        with CaptureQueriesContext(connection) as queries:
+            post_purchases(client, rows)
+            post_sales(client, [(name, 1, 2) for name, *_ in rows])
+        return len(queries)
+
+    count([('Warm up', 1, 1)])
+    assert count([(f'Product {i}', 5, 10) for i in range(5)]) == count([(f'Other {i}', 5, 10) for i in range(20)])
+
+
+@pytest.mark.django_db
+def test_unknown_products_are_reported_up_front(client):
+    response = post_sales(client, [('Beef', 1, 2), ('Lamb', 1, 2)])
+    assert response.status_code == 200
+    assert "Product &#x27;Beef&#x27; not found." in response.content.decode()
+    assert not StockMovement.objects.exists()
@@ -0,0 +1,113 @@
+import json
+import uuid
+import pytest
+from datetime import datetime, timedelta
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import make_aware
+
+from inventory.models import BatchMovement, Sale, SaleItem, StockLedgerEntry
+
+START = make_aware(datetime(2022, 1, 1))
+
+
+@pytest.fixture(autouse=True)
+def pos_token(settings):
+    settings.POS_SYNC_TOKENS = ['pos-token']
+
+
+def upload(client, sales, token='pos-token'):
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    return client.post(
+        reverse('inventory:sync_sales'), json.dumps({'sales': sales}), content_type='application/json', headers=headers,
+    )
+
+
+def make_sales(products, count):
+    return [
+        {
+            'id': str(uuid.uuid4()),
+            # Spread over two days, the ledger is updated once per day
+            'date': (START + timedelta(days=1 + i % 2, hours=i)).isoformat(),
+            'notes': f'POS sale {i}',
+            'items': [{'product': str(product.pk), 'quantity': '1', 'unit_price': '3'} for product in products],
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def stock(product_factory, purchase_item_factory):
+    products = [product_factory(name='Beef'), product_factory(name='Lamb')]
+    for product in products:
+        purchase_item_factory(product=product, quantity=5, unit_cost=2, purchase__date=START)
+        purchase_item_factory(product=product, quantity=100, unit_cost=4, purchase__date=START + timedelta(hours=1))
+    return products
+
+
+@pytest.mark.django_db
+def test_uploaded_sales_are_recorded_once(client, stock):
+    beef, lamb = stock
+    sales = make_sales(stock, 8)
+    response = upload(client, sales)
+    assert response.status_code == 200
+    assert sorted(response.json()['created']) == sorted(sale['id'] for sale in sales)
+    assert beef.stock_level == lamb.stock_level == 97
+    assert StockLedgerEntry.objects.filter(product=beef).count() == 10
+    ledger = sorted(StockLedgerEntry.objects.values_list('product', 'date', 'balance'))
+    StockLedgerEntry.objects.rebuild()
+    assert sorted(StockLedgerEntry.objects.values_list('product', 'date', 'balance')) == ledger
+    # Oldest batch first, the first five units cost 2
+    consumed = (
+        BatchMovement.objects.filter(movement_type='OUT', batch__product=beef)
+        .values_list('batch__unit_cost').annotate(total=Sum('quantity')).order_by('batch__unit_cost')
+    )
+    assert list(consumed) == [(2, 5), (4, 3)]
+
+    # A replayed upload, with one new sale
+    extra = make_sales(stock, 1)
+    response = upload(client, sales + extra)
+    assert response.json()['created'] == [extra[0]['id']]
+    assert len(response.json()['skipped']) == 8
+    assert Sale.objects.count() == 9
+    assert beef.stock_level == 96
+
+
+@pytest.mark.django_db
+def test_invalid_upload_records_nothing(client, stock):
+    sales = make_sales(stock, 3)
+    sales[1]['items'][0]['quantity'] = '-1'
+    sales[2]['items'][1]['product'] = str(uuid.uuid4())
+    response = upload(client, sales)
+
+    assert response.status_code == 400
+    errors = response.json()['errors']
+    assert set(errors) == {'1', '2'}
+    assert 'items.0.quantity' in errors['1']
+    assert 'not found' in errors['2']['items'][0]
+    assert not SaleItem.objects.exists()
+
+
+@pytest.mark.django_db
+def test_upload_queries_do_not_grow_with_sales(client, stock):
+    def count(sales):
+        with CaptureQueriesContext(connection) as queries:
+            assert upload(client, sales).status_code == 200
+        return len(queries)
+
+    count(make_sales(stock, 2))
+    assert count(make_sales(stock, 4)) == count(make_sales(stock, 16))
+
+
+@pytest.mark.django_db
+def test_upload_requires_a_pos_credential(client, admin_client, stock):
+    sales = make_sales(stock, 1)
+    for token in (None, 'wrong'):
+        response = upload(client, sales, token)
+        assert response.status_code == 401
+    assert not Sale.objects.exists()
+
+    # Users allowed to add sales need no token
+    assert upload(admin_client, sales, token=None).status_code == 200
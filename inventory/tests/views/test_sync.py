@@ -0,0 +1,122 @@
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.urls import reverse
+from django.utils.timezone import make_aware
+
+from inventory.models import SyncChange
+
+START = make_aware(datetime(2022, 1, 1))
+
+
+def pull(client, since=0, **params):
+    # Tests run inside a transaction that never commits, so number the
+    # changes recorded so far as their commit would
+    SyncChange.objects.publish()
+    response = client.get(reverse('inventory:sync_changes'), {'since': since, **params})
+    assert response.status_code == 200
+    data = response.json()
+    data['products'] = {row[0]: dict(zip(data['fields'], row)) for row in data['products']}
+    return data
+
+
+@pytest.fixture
+def stock(product_factory, purchase_item_factory):
+    beef, lamb = product_factory(name='Beef', unit_price=5), product_factory(name='Lamb', unit_price=6)
+    for product in (beef, lamb):
+        purchase_item_factory(product=product, quantity=10, unit_cost=2, purchase__date=START)
+    return beef, lamb
+
+
+@pytest.mark.django_db
+def test_first_sync_pulls_every_product(client, stock):
+    beef, lamb = stock
+    data = pull(client)
+    assert data['reset'] is True
+    assert data['cursor'] == SyncChange.objects.latest_sequence()
+    assert set(data['products']) == {str(beef.pk), str(lamb.pk)}
+    assert Decimal(data['products'][str(beef.pk)]['stock_level']) == 10
+
+
+@pytest.mark.django_db
+def test_later_syncs_pull_only_changes(client, stock, sale_item_factory):
+    beef, lamb = stock
+    cursor = pull(client)['cursor']
+    assert pull(client, cursor)['products'] == {}
+
+    sale_item_factory(product=beef, quantity=3, unit_price=5, sale__date=START + timedelta(days=1))
+    lamb.unit_price = 7
+    lamb.save()
+    data = pull(client, cursor)
+    assert data['reset'] is False
+    assert Decimal(data['products'][str(beef.pk)]['stock_level']) == 7
+    assert Decimal(data['products'][str(lamb.pk)]['unit_price']) == 7
+
+    cursor = data['cursor']
+    lamb_id = str(lamb.pk)
+    lamb.delete()
+    data = pull(client, cursor)
+    assert data['products'] == {}
+    assert data['deleted'] == [lamb_id]
+
+
+@pytest.mark.django_db
+def test_changes_are_paged(client, stock, product_factory):
+    cursor = pull(client)['cursor']
+    for i in range(3):
+        product_factory(name=f'Goat {i}')
+
+    data = pull(client, cursor, limit=2)
+    assert (len(data['products']), data['more']) == (2, True)
+    data = pull(client, data['cursor'], limit=2)
+    assert (len(data['products']), data['more']) == (1, False)
+
+
+@pytest.mark.django_db
+def test_expired_cursor_pulls_everything(client, stock):
+    cursor = pull(client)['cursor']
+    beef, _ = stock
+    beef.save()
+    beef.save()
+    SyncChange.objects.publish()
+    SyncChange.objects.filter(sequence__lte=cursor + 1).delete()
+
+    assert pull(client, cursor)['reset'] is True
+    assert pull(client, cursor + 1)['reset'] is False
+
+
+@pytest.mark.django_db
+def test_changes_are_served_once_numbered_at_commit(client, stock, product_factory):
+    cursor = pull(client)['cursor']
+    goat = product_factory(name='Goat')
+    # Recorded by a transaction that has not committed yet
+    assert SyncChange.objects.filter(sequence__isnull=True).exists()
+    assert SyncChange.objects.since(cursor, 10) == ({}, cursor, False)
+
+    data = pull(client, cursor)
+    assert list(data['products']) == [str(goat.pk)]
+    assert data['cursor'] > cursor
+    assert not SyncChange.objects.filter(sequence__isnull=True).exists()
+
+
+@pytest.mark.django_db
+def test_prune_keeps_latest_change(stock):
+    SyncChange.objects.publish()
+    SyncChange.objects.update(created_at=START)
+    latest = SyncChange.objects.latest_sequence()
+    SyncChange.objects.prune(timedelta(days=1))
+    assert list(SyncChange.objects.values_list('sequence', flat=True)) == [latest]
+
+
+# Committing for real, so the fixture's changes are published beforehand
+@pytest.mark.django_db(transaction=True)
+def test_changes_are_published_once_per_transaction(django_capture_on_commit_callbacks, stock, sale_item_factory):
+    beef, lamb = stock
+    with transaction.atomic(), django_capture_on_commit_callbacks() as callbacks:
+        sale_item_factory(product=beef, quantity=3, unit_price=5, sale__date=START + timedelta(days=1))
+        lamb.unit_price = 7
+        lamb.save()
+        assert SyncChange.objects.filter(sequence__isnull=True).count() > 1
+    assert [callback.__name__ for callback in callbacks].count('_publish') == 1
+    assert not SyncChange.objects.filter(sequence__isnull=True).exists()
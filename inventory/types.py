@@ -18,6 +18,22 @@ class Product:
     updated_at: typing.Optional[str]
     created_at: typing.Optional[str]
 
+    @strawberry.field
+    async def stock_level(self, info: strawberry.Info) -> Decimal:
+        return (await info.context.loaders.product_metrics.load(self.pk))['current_stock_level']
+
+    @strawberry.field
+    async def stock_value(self, info: strawberry.Info) -> Decimal:
+        return (await info.context.loaders.product_metrics.load(self.pk))['current_stock_value']
+
+    @strawberry.field
+    async def average_consumption(self, info: strawberry.Info) -> Decimal:
+        return (await info.context.loaders.product_metrics.load(self.pk))['consumption_per_day']
+
+    @strawberry.field
+    async def days_until_stockout(self, info: strawberry.Info) -> Decimal:
+        return (await info.context.loaders.product_metrics.load(self.pk))['days_to_sell_out']
+
 
 @strawberry_django.type(models.Purchase)
 class Purchase:
@@ -26,6 +42,10 @@ class Purchase:
     notes: typing.Optional[str]
     items: typing.List['PurchaseItem']
 
+    @strawberry.field
+    async def total_amount(self, info: strawberry.Info) -> Decimal:
+        return await info.context.loaders.purchase_totals.load(self.pk)
+
 
 @strawberry_django.type(models.PurchaseItem)
 class PurchaseItem:
@@ -42,6 +62,16 @@ class Sale:
     notes: typing.Optional[str]
     items: typing.List['SaleItem']
 
+    @strawberry.field
+    async def total_amount(self, info: strawberry.Info) -> Decimal:
+        total_amount, _ = await info.context.loaders.sale_totals.load(self.pk)
+        return total_amount
+
+    @strawberry.field
+    async def gross_profit(self, info: strawberry.Info) -> Decimal:
+        total_amount, cost_of_goods_sold = await info.context.loaders.sale_totals.load(self.pk)
+        return total_amount - cost_of_goods_sold
+
 
 @strawberry_django.type(models.SaleItem)
 class SaleItem:
@@ -70,3 +100,15 @@ class StockConversion:
     unit_cost: typing.Optional[Decimal]
     date: typing.Optional[str]
     reason: typing.Optional[str]
+
+
+@strawberry.type
+class ReorderLine:
+    product: Product
+    stock_level: Decimal
+    average_consumption: Decimal
+    days_until_stockout: Decimal
+    reorder_quantity: Decimal
+    batch_sized_reorder_quantity: Decimal
+    unit_cost: Decimal
+    reorder_value: Decimal
@@ -7,4 +7,6 @@ urlpatterns = [
     path('purchases-form/', views.purchases_form, name='purchases_form'),
     path('sales-form/', views.sales_form, name='sales_form'),
     path('stock-form/', views.stock_new, name='stock_form'),
+    path('sync/', views.sync_changes, name='sync_changes'),
+    path('sync/sales/', views.sync_sales, name='sync_sales'),
 ]
@@ -1,17 +1,21 @@
-import csv
-from decimal import Decimal
-import decimal
-from io import StringIO
-import re
-from datetime import datetime
-from typing import List
+import hmac
+import json
+from django.conf import settings
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.db import transaction
-from django.http import HttpResponse, HttpRequest
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, HttpRequest, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET, require_POST
+from strawberry.django.views import AsyncGraphQLView
 
-from .models import Product, Purchase, Sale, StockMovement
-from .forms import PurchasesForm, SalesForm, StockAdjustmentForm
+from .forms import PurchasesForm, SalesForm, StockAdjustmentForm, clean_sale_upload
+from .ingestion import LineIngestion, resolve_products, upload_sales
+from .loaders import Context
+from .models import Purchase, Sale
+from .models.product_daily_snapshot import day_start
+from .sync import DEFAULT_LIMIT, change_feed
 
 
 @transaction.atomic
@@ -27,67 +31,30 @@ def stock_new(request: HttpRequest) -> HttpResponse:
     if request.method == "POST":
         form = StockAdjustmentForm(request.POST)
         if form.is_valid():
-            stock_data = form.cleaned_data["stock_data"]
-            stock_date: datetime = form.cleaned_data["date"]
+            lines = form.cleaned_data["parsed_stock"]
+            stock_date = day_start(form.cleaned_data["date"])
             create_missing_products: bool = form.cleaned_data["create_missing_products"]
-            adjustments: List[StockMovement] = []
-            errors: List[str] = []
 
-            f = StringIO(stock_data)
-            reader = csv.reader(f, delimiter=",", skipinitialspace=True)
+            products = resolve_products(lines, defaults=(lambda line: dict(
+                unit_cost=line["purchase_price"],
+                unit_price=line["selling_price"],
+                unit=line["unit"],
+            )) if create_missing_products else None)
 
             purchase, _ = Purchase.objects.get_or_create(
                 date=stock_date, is_initial_stock=True
             )
-
-            for line in reader:
-                # Parse each line
-                product_name = line[0].strip()
-                purchase_price: float = float(line[1].strip())
-                selling_price: float = float(line[2].strip())
-                quantity: float = float(line[3].strip())
-                unit: str = line[4].strip()
-
-                # Match product name
-                try:
-                    product = Product.objects.get(name__iexact=product_name)
-                except Product.DoesNotExist:
-                    if create_missing_products:
-                        product = Product.objects.create(
-                            name=product_name,
-                            unit_cost=purchase_price,
-                            unit_price=selling_price,
-                            unit=unit,
-                        )
-                    else:
-                        errors.append(f"Product '{product_name}' not found.")
-                        continue
-
-                adjustment = StockMovement(
-                    product=product,
-                    date=stock_date,
-                    quantity=quantity,
-                    movement_type="IN",
-                    adjustment=True,
-                )
-                adjustments.append(adjustment)
-
-                purchase.items.create(
-                    product=product, quantity=quantity, unit_cost=purchase_price
+            LineIngestion().purchase(purchase, [
+                dict(
+                    product=products[line["product_name"].lower()],
+                    quantity=line["quantity"],
+                    unit_cost=line["purchase_price"],
                 )
+                for line in lines
+            ])
 
-            # Save adjustments
-            for adjustment in adjustments:
-                adjustment.save()
-
-            if errors:
-                messages.error(request, "Some errors occurred during processing:")
-                for error in errors:
-                    messages.error(request, error)
-            else:
-                messages.success(request, "Stock adjustments created successfully.")
-
-            return redirect("inventory:stock_new")
+            messages.success(request, "Stock adjustments created successfully.")
+            return redirect("inventory:stock_form")
     else:
         form = StockAdjustmentForm()
 
@@ -109,40 +76,22 @@ def sales_form(request: HttpRequest) -> HttpResponse:
     if request.method == "POST":
         form = SalesForm(request.POST)
         if form.is_valid():
-            sales_data: str = form.cleaned_data["sales_data"]
-            sales_date: datetime.date = form.cleaned_data["date"]
-
-            f = StringIO(sales_data)
-            reader = csv.reader(f, delimiter=",", skipinitialspace=True)
-
-            sale, _ = Sale.objects.get_or_create(date=sales_date)
-
-            for line in reader:
-                # e.g. line[0] might be "Beef (5.50)", line[1] might be "4.365"
-                raw_product_name: str = line[0].strip()
-
-                # 1. Extract selling_price from parentheses, e.g. (5.50)
-                match = re.search(r'\((.*?)\)', raw_product_name)
-                selling_price: Decimal = Decimal(match.group(1))
-
-                # 2. Remove the (price) part from the product name
-                product_name: str = re.sub(r'\(.*?\)', '', raw_product_name).strip()
-
-                # 3. Parse quantity from second column
-                # e.g. "4.365" or "11.295"
-                quantity_str: str = line[1].strip()
-                quantity: Decimal = Decimal(quantity_str)
-                product: Product = Product.objects.get(name__iexact=product_name)
-
-                sale.items.create(
-                    product=product,
-                    quantity=quantity,
-                    unit_price=selling_price,  # bracketed price
+            lines = form.cleaned_data["parsed_sales"]
+            products = resolve_products(lines)
+
+            sale, _ = Sale.objects.get_or_create(date=day_start(form.cleaned_data["date"]))
+            LineIngestion().sale(sale, [
+                dict(
+                    product=products[line["product_name"].lower()],
+                    quantity=line["quantity"],
+                    unit_price=line["selling_price"],  # bracketed price
                 )
+                for line in lines
+            ])
 
             messages.success(request, f"Sales recorded successfully for {sale.date}.")
             return redirect("inventory:sales_form")
-    
+
     return render(request, "inventory/sale_form.html", {"form": form})
 
 
@@ -161,36 +110,101 @@ def purchases_form(request: HttpRequest) -> HttpResponse:
     if request.method == "POST":
         form = PurchasesForm(request.POST)
         if form.is_valid():
-            purchases_data = form.cleaned_data["purchases_data"]
-            purchases_date: datetime = form.cleaned_data["date"]
-
-            f = StringIO(purchases_data)
-            reader = csv.reader(f, delimiter=",", skipinitialspace=True)
-            purchase, _ = Purchase.objects.get_or_create(date=purchases_date)
-
-            for line in reader:
-                product_name = line[0].strip()
-                quantity_str = line[1].strip()
-                match = re.match(r"(\d+(\.\d+)?)", quantity_str)
-                quantity: Decimal = Decimal(match.group(1))
-                purchase_price: Decimal = Decimal(line[2].replace("$", "").strip())
-
-                product, _ = Product.objects.get_or_create(
-                    name=product_name,
-                    defaults=dict(
-                        unit_cost=purchase_price,
-                        unit_price=None,
-                        unit="unit",
-                    )
-                )
-
-                unit_cost = purchase_price / quantity
-                purchase.items.create(
-                    product=product, quantity=quantity, unit_cost=unit_cost
+            lines = form.cleaned_data["parsed_purchases"]
+            products = resolve_products(lines, defaults=lambda line: dict(
+                unit_cost=line["price"],
+                unit_price=None,
+                unit="unit",
+            ))
+
+            purchase, _ = Purchase.objects.get_or_create(date=day_start(form.cleaned_data["date"]))
+            LineIngestion().purchase(purchase, [
+                dict(
+                    product=products[line["product_name"].lower()],
+                    quantity=line["quantity"],
+                    unit_cost=line["price"] / line["quantity"],
                 )
+                for line in lines
+            ])
 
             messages.success(request, f"Purchases recorded successfully for {purchase.date}.")
             return redirect("inventory:purchases_form")
-        else:
-            print(form.errors)
     return render(request, "inventory/purchase_form.html", {"form": form})
+
+
+@require_GET
+@gzip_page
+def sync_changes(request: HttpRequest) -> HttpResponse:
+    """
+    Change feed for the POS: the products, prices and stock levels changed
+    since the `since` cursor, see `change_feed`.
+
+    :param request: The request object.
+    :return: The changes as JSON.
+    """
+    try:
+        cursor = int(request.GET.get("since", 0))
+        limit = int(request.GET.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        return JsonResponse({"error": "since and limit must be integers"}, status=400)
+
+    return JsonResponse(change_feed(cursor, limit))
+
+
+def _pos_authorized(request: HttpRequest) -> bool:
+    """
+    Whether the request carries one of the `POS_SYNC_TOKENS` as a bearer
+    token, or comes from a user allowed to add sales.
+    """
+    if request.user.has_perm('inventory.add_sale'):
+        return True
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return False
+    return any(hmac.compare_digest(token.encode(), allowed.encode()) for allowed in settings.POS_SYNC_TOKENS if allowed)
+
+
+@csrf_exempt
+@require_POST
+def sync_sales(request: HttpRequest) -> HttpResponse:
+    """
+    Upload of the sales recorded offline by a POS, see `clean_sale_upload`.
+
+    Sales carry client-generated ids and those already recorded are skipped,
+    so a failed upload can simply be sent again. The whole upload is
+    recorded in one transaction, or nothing is if any sale is invalid.
+    Being exempt from CSRF checks, the upload must be authorized with a POS
+    token, see `_pos_authorized`.
+
+    :param request: The request object.
+    :return: The ids of the created and skipped sales as JSON.
+    """
+    if not _pos_authorized(request):
+        response = JsonResponse({"error": "Authentication required"}, status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    sales, errors = clean_sale_upload(data)
+    if errors:
+        return JsonResponse({"errors": errors}, status=400)
+
+    try:
+        created, skipped = upload_sales(sales)
+    except IntegrityError:
+        # The same sales are being uploaded concurrently
+        return JsonResponse({"error": "Conflicting upload, retry"}, status=409)
+    return JsonResponse({"created": created, "skipped": skipped})
+
+
+class GraphQLView(AsyncGraphQLView):
+    """
+    The GraphQL endpoint, giving every request its own data loaders.
+    """
+
+    async def get_context(self, request, response):
+        return Context(request=request, response=response)
@@ -0,0 +1,206 @@
+import hashlib
+import numpy as np
+import pandas as pd
+
+# Bounds of the logistic growth curve
+CAP = 1000.0
+FLOOR = 0.0
+
+
+def fingerprint(df):
+    """
+    A digest of the observations in a sales frame, identifying the data a
+    model was fitted to.
+    """
+    hashed = pd.util.hash_pandas_object(df[['ds', 'y']].astype(str), index=False)
+    return hashlib.sha256(hashed.values.tobytes()).hexdigest()
+
+
+def daily_sales(df, start=None, end=None):
+    """
+    Daily totals of a sales frame from `start` to `end` (both days, by
+    default its first and last), zero on days without sales and NaN on days
+    with a stock-limited sale.
+    """
+    days = pd.to_datetime(df['ds']).dt.normalize()
+    index = pd.date_range(days.min() if start is None else start, days.max() if end is None else end, freq='D')
+    totals = df['y'].fillna(0).groupby(days).sum().reindex(index, fill_value=0.0)
+    censored = df['y'].isna().groupby(days).any().reindex(index, fill_value=False)
+    return totals.mask(censored)
+
+
+class Forecaster:
+    """
+    Forecasts a product's sales from its Prophet-style frame of `ds`
+    (naive UTC sale dates) and `y` (quantity sold, NaN if limited by stock).
+
+    Forecasters run in forecasting pool workers, so they only work on what
+    they are given and never touch the database.
+    """
+    name = None
+    # Whether fitted models are worth storing and passing back as `cached`
+    caches_models = False
+
+    def forecast(self, df, days=12, cached=None):
+        """
+        Forecast `df` `days` ahead.
+
+        :return: A list of `{'ds', 'yhat', 'yhat_lower', 'yhat_upper'}`
+            records covering the history and the days ahead, and the
+            `(fingerprint, model_json)` of a newly fitted model to store, or
+            `None`.
+        """
+        raise NotImplementedError
+
+
+class ProphetForecaster(Forecaster):
+    """
+    Prophet with logistic growth and weekly seasonality. Fitted models are
+    reused while the frame is unchanged and warm start the refit otherwise.
+    """
+    name = 'prophet'
+    caches_models = True
+
+    @staticmethod
+    def fitted_params(model):
+        """
+        The parameters of a fitted model, in the form Prophet accepts as the
+        initial values of a new fit.
+        """
+        return {
+            'k': model.params['k'][0][0],
+            'm': model.params['m'][0][0],
+            'sigma_obs': model.params['sigma_obs'][0][0],
+            'delta': model.params['delta'][0],
+            'beta': model.params['beta'][0],
+        }
+
+    def build_model(self, df, init=None):
+        # Imported here, Prophet and cmdstanpy are slow to load
+        from prophet import Prophet
+
+        # Create a Prophet instance
+        model = Prophet(
+            weekly_seasonality=True,  # captures day-of-week effects
+            yearly_seasonality=False,  # set to True if you suspect yearly patterns
+            daily_seasonality=False,  # usually not needed unless you have sub-daily data
+            growth='logistic'         # use logistic growth for bounded growth
+        )
+
+        # Fit the model, starting the optimizer from `init` if given. Prophet
+        # ignores initial values whose shape does not match, e.g. when the
+        # number of changepoints changed with the history
+        if init is not None:
+            model.fit(df, init=init)
+        else:
+            model.fit(df)
+        return model
+
+    def make_forecast(self, model, days=12):
+        # Create a DataFrame with future dates
+        future = model.make_future_dataframe(periods=days)
+        # lowest bound for y is 0
+        future['floor'] = FLOOR
+        # upper bound for y is the cap
+        future['cap'] = CAP
+        # Make predictions
+        forecast = model.predict(future)
+        return forecast
+
+    def forecast(self, df, days=12, cached=None):
+        """
+        `cached` is the `(fingerprint, model_json)` of the model last fitted
+        for the product, if any. It is reused as is when the frame has not
+        changed since, and its parameters warm start the fit otherwise.
+        """
+        from prophet.serialize import model_from_json, model_to_json
+
+        digest = fingerprint(df)
+        if cached is not None and cached[0] == digest:
+            model, fitted = model_from_json(cached[1]), None
+        else:
+            init = self.fitted_params(model_from_json(cached[1])) if cached is not None else None
+            model = self.build_model(df, init)
+            fitted = (digest, model_to_json(model))
+
+        forecast = self.make_forecast(model, days)
+        return forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].to_dict(orient='records'), fitted
+
+
+class SmoothingForecaster(Forecaster):
+    """
+    Simple exponential smoothing of daily sales with day-of-week factors, in
+    NumPy. Suits slow-moving products at a fraction of Prophet's cost.
+
+    Sales are summed per day, days without sales count as zero and days with
+    a stock-limited sale are skipped. Each day is deseasonalized by the
+    ratio of its weekday's mean to the overall mean before updating the
+    level, and forecasts are the last level times the weekday factor.
+    """
+    name = 'smoothing'
+
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+
+    def weekday_factors(self, daily):
+        """
+        Mean sales of each weekday relative to the overall mean, 1 for
+        weekdays never observed.
+        """
+        observed = daily.dropna()
+        factors = np.ones(7)
+        overall = observed.mean() if len(observed) else 0
+        if overall > 0:
+            means = observed.groupby(observed.index.dayofweek).mean()
+            factors[means.index] = means.values / overall
+        return factors
+
+    def forecast(self, df, days=12, cached=None):
+        daily = daily_sales(df)
+        factors = self.weekday_factors(daily)
+        values = daily.to_numpy(dtype=float)
+        seasonal = factors[daily.index.dayofweek]
+
+        # Days on weekdays that never sell say nothing about the level
+        informative = np.flatnonzero(~np.isnan(values) & (seasonal > 0))
+        level = values[informative[0]] / seasonal[informative[0]] if len(informative) else 0.0
+        fitted = np.empty(len(values))
+        for i, (value, factor) in enumerate(zip(values, seasonal)):
+            # One step ahead prediction, before seeing the day's sales
+            fitted[i] = level * factor
+            if not np.isnan(value) and factor > 0:
+                level += self.alpha * (value / factor - level)
+
+        residuals = values - fitted
+        spread = 1.96 * np.nanstd(residuals) if len(informative) > 1 else 0.0
+
+        future = pd.date_range(daily.index.max() + pd.Timedelta(days=1), periods=days, freq='D')
+        index = daily.index.append(future)
+        yhat = np.concatenate([fitted, level * factors[future.dayofweek]])
+        return [
+            {
+                'ds': ds,
+                'yhat': value,
+                'yhat_lower': max(value - spread, FLOOR),
+                'yhat_upper': value + spread,
+            }
+            for ds, value in zip(index, yhat)
+        ], None
+
+
+FORECASTERS = {
+    forecaster.name: forecaster
+    for forecaster in (ProphetForecaster, SmoothingForecaster)
+}
+
+
+def get_forecaster(name):
+    return FORECASTERS[name]()
+
+
+def run_forecaster(name, df, days=12, cached=None):
+    """
+    Forecast `df` with the forecaster called `name`. A plain function, so it
+    can be sent to pool workers.
+    """
+    return get_forecaster(name).forecast(df, days, cached)
@@ -1,139 +1,75 @@
-from django.db.models import Sum, Q, F, DecimalField, ExpressionWrapper, Case, When, Value
-from django.db.models.functions import Coalesce
+from datetime import timedelta
+from django.conf import settings
 import pandas as pd
-from decimal import Decimal
-from prophet import Prophet
 
-from inventory.models import SaleItem
+from inventory.demand import censored_demand
+from inventory.models import ForecastModel
+from utils.forecasting import (  # noqa: F401 - the forecaster interface is used from here
+    CAP, FLOOR, FORECASTERS, Forecaster, ProphetForecaster, SmoothingForecaster, get_forecaster,
+)
 
 
 class Predictor:
-    def get_annotated_saleitems(self, product, start_date, end_date):
+    def prophet_frame(self, demand, start_date=None, end_date=None):
         """
-        Returns a queryset of SaleItem objects with an extra 'final_quantity' field:
-        - final_quantity = quantity if net_stock >= quantity
-        - final_quantity = None if net_stock < quantity (stock-limited)
+        Turn a censored demand series into the frame Prophet fits, with one
+        row per sale between `start_date` and `end_date`.
+        'ds' = sale.date, 'y' = quantity or NaN if limited by stock.
         """
-        return (
-            SaleItem.objects.filter(
-                product=product,
-                sale__date__range=[start_date, end_date]
-            )
-            # 1) Annotate total stock_in (product__stock_movements__quantity where movement_type='IN') up to sale.date
-            .annotate(
-                stock_in=Coalesce(
-                    Sum(
-                        'product__stock_movements__quantity',
-                        filter=Q(
-                            product__stock_movements__movement_type='IN',
-                            product__stock_movements__date__lte=F('sale__date')
-                        ),
-                        output_field=DecimalField(max_digits=15, decimal_places=2)
-                    ),
-                    Decimal('0.0')
-                ),
-                stock_out=Coalesce(
-                    Sum(
-                        'product__stock_movements__quantity',
-                        filter=Q(
-                            product__stock_movements__movement_type='OUT',
-                            product__stock_movements__date__lte=F('sale__date')
-                        ),
-                        output_field=DecimalField(max_digits=15, decimal_places=2)
-                    ),
-                    Decimal('0.0')
-                ),
-            )
-            # 2) net_stock = stock_in - stock_out
-            .annotate(
-                net_stock=ExpressionWrapper(
-                    F('stock_in') - F('stock_out'),
-                    output_field=DecimalField(max_digits=15, decimal_places=2)
-                )
-            )
-            # 3) If net_stock < quantity => final_quantity = None, else final_quantity = quantity
-            .annotate(
-                final_quantity=Case(
-                    When(net_stock__lt=F('quantity'), then=Value(None)),  # limited by stock => None
-                    default=F('quantity'),  # not limited => keep the original quantity
-                    output_field=DecimalField(decimal_places=3)  # or DecimalField
-                )
-            )
-        )
+        if start_date is not None:
+            demand = demand[demand['ds'] >= start_date]
+        if end_date is not None:
+            demand = demand[demand['ds'] <= end_date]
+
+        if demand.empty:
+            # If no items, create an empty frame with the right columns
+            return pd.DataFrame(columns=['ds', 'y'])
+
+        df = demand[['ds', 'y']].copy()
+        # Prophet wants naive timestamps, in UTC like the database
+        df['ds'] = pd.to_datetime(df['ds'], utc=True).dt.tz_localize(None)
+        df['cap'] = CAP
+        df['floor'] = FLOOR
+        return df.reset_index(drop=True)
 
     def build_dataframe_for_prophet(self, product, start_date, end_date):
         """
         Produce a DataFrame where each row corresponds to one SaleItem row.
         'ds' = sale.date, 'y' = final_quantity or None if limited by stock.
         """
+        return self.prophet_frame(censored_demand(product), start_date, end_date)
 
-        qs = self.get_annotated_saleitems(product, start_date, end_date)
-
-        # Extract fields we need (sale.date -> 'ds', final_quantity -> 'y')
-        # We'll fill 'y' with 0 in place of None
-        records = qs.values(
-            'sale__date',   # We'll rename this to 'ds'
-            'final_quantity'
-        )
-        df = pd.DataFrame.from_records(records)
-
-        if not df.empty:
-            # Rename the columns for Prophet
-            df.rename(columns={'sale__date': 'ds', 'final_quantity': 'y'}, inplace=True)
-
-            # Convert ds to datetime
-            df['ds'] = pd.to_datetime(df['ds'], errors='coerce')
-
-            # Remove timezone
-            df['ds'] = df['ds'].dt.tz_localize(None)
-
-            df['cap'] = 1000.0
-            df['floor'] = 0.0
-
-        else:
-            # If no items, create an empty frame with the right columns
-            df = pd.DataFrame(columns=['ds', 'y'])
-
-        return df
-
-    def build_prophet_model(self, df):
-        # Create a Prophet instance
-        model = Prophet(
-            weekly_seasonality=True,  # captures day-of-week effects
-            yearly_seasonality=False,  # set to True if you suspect yearly patterns
-            daily_seasonality=False,  # usually not needed unless you have sub-daily data
-            growth='logistic'         # use logistic growth for bounded growth
-        )
-
-        # Fit the model
-        model.fit(df)
-        return model
+    def forecaster(self, product):
+        """
+        The forecaster selected for `product`.
+        """
+        return get_forecaster(product.forecast_engine)
 
-    def make_forecast(self, model, days=12):
-        # Create a DataFrame with future dates
-        future = model.make_future_dataframe(periods=days)
-        # lowest bound for y is 0
-        future['floor'] = 0.0
-        # upper bound for y is infinity
-        future['cap'] = 1000.0
-        # Make predictions
-        forecast = model.predict(future)
-        return forecast
+    def sales_frame(self, product):
+        """
+        The Prophet frame of every sale of `product`, or an empty frame if
+        it has never been sold.
+        """
+        return self.prophet_frame(censored_demand(product))
 
     def predict_sales(self, product):
-        # Get consumption data for the last 30 days
-        end_date = SaleItem.objects.filter(product=product).latest('sale__date').sale.date
-        start_date = SaleItem.objects.filter(product=product).earliest('sale__date').sale.date
-        df = self.build_dataframe_for_prophet(product, start_date, end_date)
-
-        # Prophet expects columns ['ds', 'y']
-        # Make sure df has these columns, possibly rename
-        df = df.rename(columns={'ds': 'ds', 'y': 'y'})
-
-        # 2. Build and fit the Prophet model
-        model = self.build_prophet_model(df)
-
-        # 3. Forecast next 7 days
-        forecast = self.make_forecast(model, days=12)
-
-        return forecast.to_dict(orient='records')
+        df = self.sales_frame(product)
+
+        # Reuse or warm start from the model last fitted for the product,
+        # and forecast the next 12 days
+        forecaster = self.forecaster(product)
+        cached = ForecastModel.objects.cached([product]).get(product.pk) if forecaster.caches_models else None
+        records, fitted = forecaster.forecast(df, days=12, cached=cached)
+        if fitted is not None:
+            ForecastModel.objects.store(product, df, fitted)
+        return records
+
+    def evict_models(self):
+        """
+        Evict stored models by the age, count and size limits in settings.
+        """
+        return ForecastModel.objects.evict(
+            max_age=timedelta(days=settings.FORECAST_MODEL_MAX_AGE_DAYS),
+            max_count=settings.FORECAST_MODEL_MAX_COUNT,
+            max_size=settings.FORECAST_MODEL_MAX_SIZE,
+        )
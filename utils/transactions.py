@@ -0,0 +1,16 @@
+from django.db import transaction
+
+
+def on_commit_once(func, using=None):
+    """
+    Run `func` once the current transaction commits, unless it is already
+    waiting for that commit, so changes to many rows run it only once.
+    Outside a transaction it runs right away.
+
+    `func` is compared by identity, so pass the same function object on
+    every call rather than a new bound method or lambda.
+    """
+    connection = transaction.get_connection(using)
+    if any(registered is func for _, registered, _ in connection.run_on_commit):
+        return
+    transaction.on_commit(func, using=using)